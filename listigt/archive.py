@@ -0,0 +1,85 @@
+import argparse
+import sys
+from pathlib import Path
+
+from listigt.config import config
+from listigt.diff import BREADCRUMB_SEPARATOR
+from listigt.history import parse_breadcrumbs
+from listigt.main import create_storage, open_journal, recover_from_journal
+from listigt.storage.archive import Archive, completed_subtrees, insert_at_breadcrumbs
+from listigt.utils.optional import Optional
+
+
+def main():
+    args = _parse_args()
+    config_manager = config.ConfigManager(
+        save_file=Optional(args.save_file), config_file=Optional(args.config_file)
+    )
+    archive = Archive(config_manager.archive_file)
+
+    if args.command == "search":
+        for path in archive.search(args.search_string):
+            print(BREADCRUMB_SEPARATOR.join(path))
+        return
+
+    # A running listigt picks the changes up from the save file
+    storage = create_storage(config_manager)
+    tree = storage.load()
+    journal = open_journal(storage)
+    if journal.has_value():
+        # Changes that didn't make it to the save file would be lost once it
+        # is written here
+        tree = recover_from_journal(tree, storage, journal.value())
+    if args.command == "run":
+        nodes = completed_subtrees(tree, keep=tree)
+        archive.add(nodes)
+        for node in nodes:
+            parent = node.parent.value()
+            index = parent.children.index(node)
+            parent.remove_node(node)
+            storage.node_removed(node, parent, index)
+        print(f"Archived {len(nodes)} items to {archive.archive_file}")
+    elif args.command == "restore":
+        path = parse_breadcrumbs(args.path)
+        node = archive.find(path)
+        if node.is_none():
+            journal.close()
+            sys.exit(f"No item {args.path} in {archive.archive_file}")
+        storage.node_inserted(insert_at_breadcrumbs(tree, path[:-1], node.value()))
+    storage.save(tree)
+    if journal.has_value():
+        journal.value().reset(storage.content_hash)
+    journal.close()
+    if args.command == "restore":
+        # Only once the item is in the save file, so that it is never lost
+        archive.remove(path)
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Move completed items to and from the archive.")
+    parser.add_argument(
+        "--save_file",
+        type=Path,
+        default=None,
+        help="Save file whose archive to use, if not the default.",
+    )
+    parser.add_argument(
+        "--config_file", type=Path, default=None, help="Config file to use, if not the default."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("run", help="Move the completed items to the archive.")
+    search_parser = commands.add_parser(
+        "search", help="List the paths of archived items containing a text."
+    )
+    search_parser.add_argument("search_string")
+    restore_parser = commands.add_parser(
+        "restore", help="Move an archived item back to where it was."
+    )
+    restore_parser.add_argument(
+        "path", help=f'Path to the item, like "Work{BREADCRUMB_SEPARATOR}Project".'
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main()
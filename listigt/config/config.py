@@ -4,6 +4,8 @@ import toml
 
 from listigt.utils.optional import Optional
 
+SEARCH_MODES = ("exact", "fuzzy", "regex")
+
 
 class ConfigManager:
     def __init__(
@@ -11,20 +13,52 @@ class ConfigManager:
         save_file: Optional[Path] = Optional.none(),
         config_file: Optional[Path] = Optional.none(),
     ):
+        self._root_node_id: Optional[str] = Optional.none()
+        self._selected_node_id: Optional[str] = Optional.none()
+        # Pre-order position of the root node, from configs written before
+        # nodes had ids
         self._root_node_index: Optional[int] = Optional.none()
         self._hide_complete_items = False
+        self._search_mode = "exact"
+        self._storage_backend = "text"
+        self._shard_depth = 1
+        self._autosave_enabled = True
+        self._autosave_idle_seconds = 2.0
+        self._autosave_max_edits = 50
+        self._fsync = True
+        self._watch_interval = 1.0
+        self._merge_on_save = True
+        self._history_enabled = True
+        self._archive_on_startup = False
+        self._archive_interval_days = 0.0
+        self._last_archived: Optional[float] = Optional.none()
+        self._export_format = "opml"
+        self._export_file: Optional[Path] = Optional.none()
         self._save_file_override = save_file
         self._config_file_override = config_file
         self._load_config()
 
+    @property
+    def root_node_id(self) -> Optional[str]:
+        return self._root_node_id
+
+    @root_node_id.setter
+    def root_node_id(self, new_value: Optional[str]):
+        self._root_node_id = new_value
+        self._root_node_index = Optional.none()
+
+    @property
+    def selected_node_id(self) -> Optional[str]:
+        return self._selected_node_id
+
+    @selected_node_id.setter
+    def selected_node_id(self, new_value: Optional[str]):
+        self._selected_node_id = new_value
+
     @property
     def root_node_index(self) -> Optional[int]:
         return self._root_node_index
 
-    @root_node_index.setter
-    def root_node_index(self, new_value: Optional[int]):
-        self._root_node_index = new_value
-
     @property
     def hide_complete_items(self) -> bool:
         return self._hide_complete_items
@@ -33,13 +67,98 @@ class ConfigManager:
     def hide_complete_items(self, new_value: bool):
         self._hide_complete_items = new_value
 
+    @property
+    def search_mode(self) -> str:
+        # One of SEARCH_MODES
+        return self._search_mode
+
+    @search_mode.setter
+    def search_mode(self, new_value: str):
+        self._search_mode = new_value
+
+    @property
+    def storage_backend(self) -> str:
+        return self._storage_backend
+
+    @storage_backend.setter
+    def storage_backend(self, new_value: str):
+        self._storage_backend = new_value
+
+    @property
+    def shard_depth(self) -> int:
+        return self._shard_depth
+
+    @property
+    def autosave_enabled(self) -> bool:
+        return self._autosave_enabled
+
+    @property
+    def autosave_idle_seconds(self) -> float:
+        return self._autosave_idle_seconds
+
+    @property
+    def autosave_max_edits(self) -> int:
+        return self._autosave_max_edits
+
+    @property
+    def fsync(self) -> bool:
+        return self._fsync
+
+    @property
+    def watch_interval(self) -> float:
+        return self._watch_interval
+
+    @property
+    def merge_on_save(self) -> bool:
+        return self._merge_on_save
+
+    @property
+    def history_enabled(self) -> bool:
+        return self._history_enabled
+
+    @property
+    def history_directory(self) -> Path:
+        return self.save_file.with_name(self.save_file.name + ".history")
+
+    @property
+    def archive_file(self) -> Path:
+        return self.save_file.with_name(self.save_file.name + ".archive")
+
+    @property
+    def archive_on_startup(self) -> bool:
+        return self._archive_on_startup
+
+    @property
+    def archive_interval_days(self) -> float:
+        # Archive on startup if this long has passed since the last time, 0 for never
+        return self._archive_interval_days
+
+    @property
+    def last_archived(self) -> Optional[float]:
+        return self._last_archived
+
+    @last_archived.setter
+    def last_archived(self, new_value: Optional[float]):
+        self._last_archived = new_value
+
+    @property
+    def export_format(self) -> str:
+        return self._export_format
+
+    @property
+    def export_file(self) -> Path:
+        # Without a suffix, the one for export_format is added
+        return self._export_file.value_or(self.config_dir / "export")
+
     @property
     def config_dir(self) -> Path:
         return Path.home() / ".listigt"
 
     @property
     def save_file(self) -> Path:
-        return self._save_file_override.value_or(self.config_dir / "savefile")
+        default_names = {"sqlite": "savefile.sqlite", "sharded": "savefile.d"}
+        default_name = default_names.get(self._storage_backend, "savefile")
+        return self._save_file_override.value_or(self.config_dir / default_name)
 
     @property
     def config_file(self) -> Path:
@@ -48,14 +167,39 @@ class ConfigManager:
     def _load_config(self):
         try:
             toml_data = toml.load(str(self.config_file))
-            self._root_node_index = Optional(toml_data["State"].get("root_index", None))
-            self._hide_complete_items = toml_data["State"].get(
-                "hide_complete_items", True
-            )
         except FileNotFoundError:
-            pass
-        except KeyError:
-            pass
+            return
+
+        if state := toml_data.get("State"):
+            self._root_node_id = Optional(state.get("root_id", None))
+            self._selected_node_id = Optional(state.get("selected_id", None))
+            if self._root_node_id.is_none():
+                self._root_node_index = Optional(state.get("root_index", None))
+            self._hide_complete_items = state.get("hide_complete_items", True)
+            self._last_archived = Optional(state.get("last_archived", None))
+        storage = toml_data.get("Storage", {})
+        self._storage_backend = storage.get("backend", "text")
+        self._shard_depth = storage.get("shard_depth", 1)
+        self._fsync = storage.get("fsync", True)
+        self._watch_interval = storage.get("watch_interval", 1.0)
+        self._merge_on_save = storage.get("merge_on_save", True)
+
+        self._history_enabled = toml_data.get("History", {}).get("enabled", True)
+        self._search_mode = toml_data.get("Search", {}).get("mode", "exact")
+
+        archive = toml_data.get("Archive", {})
+        self._archive_on_startup = archive.get("on_startup", False)
+        self._archive_interval_days = archive.get("interval_days", 0.0)
+
+        export = toml_data.get("Export", {})
+        self._export_format = export.get("format", "opml")
+        if export_file := export.get("file"):
+            self._export_file = Optional.some(Path(export_file))
+
+        autosave = toml_data.get("Autosave", {})
+        self._autosave_enabled = autosave.get("enabled", True)
+        self._autosave_idle_seconds = autosave.get("idle_seconds", 2.0)
+        self._autosave_max_edits = autosave.get("max_edits", 50)
 
     def save_config(self):
         self.config_file.parent.mkdir(exist_ok=True)
@@ -64,9 +208,37 @@ class ConfigManager:
             toml.dump(
                 {
                     "State": {
-                        "root_index": self._root_node_index.value_or_none(),
+                        "root_id": self._root_node_id.value_or_none(),
+                        "selected_id": self._selected_node_id.value_or_none(),
                         "hide_complete_items": self._hide_complete_items,
-                    }
+                        "last_archived": self._last_archived.value_or_none(),
+                    },
+                    "Storage": {
+                        "backend": self._storage_backend,
+                        "shard_depth": self._shard_depth,
+                        "fsync": self._fsync,
+                        "watch_interval": self._watch_interval,
+                        "merge_on_save": self._merge_on_save,
+                    },
+                    "Autosave": {
+                        "enabled": self._autosave_enabled,
+                        "idle_seconds": self._autosave_idle_seconds,
+                        "max_edits": self._autosave_max_edits,
+                    },
+                    "History": {
+                        "enabled": self._history_enabled,
+                    },
+                    "Search": {
+                        "mode": self._search_mode,
+                    },
+                    "Archive": {
+                        "on_startup": self._archive_on_startup,
+                        "interval_days": self._archive_interval_days,
+                    },
+                    "Export": {
+                        "format": self._export_format,
+                        "file": str(self.export_file),
+                    },
                 },
                 f,
             )
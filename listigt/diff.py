@@ -0,0 +1,249 @@
+import argparse
+import bisect
+import sys
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+from listigt.storage.archive import breadcrumbs
+from listigt.storage.storage import TextFileStorage
+from listigt.todo_list.tree import TreeNode
+from listigt.todo_list.tree_diff import subtree_hashes
+
+ADDED = "added"
+REMOVED = "removed"
+MOVED = "moved"
+EDITED = "edited"
+COMPLETED = "completed"
+UNCOMPLETED = "uncompleted"
+
+BREADCRUMB_SEPARATOR = " > "
+
+
+@dataclass
+class Change:
+    kind: str
+    # Path to the item in the new tree, or in the old tree if it was removed
+    breadcrumbs: List[str]
+    # Path to the item in the old tree, for moved and edited items
+    old_breadcrumbs: List[str] = field(default_factory=list)
+    # Number of items below an added or removed item
+    num_descendants: int = 0
+
+    def __str__(self):
+        path = BREADCRUMB_SEPARATOR.join(self.breadcrumbs)
+        old_path = BREADCRUMB_SEPARATOR.join(self.old_breadcrumbs)
+        if self.kind == MOVED:
+            return f"{self.kind:<12}{old_path}  ->  {path}"
+        if self.kind == EDITED:
+            return f"{self.kind:<12}{old_path}  ->  {self.breadcrumbs[-1]}"
+        if self.num_descendants > 0:
+            items = "item" if self.num_descendants == 1 else "items"
+            return f"{self.kind:<12}{path} (and {self.num_descendants} {items} below)"
+        return f"{self.kind:<12}{path}"
+
+
+def diff_trees(old_root: TreeNode, new_root: TreeNode) -> List[Change]:
+    # Items are matched up in three passes, each linear in the size of the
+    # trees: first identical subtrees that only occur once on each side, then
+    # remaining items with a text that only occurs once on each side, and
+    # last the remaining children of items that were matched, in order.
+    matches = _Matcher(old_root, new_root).match()
+    old_for_new = {new: old for old, new in matches.items()}
+
+    changes = []
+    for new in new_root.gen_all_nodes():
+        old = old_for_new.get(new)
+        if old is None:
+            if new.parent.value() in old_for_new:
+                changes.append(
+                    Change(ADDED, breadcrumbs(new), num_descendants=_num_descendants(new))
+                )
+            continue
+
+        if old.data.text != new.data.text or old.data.subtitle != new.data.subtitle:
+            changes.append(Change(EDITED, breadcrumbs(new), breadcrumbs(old)))
+        if old.data.complete != new.data.complete:
+            kind = COMPLETED if new.data.complete else UNCOMPLETED
+            changes.append(Change(kind, breadcrumbs(new)))
+
+    moved = _moved_nodes(new_root, old_for_new)
+    changes += [
+        Change(MOVED, breadcrumbs(new), breadcrumbs(old_for_new[new]))
+        for new in new_root.gen_all_nodes()
+        if new in moved
+    ]
+
+    changes += [
+        Change(REMOVED, breadcrumbs(old), num_descendants=_num_descendants(old))
+        for old in old_root.gen_all_nodes()
+        if old not in matches and old.parent.value() in matches
+    ]
+    return changes
+
+
+class _Matcher:
+    def __init__(self, old_root: TreeNode, new_root: TreeNode):
+        self._old_root = old_root
+        self._new_root = new_root
+        self._matches: Dict[TreeNode, TreeNode] = {old_root: new_root}
+        self._old_for_new: Dict[TreeNode, TreeNode] = {new_root: old_root}
+
+    def match(self) -> Dict[TreeNode, TreeNode]:
+        self._match_unique_subtrees()
+        self._match_unique_texts()
+        self._match_children_of_matched()
+        return self._matches
+
+    def _match_unique_subtrees(self):
+        old_hashes = subtree_hashes(self._old_root, include_collapsed=False)
+        new_hashes = subtree_hashes(self._new_root, include_collapsed=False)
+        old_counts = Counter(old_hashes.values())
+        new_by_hash = {}
+        new_counts = Counter()
+        for node, node_hash in new_hashes.items():
+            new_by_hash[node_hash] = node
+            new_counts[node_hash] += 1
+
+        # Preorder, so that the largest subtrees are matched first
+        for old in self._old_root.gen_all_nodes():
+            if old in self._matches:
+                continue
+            old_hash = old_hashes[old]
+            if old_counts[old_hash] == 1 and new_counts[old_hash] == 1:
+                new = new_by_hash[old_hash]
+                if new not in self._old_for_new:
+                    self._match_subtree(old, new)
+
+    def _match_subtree(self, old: TreeNode, new: TreeNode):
+        self._add_match(old, new)
+        for old_child, new_child in zip(old.children, new.children):
+            self._match_subtree(old_child, new_child)
+
+    def _match_unique_texts(self):
+        old_by_text = _unmatched_by_text(self._old_root, self._matches)
+        new_by_text = _unmatched_by_text(self._new_root, self._old_for_new)
+        for text, old_nodes in old_by_text.items():
+            new_nodes = new_by_text.get(text, [])
+            if len(old_nodes) == 1 and len(new_nodes) == 1:
+                self._add_match(old_nodes[0], new_nodes[0])
+
+    def _match_children_of_matched(self):
+        for old, new in self._matched_pairs_top_down():
+            old_children = [child for child in old.children if child not in self._matches]
+            new_children = [child for child in new.children if child not in self._old_for_new]
+            # Same text first, then whatever is left in order
+            new_by_text = defaultdict(deque)
+            for child in new_children:
+                new_by_text[child.data.text].append(child)
+            unpaired_old = []
+            for child in old_children:
+                if new_by_text[child.data.text]:
+                    self._add_match(child, new_by_text[child.data.text].popleft())
+                else:
+                    unpaired_old.append(child)
+            unpaired_new = [child for child in new_children if child not in self._old_for_new]
+            for old_child, new_child in zip(unpaired_old, unpaired_new):
+                self._add_match(old_child, new_child)
+
+    def _matched_pairs_top_down(self):
+        # Pairs matched along the way are visited too, as the walk gets to them
+        for new in [self._new_root, *self._new_root.gen_all_nodes()]:
+            if new in self._old_for_new:
+                yield self._old_for_new[new], new
+
+    def _add_match(self, old: TreeNode, new: TreeNode):
+        self._matches[old] = new
+        self._old_for_new[new] = old
+
+
+def _unmatched_by_text(tree_root: TreeNode, matched) -> Dict[str, List[TreeNode]]:
+    by_text = defaultdict(list)
+    for node in tree_root.gen_all_nodes():
+        if node not in matched:
+            by_text[node.data.text].append(node)
+    return by_text
+
+
+def _moved_nodes(new_root: TreeNode, old_for_new: Dict[TreeNode, TreeNode]) -> set:
+    # Items under a different parent, or that are out of order among their
+    # siblings. The siblings in the longest increasing run of old positions
+    # stayed put, the rest moved.
+    moved = set()
+    for new_parent in [new_root, *new_root.gen_all_nodes()]:
+        old_parent = old_for_new.get(new_parent)
+        staying = []
+        for new in new_parent.children:
+            old = old_for_new.get(new)
+            if old is None:
+                continue
+            if old_parent is None or old.parent.value() is not old_parent:
+                moved.add(new)
+            else:
+                staying.append(new)
+        if not staying:
+            continue
+        old_index = {old: index for index, old in enumerate(old_parent.children)}
+        old_indices = [old_index[old_for_new[new]] for new in staying]
+        in_order = _longest_increasing_subsequence(old_indices)
+        moved.update(new for i, new in enumerate(staying) if i not in in_order)
+    return moved
+
+
+def _longest_increasing_subsequence(values: List[int]) -> set:
+    # Positions in values that make up one longest increasing subsequence
+    tails = []
+    tail_positions = []
+    previous = [-1] * len(values)
+    for position, value in enumerate(values):
+        index = bisect.bisect_left(tails, value)
+        if index > 0:
+            previous[position] = tail_positions[index - 1]
+        if index == len(tails):
+            tails.append(value)
+            tail_positions.append(position)
+        else:
+            tails[index] = value
+            tail_positions[index] = position
+
+    positions = set()
+    position = tail_positions[-1] if tail_positions else -1
+    while position != -1:
+        positions.add(position)
+        position = previous[position]
+    return positions
+
+
+def _num_descendants(node: TreeNode) -> int:
+    return sum(1 for _ in node.gen_all_nodes())
+
+
+def main():
+    args = _parse_args()
+    old_root = TextFileStorage(args.old_file).load()
+    new_root = TextFileStorage(args.new_file).load()
+
+    changes = diff_trees(old_root, new_root)
+    for change in changes:
+        print(change)
+    sys.exit(1 if changes else 0)
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(
+        description="Show the items that were added, removed, moved, edited, "
+        "completed or uncompleted between two save files."
+    )
+    parser.add_argument("old_file", type=Path, help="The earlier save file.")
+    parser.add_argument("new_file", type=Path, help="The later save file.")
+    args = parser.parse_args()
+    # A missing save file would otherwise load as an empty list
+    for path in (args.old_file, args.new_file):
+        if not path.is_file():
+            parser.error(f"{path} is not a file")
+    return args
+
+
+if __name__ == "__main__":
+    main()
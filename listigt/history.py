@@ -0,0 +1,115 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+from listigt.config import config
+from listigt.diff import BREADCRUMB_SEPARATOR
+from listigt.main import create_storage
+from listigt.storage.archive import node_at_breadcrumbs
+from listigt.storage.history import HistoryStore
+from listigt.todo_list.todo_list import gen_subtree_lines
+from listigt.todo_list.tree import TreeNode
+from listigt.utils.optional import Optional
+
+
+def main():
+    args = _parse_args()
+    config_manager = config.ConfigManager(
+        save_file=Optional(args.save_file), config_file=Optional(args.config_file)
+    )
+    history = HistoryStore(config_manager.history_directory)
+
+    if args.command == "list":
+        for version in history.versions():
+            saved_at = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(version.time))
+            print(f"{version.id:>6}  {saved_at}  {version.tree_hash[:12]}")
+        return
+
+    version = history.version(args.version)
+    if version.is_none():
+        sys.exit(f"No version {args.version} in {history.directory}")
+    version_root = history.load(version.value().tree_hash)
+    breadcrumbs = parse_breadcrumbs(args.path)
+    node = node_at_breadcrumbs(version_root, breadcrumbs)
+    if node.is_none():
+        sys.exit(f"No item {args.path} in version {args.version}")
+
+    if args.command == "show":
+        nodes = version_root.children if node.value() is version_root else [node.value()]
+        for top_node in nodes:
+            for line in gen_subtree_lines(top_node):
+                print(line)
+    elif args.command == "restore":
+        _restore(config_manager, node.value(), breadcrumbs)
+
+
+def _restore(config_manager: config.ConfigManager, node: TreeNode, breadcrumbs: List[str]):
+    # Puts node in place of the item at the same path in the save file, or
+    # adds it at the end of the parent item if there is none. A running
+    # listigt picks the change up from the save file.
+    storage = create_storage(config_manager)
+    tree = storage.load()
+    if not breadcrumbs:
+        storage.tree_replaced(node)
+        storage.save(node)
+        return
+
+    parent = node_at_breadcrumbs(tree, breadcrumbs[:-1])
+    if parent.is_none():
+        sys.exit(f"No item {BREADCRUMB_SEPARATOR.join(breadcrumbs[:-1])} to restore into")
+    parent = parent.value()
+
+    node.parent.value().remove_node(node)
+    old_node = node_at_breadcrumbs(parent, breadcrumbs[-1:])
+    if old_node.has_value():
+        index = parent.children.index(old_node.value())
+        parent.remove_node(old_node.value())
+        storage.node_removed(old_node.value(), parent, index)
+        if index < len(parent.children):
+            parent.add_child(node, before_child=Optional.some(parent.children[index]))
+        else:
+            parent.add_child(node)
+    else:
+        parent.add_child(node)
+    node.update_level_to_parent()
+    storage.node_inserted(node)
+    storage.save(tree)
+
+
+def parse_breadcrumbs(path: str) -> List[str]:
+    return [text.strip() for text in path.split(BREADCRUMB_SEPARATOR.strip()) if text.strip()]
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Browse and restore saved versions.")
+    parser.add_argument(
+        "--save_file",
+        type=Path,
+        default=None,
+        help="Save file whose history to use, if not the default.",
+    )
+    parser.add_argument(
+        "--config_file", type=Path, default=None, help="Config file to use, if not the default."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List the saved versions.")
+    for command, help_text in (
+        ("show", "Print a version, or an item in it, in the save file format."),
+        ("restore", "Put an item from a version back in the save file."),
+    ):
+        command_parser = commands.add_parser(command, help=help_text)
+        command_parser.add_argument("version", type=int, help="Version number, from list.")
+        command_parser.add_argument(
+            "path",
+            nargs="?",
+            default="",
+            help=f'Path to the item, like "Work{BREADCRUMB_SEPARATOR}Project". '
+            "The whole tree if not given.",
+        )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import html
+import json
+import sys
+from pathlib import Path
+from typing import Callable, Dict, Generator, TextIO, Tuple
+from xml.sax.saxutils import quoteattr
+
+from listigt.import_export.importers import (
+    JSON_SUFFIXES,
+    MARKDOWN_COLLAPSED_TEXT,
+    MARKDOWN_SUFFIXES,
+    OPML_SUFFIXES,
+)
+from listigt.todo_list.tree import TreeNode
+
+HTML_SUFFIXES = (".html", ".htm")
+
+# The exporters yield the output in small pieces while walking the tree, so
+# that it can be written as it is produced. Only the top root's children are
+# exported for the top root, otherwise the node itself is included.
+
+
+def gen_opml(node: TreeNode) -> Generator[str, None, None]:
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n<opml version="2.0">\n'
+    yield f"  <head><title>{html.escape(_title(node))}</title></head>\n  <body>\n"
+    for event, event_node, depth in _gen_walk(node):
+        indent = "  " * (depth + 2)
+        if event == _END:
+            if event_node.has_children():
+                yield f"{indent}</outline>\n"
+            continue
+
+        data = event_node.data
+        attributes = f"text={quoteattr(data.text)}"
+        if data.subtitle:
+            attributes += f" _note={quoteattr(data.subtitle)}"
+        if data.complete:
+            attributes += ' _complete="true"'
+        if data.collapsed:
+            attributes += ' _collapsed="true"'
+        end = ">" if event_node.has_children() else " />"
+        yield f"{indent}<outline {attributes}{end}\n"
+    yield "  </body>\n</opml>\n"
+
+
+def gen_markdown(node: TreeNode) -> Generator[str, None, None]:
+    for event, event_node, depth in _gen_walk(node):
+        if event == _END:
+            continue
+        data = event_node.data
+        indent = "  " * depth
+        checkbox = "[x]" if data.complete else "[ ]"
+        collapsed = f" {MARKDOWN_COLLAPSED_TEXT}" if data.collapsed else ""
+        yield f"{indent}- {checkbox} {data.text}{collapsed}\n"
+        if data.subtitle:
+            yield f"{indent}  {data.subtitle}\n"
+
+
+def gen_json(node: TreeNode) -> Generator[str, None, None]:
+    # One object per line, the format read by import_json
+    for event, event_node, depth in _gen_walk(node):
+        if event == _END:
+            continue
+        data = event_node.data
+        record = {
+            "level": depth,
+            "text": data.text,
+            "subtitle": data.subtitle,
+            "complete": data.complete,
+            "collapsed": data.collapsed,
+        }
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def gen_html(node: TreeNode) -> Generator[str, None, None]:
+    title = html.escape(_title(node))
+    yield (
+        f'<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>{title}</title>\n'
+        "<style>.complete > span { text-decoration: line-through; } "
+        ".subtitle { color: gray; }</style>\n</head>\n<body>\n<ul>\n"
+    )
+    for event, event_node, depth in _gen_walk(node):
+        indent = "  " * (depth + 1)
+        if event == _END:
+            if event_node.has_children():
+                yield f"{indent}</ul></li>\n"
+            continue
+
+        data = event_node.data
+        classes = []
+        if data.complete:
+            classes.append("complete")
+        if data.collapsed:
+            classes.append("collapsed")
+        class_attribute = f' class="{" ".join(classes)}"' if classes else ""
+        subtitle = ""
+        if data.subtitle:
+            subtitle = f'<div class="subtitle">{html.escape(data.subtitle)}</div>'
+        item = f"{indent}<li{class_attribute}><span>{html.escape(data.text)}</span>{subtitle}"
+        yield f"{item}<ul>\n" if event_node.has_children() else f"{item}</li>\n"
+    yield "</ul>\n</body>\n</html>\n"
+
+
+EXPORTERS: Dict[str, Callable[[TreeNode], Generator[str, None, None]]] = {
+    "opml": gen_opml,
+    "markdown": gen_markdown,
+    "json": gen_json,
+    "html": gen_html,
+}
+
+SUFFIXES = {"opml": ".opml", "markdown": ".md", "json": ".jsonl", "html": ".html"}
+
+
+def format_for_path(path: Path) -> str:
+    suffix = path.suffix.lower()
+    for export_format, suffixes in (
+        ("opml", OPML_SUFFIXES),
+        ("markdown", MARKDOWN_SUFFIXES),
+        ("json", JSON_SUFFIXES),
+        ("html", HTML_SUFFIXES),
+    ):
+        if suffix in suffixes:
+            return export_format
+    raise ValueError(f"Don't know which format to export to for {path}")
+
+
+def export(node: TreeNode, export_format: str, file: TextIO):
+    for chunk in EXPORTERS[export_format](node):
+        file.write(chunk)
+
+
+def export_to_path(node: TreeNode, export_format: str, path: Path):
+    # A path of - means stdout
+    if str(path) == "-":
+        export(node, export_format, sys.stdout)
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        export(node, export_format, f)
+
+
+_START = "start"
+_END = "end"
+
+
+def _gen_walk(node: TreeNode) -> Generator[Tuple[str, TreeNode, int], None, None]:
+    # Start and end events for every exported node, with its depth below the
+    # exported level. Uses an explicit stack, so deep trees don't hit the
+    # recursion limit.
+    is_top_root = node.parent.is_none()
+    top_nodes = node.children if is_top_root else [node]
+    stack = [(top_node, 0, False) for top_node in reversed(top_nodes)]
+    while stack:
+        current, depth, is_end = stack.pop()
+        if is_end:
+            yield _END, current, depth
+            continue
+        yield _START, current, depth
+        stack.append((current, depth, True))
+        stack.extend((child, depth + 1, False) for child in reversed(current.children))
+
+
+def _title(node: TreeNode) -> str:
+    return "listigt" if node.parent.is_none() else node.data.text
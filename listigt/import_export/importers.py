@@ -0,0 +1,176 @@
+import io
+import json
+import re
+from pathlib import Path
+from typing import BinaryIO, Iterable, List, Union
+from xml.etree import ElementTree
+
+from listigt.todo_list.todo_list import COLLAPSED_TEXT, COMPLETE_TEXT, TodoItem
+from listigt.todo_list.tree import TreeNode
+
+OPML_SUFFIXES = (".opml", ".xml")
+MARKDOWN_SUFFIXES = (".md", ".markdown")
+JSON_SUFFIXES = (".json", ".jsonl", ".ndjson")
+
+# Written after the text of collapsed items by the Markdown exporter
+MARKDOWN_COLLAPSED_TEXT = "<!-- collapsed -->"
+
+_MARKDOWN_HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+_MARKDOWN_LIST_ITEM = re.compile(r"^(\s*)(?:[-*+]|\d+[.)])\s+(?:\[([ xX])\]\s+)?(.*)$")
+
+# The importers read their input one element or line at a time and build the
+# tree as they go, so nothing but the tree itself is kept in memory.
+# They all return a root node in the same form as TreeNode.from_string.
+
+
+def import_file(path: Path) -> TreeNode:
+    suffix = path.suffix.lower()
+    if suffix in OPML_SUFFIXES:
+        with open(path, "rb") as f:
+            return import_opml(f)
+    with open(path) as f:
+        if suffix in JSON_SUFFIXES:
+            return import_json(f)
+        if suffix in MARKDOWN_SUFFIXES:
+            return import_markdown(f)
+        return TreeNode.from_string(f.read(), TodoItem.tree_node_from_str)
+
+
+def import_text(text: str) -> TreeNode:
+    # For pasted text, where there is no file name to go by
+    stripped = text.lstrip()
+    if stripped.startswith("<"):
+        return import_opml(io.BytesIO(text.encode()))
+    if stripped.startswith("{"):
+        return import_json(io.StringIO(text))
+    return import_markdown(io.StringIO(text))
+
+
+def import_opml(source: Union[BinaryIO, Path]) -> TreeNode:
+    # Workflowy exports notes as _note and completion as _complete
+    builder = _TreeBuilder()
+    open_elements = []
+    depth = 0
+    for event, element in ElementTree.iterparse(source, events=("start", "end")):
+        if event == "start":
+            open_elements.append(element)
+            if element.tag == "outline":
+                builder.add(
+                    TodoItem(
+                        text=_one_line(element.get("text", "")),
+                        subtitle=_one_line(element.get("_note", "")),
+                        complete=element.get("_complete") == "true",
+                        collapsed=element.get("_collapsed") == "true",
+                    ),
+                    depth,
+                )
+                depth += 1
+            continue
+
+        open_elements.pop()
+        if element.tag == "outline":
+            depth -= 1
+        # Let go of the finished element, only the open ones are kept
+        element.clear()
+        if open_elements:
+            open_elements[-1].remove(element)
+    return builder.root
+
+
+def import_markdown(lines: Iterable[str]) -> TreeNode:
+    # Headings nest by their level and list items by their indentation, below
+    # the heading they follow. Other lines become the subtitle of the item
+    # before them.
+    builder = _TreeBuilder()
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            continue
+
+        if heading := _MARKDOWN_HEADING.match(line):
+            builder.add(_markdown_item(heading.group(2)), (0, len(heading.group(1))))
+        elif list_item := _MARKDOWN_LIST_ITEM.match(line):
+            indent, checkbox, text = list_item.groups()
+            item = _markdown_item(text)
+            item.complete = item.complete or checkbox in ("x", "X")
+            builder.add(item, (1, len(indent.expandtabs(4))))
+        elif builder.last_node is not builder.root:
+            last_item = builder.last_node.data
+            subtitle = line.strip()
+            last_item.subtitle = f"{last_item.subtitle} {subtitle}" if last_item.subtitle else subtitle
+    return builder.root
+
+
+def import_json(lines: Iterable[str]) -> TreeNode:
+    # One JSON object per line, in depth-first order:
+    # {"level": 0, "text": "...", "subtitle": "...", "complete": false, "collapsed": false}
+    # Only level and text are required.
+    builder = _TreeBuilder()
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if not isinstance(record, dict):
+            raise ValueError(f"Expected a JSON object, got {line.strip()}")
+        builder.add(
+            TodoItem(
+                text=_one_line(_json_field(record, "text", str)),
+                subtitle=_one_line(_json_field(record, "subtitle", str, "")),
+                complete=_json_field(record, "complete", bool, False),
+                collapsed=_json_field(record, "collapsed", bool, False),
+            ),
+            _json_field(record, "level", int),
+        )
+    return builder.root
+
+
+def _json_field(record: dict, name: str, field_type: type, default=None):
+    # Raises ValueError if the field is missing without a default, or has
+    # another type, so that it can be told apart from a bug
+    if name not in record and default is not None:
+        return default
+    value = record.get(name)
+    # bool is an int too, but not a level
+    if not isinstance(value, field_type) or (field_type is int and isinstance(value, bool)):
+        raise ValueError(f"Expected {name} to be a {field_type.__name__}, got {value!r}")
+    return value
+
+
+def _one_line(text: str) -> str:
+    # The save file has one line for each text, so the lines are joined like
+    # the subtitle lines in Markdown
+    if "\n" not in text and "\r" not in text:
+        return text
+    return " ".join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def _markdown_item(text: str) -> TodoItem:
+    text = text.strip()
+    collapsed = text.endswith(MARKDOWN_COLLAPSED_TEXT) or COLLAPSED_TEXT in text
+    complete = COMPLETE_TEXT in text
+    text = text.removesuffix(MARKDOWN_COLLAPSED_TEXT)
+    text = text.replace(COMPLETE_TEXT, "").replace(COLLAPSED_TEXT, "").strip()
+    return TodoItem(text=text, complete=complete, collapsed=collapsed)
+
+
+class _TreeBuilder:
+    # Each node is added below the last added node with a lower key,
+    # or at the top if there is none
+    def __init__(self):
+        self.root = TreeNode(TodoItem("root"), level=-1)
+        self._open_nodes: List[TreeNode] = [self.root]
+        self._open_keys = [None]
+
+    @property
+    def last_node(self) -> TreeNode:
+        return self._open_nodes[-1]
+
+    def add(self, item: TodoItem, key) -> TreeNode:
+        while len(self._open_nodes) > 1 and self._open_keys[-1] >= key:
+            self._open_nodes.pop()
+            self._open_keys.pop()
+        node = TreeNode(item)
+        self._open_nodes[-1].add_child(node)
+        self._open_nodes.append(node)
+        self._open_keys.append(key)
+        return node
@@ -1,10 +1,21 @@
 import argparse
 import atexit
+import time
 from pathlib import Path
 
 from listigt.config import config
+from listigt.import_export import exporters
+from listigt.import_export.importers import import_file
+from listigt.storage.autosave import Autosaver
+from listigt.storage.file_watcher import FileWatcher
+from listigt.storage.history import HistoryStore
+from listigt.storage.journal import Journal
+from listigt.storage.sharded_storage import ShardedStorage
+from listigt.storage.sqlite_storage import SqliteStorage
+from listigt.storage.storage import Storage, TextFileStorage, content_hash
 from listigt.todo_list.todo_list import TodoItem
 from listigt.todo_list.tree import TreeNode
+from listigt.todo_list.tree_diff import merge_trees
 from listigt.ui import ui
 from listigt.view_model import view_model
 from listigt.utils.optional import Optional
@@ -16,26 +27,218 @@ def main():
     config_manager = config.ConfigManager(
         save_file=Optional(args.save_file), config_file=Optional(args.config_file)
     )
-    tree = _read_saved_state(config_manager.save_file)
-    vm = view_model.ViewModel(tree_root=tree, config_manager=config_manager)
+    storage = create_storage(config_manager)
+    tree = storage.load()
+    journal = open_journal(storage)
+    if journal.has_value():
+        tree = recover_from_journal(tree, storage, journal.value())
+    if args.import_file:
+        _import_into_storage(args.import_file, tree, storage, journal)
+        return
+    if args.export_file:
+        exporters.export_to_path(tree, args.export_format, args.export_file)
+        journal.close()
+        return
+    vm = view_model.ViewModel(
+        tree_root=tree, config_manager=config_manager, storage=Optional.some(storage)
+    )
+
+    history = Optional.none()
+    if config_manager.history_enabled:
+        history = Optional.some(
+            HistoryStore(config_manager.history_directory, fsync=config_manager.fsync)
+        )
+        vm.add_change_listener(history.value())
+
+    def save():
+        vm.save_to_file()
+        if journal.has_value():
+            journal.value().reset(storage.content_hash)
+        if history.has_value():
+            history.value().record(vm.tree_root.root())
+
+    if journal.has_value():
+        journal.value().on_compact = Optional.some(save)
+        vm.add_change_listener(journal.value())
+    if vm.has_unsaved_ids:
+        # Otherwise the root and selection saved in the config refer to ids
+        # that only exist until the first edit is saved
+        save()
+
+    autosaver = Optional.none()
+    if config_manager.autosave_enabled:
+        autosaver = Optional.some(
+            _start_autosaver(config_manager, storage, vm, journal, history)
+        )
+
+    if _archive_is_due(config_manager):
+        with vm.lock:
+            vm.archive_completed()
+
+    def merge_into_tree(base: TreeNode, new_tree: TreeNode):
+        # Keeps the changes made here since base, on top of new_tree
+        ours = TreeNode.from_string(
+            storage.snapshot(vm.tree_root.root()), TodoItem.tree_node_from_str
+        )
+        vm.apply_external_changes(merge_trees(base, ours, new_tree))
+
+    def on_merged(saved_tree: TreeNode, merged_tree: TreeNode):
+        with vm.lock:
+            merge_into_tree(saved_tree, merged_tree)
+            if journal.has_value():
+                # The journal was checkpointed for the unmerged snapshot
+                journal.value().rebase(storage.content_hash, vm.tree_root.root())
+
+    if isinstance(storage, TextFileStorage):
+        storage.on_merged = Optional.some(on_merged)
+
+    def on_external_change(text: str):
+        new_tree = TreeNode.from_string(text, TodoItem.tree_node_from_str)
+        with vm.lock:
+            if config_manager.merge_on_save:
+                merge_into_tree(storage.base_tree(), new_tree)
+                storage.rebase(text)
+            else:
+                vm.apply_external_changes(new_tree)
+            # Get the save file and journal back in step with the tree
+            if autosaver.has_value():
+                autosaver.value().request_save()
+            else:
+                save()
+
+    watcher = Optional.none()
+    if isinstance(storage, TextFileStorage) and config_manager.watch_interval > 0:
+        watcher = Optional.some(
+            FileWatcher(
+                storage.save_file,
+                on_change=on_external_change,
+                known_hash=lambda: storage.content_hash,
+                interval=config_manager.watch_interval,
+            )
+        )
+        watcher.value().start()
 
     def exit_handler():
+        vm.save_state_to_config()
         config_manager.save_config()
-        vm.save_to_file()
+        watcher.stop()
+        autosaver.stop()
+        vm.stop_searches()
+        save()
+        journal.close()
 
     atexit.register(exit_handler)
 
     ui.start_ui(vm)
 
 
-def _read_saved_state(save_file: Path) -> TreeNode:
-    save_file.parent.mkdir(exist_ok=True)
+def create_storage(config_manager: config.ConfigManager) -> Storage:
+    if config_manager.storage_backend == "sqlite":
+        storage = SqliteStorage(config_manager.save_file)
+    elif config_manager.storage_backend == "sharded":
+        storage = ShardedStorage(
+            config_manager.save_file, shard_depth=config_manager.shard_depth
+        )
+    else:
+        return TextFileStorage(
+            config_manager.save_file, merge_on_save=config_manager.merge_on_save
+        )
+
+    text_save_file = config_manager.save_file.with_suffix("")
+    if storage.is_empty() and text_save_file.is_file():
+        # First start with a new backend, import the old text save file
+        tree = TextFileStorage(text_save_file).load()
+        storage.tree_replaced(tree)
+        storage.save(tree)
+    return storage
+
+
+def _start_autosaver(
+    config_manager: config.ConfigManager,
+    storage: Storage,
+    vm: view_model.ViewModel,
+    journal: Optional[Journal],
+    history: Optional[HistoryStore],
+) -> Autosaver:
+    autosaver = Autosaver(
+        storage,
+        tree_root=lambda: vm.tree_root.root(),
+        tree_lock=vm.lock,
+        idle_seconds=config_manager.autosave_idle_seconds,
+        max_edits=config_manager.autosave_max_edits,
+        fsync=config_manager.fsync,
+    )
+
+    history_snapshot = Optional.none()
+
+    def on_snapshot(snapshot):
+        nonlocal history_snapshot
+        if journal.has_value():
+            journal.value().checkpoint(content_hash(snapshot))
+        if history.has_value():
+            history_snapshot = Optional.some(history.value().snapshot(vm.tree_root.root()))
+
+    def on_saved(written):
+        # The journal only needs to keep what came in after the last autosave
+        if journal.has_value():
+            journal.value().compact(content_hash(written))
+        if history_snapshot.has_value():
+            try:
+                history.value().write_snapshot(history_snapshot.value())
+            except OSError:
+                # The next snapshot has all the objects again
+                pass
+
+    autosaver.on_snapshot = Optional.some(on_snapshot)
+    autosaver.on_saved = Optional.some(on_saved)
+    if journal.has_value():
+        journal.value().on_compact = Optional.some(autosaver.request_save)
+    vm.add_change_listener(autosaver)
+    autosaver.start()
+    return autosaver
 
-    if save_file.exists():
-        with open(save_file) as f:
-            return TreeNode.from_string(f.read(), TodoItem.tree_node_from_str)
 
-    return TreeNode.from_string("", TodoItem.tree_node_from_str)
+def open_journal(storage: Storage) -> Optional[Journal]:
+    # The other backends write each change as it happens, or only the parts
+    # that changed, so they have no use for a journal
+    if not isinstance(storage, TextFileStorage):
+        return Optional.none()
+    save_file = storage.save_file
+    return Optional.some(Journal(save_file.with_name(save_file.name + ".journal")))
+
+
+def recover_from_journal(tree: TreeNode, storage: TextFileStorage, journal: Journal) -> TreeNode:
+    tree = journal.replay(tree, storage.content_hash)
+    if journal.num_records > 0:
+        # Fold the recovered changes into the save file before starting over
+        storage.save(tree)
+    journal.reset(storage.content_hash)
+    return tree
+
+
+def _archive_is_due(config_manager: config.ConfigManager) -> bool:
+    if config_manager.archive_on_startup:
+        return True
+    if config_manager.archive_interval_days <= 0:
+        return False
+    seconds_since_archived = time.time() - config_manager.last_archived.value_or(0.0)
+    return seconds_since_archived >= config_manager.archive_interval_days * 24 * 60 * 60
+
+
+def _import_into_storage(
+    import_file_path: Path, tree: TreeNode, storage: Storage, journal: Optional[Journal]
+):
+    # Appends the imported items at the top level of the save file
+    imported_root = import_file(import_file_path)
+    for node in list(imported_root.children):
+        imported_root.remove_node(node)
+        tree.add_child(node)
+        node.update_level_to_parent()
+        storage.node_inserted(node)
+    storage.save(tree)
+    if journal.has_value():
+        journal.value().reset(storage.content_hash)
+    journal.close()
 
 
 def _parse_args():
@@ -54,7 +257,38 @@ def _parse_args():
         required=False,
         help=f"Config file to use. Will override the default, which is {config.ConfigManager().config_file}",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--import_file",
+        type=Path,
+        default=None,
+        required=False,
+        help="OPML, Markdown or JSON lines file to add to the end of the save file, "
+        "instead of starting listigt. The format is chosen by the file suffix.",
+    )
+    parser.add_argument(
+        "--export_file",
+        type=Path,
+        default=None,
+        required=False,
+        help="File to export the whole save file to, or - for stdout, "
+        "instead of starting listigt.",
+    )
+    parser.add_argument(
+        "--export_format",
+        choices=list(exporters.EXPORTERS),
+        default=None,
+        required=False,
+        help="Format for --export_file. Chosen by the file suffix if not given.",
+    )
+    args = parser.parse_args()
+    if args.export_file and not args.export_format:
+        if str(args.export_file) == "-":
+            parser.error("--export_format is needed to export to stdout")
+        try:
+            args.export_format = exporters.format_for_path(args.export_file)
+        except ValueError as e:
+            parser.error(f"{e}, give it with --export_format")
+    return args
 
 
 if __name__ == "__main__":
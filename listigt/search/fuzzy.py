@@ -0,0 +1,71 @@
+import heapq
+from dataclasses import dataclass
+from typing import Callable, List
+
+from listigt.todo_list.tree import TreeNode
+from listigt.utils.optional import Optional
+
+FUZZY_RESULT_LIMIT = 100
+BREADCRUMB_SEPARATOR = " > "
+WORD_START_BONUS = 3
+CONSECUTIVE_BONUS = 2
+OWN_TEXT_BONUS = 1
+# For the item changed most recently, less for the ones changed before it
+RECENCY_BONUS = 4
+# How many nodes to score between checks for a newer query
+CANCEL_CHECK_INTERVAL = 1000
+
+
+@dataclass
+class FuzzyEntry:
+    node: TreeNode
+    # Casefolded, like the search string
+    text: str
+    breadcrumbs: str
+    # From 0 for never changed to 1 for changed last
+    recency: float
+
+
+def fuzzy_score(search_string: str, text: str, breadcrumbs: str = "") -> int:
+    # Matches the characters of search_string in order, going backwards so
+    # that as many as possible are in text and the rest are in the texts of
+    # the items above it. Returns 0 if they don't all match, or the last one
+    # isn't in text, so that items don't match only through their parents.
+    target = breadcrumbs + BREADCRUMB_SEPARATOR + text if breadcrumbs else text
+    text_start = len(target) - len(text)
+    score = 0
+    end = len(target)
+    previous_match = -1
+    for char in reversed(search_string):
+        match = target.rfind(char, 0, end)
+        if match == -1 or (previous_match == -1 and match < text_start):
+            return 0
+        score += 1
+        if match >= text_start:
+            score += OWN_TEXT_BONUS
+        if match == 0 or not target[match - 1].isalnum():
+            score += WORD_START_BONUS
+        if match + 1 == previous_match:
+            score += CONSECUTIVE_BONUS
+        previous_match = match
+        end = match
+    return score
+
+
+def fuzzy_search(
+    entries: List[FuzzyEntry],
+    search_string: str,
+    is_cancelled: Callable[[], bool] = lambda: False,
+) -> Optional[List[TreeNode]]:
+    # The best matching nodes, best first, or none() if cancelled before
+    # it was done. Ties keep the order the nodes are listed in.
+    search_string = search_string.casefold()
+    scored = []
+    for index, entry in enumerate(entries):
+        if index % CANCEL_CHECK_INTERVAL == 0 and is_cancelled():
+            return Optional.none()
+        score = fuzzy_score(search_string, entry.text, entry.breadcrumbs)
+        if score > 0:
+            scored.append((score + RECENCY_BONUS * entry.recency, -index, entry.node))
+    best = heapq.nlargest(FUZZY_RESULT_LIMIT, scored, key=lambda scored_node: scored_node[:2])
+    return Optional.some([node for _, _, node in best])
@@ -0,0 +1,89 @@
+import functools
+import re
+from typing import List, Tuple
+
+# Start and end of each run of matched characters
+Spans = Tuple[Tuple[int, int], ...]
+
+# Enough for the search results on a few screens
+SPAN_CACHE_SIZE = 1024
+
+
+@functools.lru_cache(maxsize=SPAN_CACHE_SIZE)
+def match_spans(text: str, query: str, mode: str) -> Spans:
+    # Where query matches text in the search mode, worked out only for the
+    # results on screen since the search itself doesn't keep track of it.
+    # Cached by text, so an edited item gets its spans worked out again.
+    if mode == "regex":
+        try:
+            regex = re.compile(query, re.IGNORECASE)
+        except re.error:
+            return ()
+        return tuple(
+            match.span() for match in regex.finditer(text) if match.end() > match.start()
+        )
+
+    # Searched casefolded like the search does, so "strasse" finds "Straße",
+    # and mapped back to the characters of text
+    folded_text, origins = _casefold_with_origins(text)
+    if mode == "fuzzy":
+        spans = _fuzzy_spans(folded_text, query.casefold())
+    else:
+        spans = _exact_spans(folded_text, query.casefold())
+    return _original_spans(spans, origins)
+
+
+def _casefold_with_origins(text: str) -> Tuple[str, List[int]]:
+    # The casefolded text, and for each of its characters the index of the
+    # character in text it came from
+    folded = []
+    origins = []
+    for index, char in enumerate(text):
+        folded_char = char.casefold()
+        folded.append(folded_char)
+        origins += [index] * len(folded_char)
+    return "".join(folded), origins
+
+
+def _original_spans(spans: Spans, origins: List[int]) -> Spans:
+    original = []
+    for start, end in spans:
+        start, end = origins[start], origins[end - 1] + 1
+        if original and original[-1][1] >= start:
+            original[-1] = (original[-1][0], max(original[-1][1], end))
+        else:
+            original.append((start, end))
+    return tuple(original)
+
+
+def _exact_spans(text: str, query: str) -> Spans:
+    if not query:
+        return ()
+    spans = []
+    start = text.find(query)
+    while start != -1:
+        spans.append((start, start + len(query)))
+        start = text.find(query, start + len(query))
+    return tuple(spans)
+
+
+def _fuzzy_spans(text: str, query: str) -> Spans:
+    # The characters that fuzzy_score matches in the text of the item
+    # itself. It matches backwards, so the ones it found in the texts above
+    # the item are the ones left when text runs out.
+    positions = []
+    end = len(text)
+    for char in reversed(query):
+        match = text.rfind(char, 0, end)
+        if match == -1:
+            break
+        positions.append(match)
+        end = match
+
+    spans = []
+    for position in reversed(positions):
+        if spans and spans[-1][1] == position:
+            spans[-1] = (spans[-1][0], position + 1)
+        else:
+            spans.append((position, position + 1))
+    return tuple(spans)
@@ -0,0 +1,120 @@
+import concurrent.futures
+import multiprocessing
+import os
+import re
+from dataclasses import dataclass
+from typing import Callable, List
+
+from listigt.todo_list.tree import TreeNode
+from listigt.utils.optional import Optional
+
+# Below this many items, starting processes and sending them the texts takes
+# longer than searching in this one
+PARALLEL_SEARCH_MIN_ITEMS = 50000
+# How often to check for a newer query while waiting for the processes
+CANCEL_CHECK_SECONDS = 0.02
+# How many lines to search in this process between checks for a newer query
+CANCEL_CHECK_LINES = 1000
+LINE_SEPARATOR = "\n"
+
+
+@dataclass
+class Shard:
+    # A run of nodes in the order they are listed, and their texts on one
+    # line each, which is quick to send to another process
+    nodes: List[TreeNode]
+    text: str
+
+
+def search_lines(text: str, pattern: str) -> List[int]:
+    # The numbers of the lines in text that pattern matches, ignoring case
+    regex = re.compile(pattern, re.IGNORECASE)
+    return [
+        line_number
+        for line_number, line in enumerate(text.split(LINE_SEPARATOR))
+        if regex.search(line)
+    ]
+
+
+def _search_lines_until_cancelled(
+    text: str, pattern: str, is_cancelled: Callable[[], bool]
+) -> Optional[List[int]]:
+    # Like search_lines, but stops with none() once is_cancelled() is true
+    regex = re.compile(pattern, re.IGNORECASE)
+    line_numbers = []
+    for line_number, line in enumerate(text.split(LINE_SEPARATOR)):
+        if line_number % CANCEL_CHECK_LINES == 0 and is_cancelled():
+            return Optional.none()
+        if regex.search(line):
+            line_numbers.append(line_number)
+    return Optional.some(line_numbers)
+
+
+class ParallelSearcher:
+    # Searches the shards of a big tree in a pool of processes, which is
+    # started on the first big search and kept for the ones after it.
+    # Raises re.error for patterns that don't compile.
+    def __init__(self, max_workers: int = 0):
+        self._max_workers = max_workers or os.cpu_count() or 1
+        self._executor: Optional[concurrent.futures.ProcessPoolExecutor] = Optional.none()
+
+    @property
+    def num_shards(self) -> int:
+        return self._max_workers
+
+    def search(
+        self,
+        shards: List[Shard],
+        pattern: str,
+        is_cancelled: Callable[[], bool] = lambda: False,
+    ) -> Optional[List[TreeNode]]:
+        # The matching nodes in the order of the shards, or none() if
+        # cancelled before they were all searched
+        re.compile(pattern)
+        shards = [shard for shard in shards if shard.nodes]
+        if sum(len(shard.nodes) for shard in shards) < PARALLEL_SEARCH_MIN_ITEMS:
+            line_numbers = []
+            for shard in shards:
+                shard_line_numbers = _search_lines_until_cancelled(
+                    shard.text, pattern, is_cancelled
+                )
+                if shard_line_numbers.is_none():
+                    return Optional.none()
+                line_numbers.append(shard_line_numbers.value())
+        else:
+            futures = [
+                self._pool().submit(search_lines, shard.text, pattern) for shard in shards
+            ]
+            while True:
+                _, not_done = concurrent.futures.wait(futures, timeout=CANCEL_CHECK_SECONDS)
+                if is_cancelled():
+                    for future in not_done:
+                        future.cancel()
+                    return Optional.none()
+                if not not_done:
+                    break
+            line_numbers = [future.result() for future in futures]
+
+        return Optional.some(
+            [
+                shard.nodes[line_number]
+                for shard, shard_line_numbers in zip(shards, line_numbers)
+                for line_number in shard_line_numbers
+            ]
+        )
+
+    def shutdown(self):
+        if executor := self._executor.value_or_none():
+            executor.shutdown()
+            self._executor = Optional.none()
+
+    def _pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        if self._executor.is_none():
+            # Forking could copy locks held by the other threads
+            self._executor = Optional.some(
+                concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self._max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            )
+        return self._executor.value()
@@ -0,0 +1,217 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+from listigt.search.fuzzy import BREADCRUMB_SEPARATOR, FuzzyEntry
+from listigt.search.parallel import LINE_SEPARATOR, Shard
+from listigt.search.text_buffer import ListedTexts, TextBuffer, listed_texts
+from listigt.search.trigram_index import TrigramIndex
+from listigt.todo_list.change_listener import ChangeListener
+from listigt.todo_list.tree import TreeNode
+from listigt.utils.optional import Optional
+
+# Nodes added to the trigram index between checks for a newer search
+PREPARE_BATCH_SIZE = 10000
+
+
+@dataclass
+class PreparedSearch:
+    trigram_index: TrigramIndex
+    text_buffer: TextBuffer
+    # The tree version the texts were copied at
+    version: int
+
+
+class SearchEngine(ChangeListener):
+    # Finds the items below a node whose text contains a string, ignoring
+    # case. Strings of three characters or more are looked up in a trigram
+    # index, so only the items that can match are checked. Shorter ones are
+    # found in a buffer with all the texts. Both are made on the first
+    # search that needs them, so starting up doesn't wait for them.
+    def __init__(self):
+        self._trigram_index: Optional[TrigramIndex] = Optional.none()
+        self._text_buffer: Optional[TextBuffer] = Optional.none()
+        self._fuzzy_root: Optional[TreeNode] = Optional.none()
+        self._fuzzy_entries: List[FuzzyEntry] = []
+        self._shards_root: Optional[TreeNode] = Optional.none()
+        self._shards: List[Shard] = []
+        # The texts that the fuzzy entries and shards were made with
+        self._copied_texts: Dict[TreeNode, str] = {}
+        # When each node was last changed, counted in changes
+        self._last_changed: Dict[TreeNode, int] = {}
+        self._num_changes = 0
+        # Counts every change reported, including removals
+        self._version = 0
+
+    def is_prepared(self) -> bool:
+        return self._trigram_index.has_value() and self._text_buffer.has_value()
+
+    def copy_texts(self, tree_root: TreeNode) -> Tuple[ListedTexts, int]:
+        # The texts for prepare() and the tree version they are from, copied
+        # while the tree can't change
+        return listed_texts(tree_root), self._version
+
+    def prepare(
+        self, texts: ListedTexts, version: int, is_cancelled: Callable[[], bool]
+    ) -> Optional[PreparedSearch]:
+        # Makes the index and the buffer from copied texts, so that it can be
+        # done without holding the lock, instead of on the first search that
+        # needs them. Returns none() if cancelled.
+        trigram_index = TrigramIndex()
+        for start in range(0, len(texts.nodes), PREPARE_BATCH_SIZE):
+            if is_cancelled():
+                return Optional.none()
+            end = start + PREPARE_BATCH_SIZE
+            trigram_index.add_texts(texts.nodes[start:end], texts.texts[start:end])
+        if is_cancelled():
+            return Optional.none()
+        return Optional.some(PreparedSearch(trigram_index, TextBuffer(texts), version))
+
+    def set_prepared(self, prepared: PreparedSearch) -> bool:
+        # False if the tree has changed since the texts were copied
+        if prepared.version != self._version:
+            return False
+        self._trigram_index = Optional.some(prepared.trigram_index)
+        self._text_buffer = Optional.some(prepared.text_buffer)
+        return True
+
+    def search(self, tree_root: TreeNode, search_string: str) -> Iterator[TreeNode]:
+        # The matching nodes below tree_root, in the order they are listed
+        search_string = search_string.casefold()
+        candidates = self._index(tree_root).candidates(search_string)
+        if candidates.is_none():
+            return self._buffer(tree_root).search(tree_root, search_string)
+
+        return in_tree_order(
+            node
+            for node in candidates.value()
+            if search_string in node.data.text.casefold() and _is_below(node, tree_root)
+        )
+
+    def fuzzy_entries(self, tree_root: TreeNode) -> List[FuzzyEntry]:
+        # What fuzzy_search needs to know about the nodes below tree_root.
+        # Made while the tree can't change, so that the search can then run
+        # on another thread. The list is not changed afterwards.
+        if self._fuzzy_root.value_or_none() is not tree_root:
+            self._fuzzy_root = Optional.some(tree_root)
+            self._fuzzy_entries = []
+            num_changes = max(self._num_changes, 1)
+
+            def add(node: TreeNode, breadcrumbs: str):
+                self._copied_texts[node] = node.data.text
+                text = node.data.text.casefold()
+                self._fuzzy_entries.append(
+                    FuzzyEntry(node, text, breadcrumbs, self._last_changed.get(node, 0) / num_changes)
+                )
+                child_breadcrumbs = breadcrumbs + BREADCRUMB_SEPARATOR + text if breadcrumbs else text
+                for child in node.children:
+                    add(child, child_breadcrumbs)
+
+            for child in tree_root.children:
+                add(child, "")
+        return self._fuzzy_entries
+
+    def shards(self, tree_root: TreeNode, num_shards: int) -> List[Shard]:
+        # The nodes below tree_root split into num_shards runs of about the
+        # same size, for ParallelSearcher. Like fuzzy_entries, made while the
+        # tree can't change and not changed afterwards.
+        if self._shards_root.value_or_none() is not tree_root or len(self._shards) != num_shards:
+            self._shards_root = Optional.some(tree_root)
+            nodes = list(tree_root.gen_all_nodes())
+            texts = [node.data.text for node in nodes]
+            self._copied_texts.update(zip(nodes, texts))
+            shard_size = -(-len(nodes) // num_shards)
+            self._shards = [
+                Shard(
+                    nodes[i * shard_size : (i + 1) * shard_size],
+                    LINE_SEPARATOR.join(texts[i * shard_size : (i + 1) * shard_size]),
+                )
+                for i in range(num_shards)
+            ]
+        return self._shards
+
+    def node_inserted(self, node: TreeNode):
+        self._version += 1
+        self._changed(node)
+        self._drop_copies()
+        self._text_buffer = Optional.none()
+        if trigram_index := self._trigram_index.value_or_none():
+            trigram_index.node_inserted(node)
+
+    def node_removed(self, node: TreeNode, old_parent: TreeNode, old_index: int):
+        self._version += 1
+        for subtree_node in [node, *node.gen_all_nodes()]:
+            self._last_changed.pop(subtree_node, None)
+        self._drop_copies()
+        self._text_buffer = Optional.none()
+        if trigram_index := self._trigram_index.value_or_none():
+            trigram_index.node_removed(node, old_parent, old_index)
+
+    def node_changed(self, node: TreeNode):
+        # Most changes are to complete or collapse an item, which can't
+        # change the search results
+        self._version += 1
+        self._changed(node)
+        if self._copied_texts.get(node, node.data.text) != node.data.text:
+            self._drop_copies()
+        if text_buffer := self._text_buffer.value_or_none():
+            if not text_buffer.has_text(node):
+                self._text_buffer = Optional.none()
+        if trigram_index := self._trigram_index.value_or_none():
+            trigram_index.node_changed(node)
+
+    def tree_replaced(self, tree_root: TreeNode):
+        # Made again when they are next needed
+        self._version += 1
+        self._trigram_index = Optional.none()
+        self._text_buffer = Optional.none()
+        self._drop_copies()
+        self._last_changed.clear()
+
+    def _drop_copies(self):
+        # Made again when they are next needed
+        self._fuzzy_root = Optional.none()
+        self._shards_root = Optional.none()
+        self._copied_texts.clear()
+
+    def _index(self, tree_root: TreeNode) -> TrigramIndex:
+        if self._trigram_index.is_none():
+            self._trigram_index = Optional.some(TrigramIndex())
+            self._trigram_index.value().add_tree(tree_root.root())
+        return self._trigram_index.value()
+
+    def _buffer(self, tree_root: TreeNode) -> TextBuffer:
+        if self._text_buffer.is_none():
+            self._text_buffer = Optional.some(TextBuffer(listed_texts(tree_root)))
+        return self._text_buffer.value()
+
+    def _changed(self, node: TreeNode):
+        self._num_changes += 1
+        self._last_changed[node] = self._num_changes
+
+
+def in_tree_order(nodes: Iterable[TreeNode]) -> List[TreeNode]:
+    # Sorts by the path of child indices from the top, looking up the
+    # position of each child only once per parent
+    child_indices: Dict[TreeNode, Dict[int, int]] = {}
+
+    def path(node: TreeNode) -> Tuple[int, ...]:
+        indices = []
+        while parent := node.parent.value_or_none():
+            if parent not in child_indices:
+                child_indices[parent] = dict(
+                    zip(map(id, parent.children), range(len(parent.children)))
+                )
+            indices.append(child_indices[parent][id(node)])
+            node = parent
+        return tuple(reversed(indices))
+
+    return sorted(nodes, key=path)
+
+
+def _is_below(node: TreeNode, tree_root: TreeNode) -> bool:
+    # Indexed nodes are all in the tree, so following the parents is enough
+    while parent := node.parent.value_or_none():
+        if parent is tree_root:
+            return True
+        node = parent
+    return False
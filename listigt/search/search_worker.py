@@ -0,0 +1,78 @@
+import threading
+import time
+from typing import Callable
+
+from listigt.utils.optional import Optional
+
+# Called with a function that tells if the job has been replaced by a newer one
+Job = Callable[[Callable[[], bool]], None]
+
+
+class SearchWorker:
+    # Runs search jobs one at a time on a worker thread. Only the latest job
+    # is kept: submitting a new one cancels the one that is running, which
+    # should then stop and drop its results. A job can be given a delay, so
+    # that when jobs come in quickly only the last one is run.
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._job: Optional[Job] = Optional.none()
+        self._start_time = 0.0
+        self._generation = 0
+        self._running = False
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = Optional.none()
+
+    def submit(self, job: Job, delay: float = 0.0):
+        with self._condition:
+            self._generation += 1
+            self._job = Optional.some(job)
+            self._start_time = time.monotonic() + delay
+            self._condition.notify_all()
+            if self._thread.is_none():
+                self._thread = Optional.some(threading.Thread(target=self._run, daemon=True))
+                self._thread.value().start()
+
+    def cancel(self):
+        with self._condition:
+            self._generation += 1
+            self._job = Optional.none()
+            self._condition.notify_all()
+
+    def wait_until_idle(self, timeout: float = None) -> bool:
+        # False if there was still a job waiting or running after timeout
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._job.is_none() and not self._running, timeout
+            )
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._generation += 1
+            self._condition.notify_all()
+        if thread := self._thread.value_or_none():
+            thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    if self._job.is_none():
+                        self._condition.wait()
+                    elif (seconds_left := self._start_time - time.monotonic()) > 0:
+                        self._condition.wait(seconds_left)
+                    else:
+                        break
+                if self._stopped:
+                    return
+                job = self._job.value()
+                generation = self._generation
+                self._job = Optional.none()
+                self._running = True
+
+            try:
+                job(lambda: self._generation != generation)
+            finally:
+                with self._condition:
+                    self._running = False
+                    self._condition.notify_all()
@@ -0,0 +1,104 @@
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Iterator, List
+
+from listigt.todo_list.tree import TreeNode
+
+SEPARATOR = "\n"
+
+
+@dataclass
+class ListedTexts:
+    # The nodes below the top root in the order they are listed, with their
+    # texts. Copied while the tree can't change, so that a TextBuffer and a
+    # TrigramIndex can then be made from it on another thread.
+    nodes: List[TreeNode]
+    texts: List[str]
+    # The index after the last node below each node
+    subtree_ends: List[int]
+
+
+def listed_texts(tree_root: TreeNode) -> ListedTexts:
+    listed = ListedTexts(nodes=[], texts=[], subtree_ends=[])
+
+    def add(node: TreeNode):
+        index = len(listed.nodes)
+        listed.nodes.append(node)
+        listed.texts.append(node.data.text)
+        listed.subtree_ends.append(0)
+        for child in node.children:
+            add(child)
+        listed.subtree_ends[index] = len(listed.nodes)
+
+    for child in tree_root.root().children:
+        add(child)
+    return listed
+
+
+class TextBuffer:
+    # The casefolded texts of all items joined into one string, in the order
+    # they are listed, so that a search is a few str.find calls instead of a
+    # Python loop over the nodes. Made again after the tree changes.
+    def __init__(self, listed: ListedTexts):
+        self._nodes = listed.nodes
+        self._subtree_ends = listed.subtree_ends
+        texts = [text.casefold() for text in listed.texts]
+        # Where the text of each node starts in the buffer
+        self._offsets: List[int] = []
+        offset = 0
+        for text in texts:
+            self._offsets.append(offset)
+            offset += len(text) + len(SEPARATOR)
+        self._text = SEPARATOR.join(texts)
+
+    def search(self, tree_root: TreeNode, search_string: str) -> Iterator[TreeNode]:
+        # The nodes below tree_root with search_string in their text, in the
+        # order they are listed. Found as they are asked for.
+        search_string = search_string.casefold()
+        if tree_root.parent.is_none():
+            first, last = 0, len(self._nodes)
+        else:
+            index = self._index_of(tree_root)
+            first, last = index + 1, self._subtree_ends[index]
+        if first == last:
+            return
+
+        end = self._offset(last)
+        position = self._text.find(search_string, self._offset(first), end)
+        while position != -1:
+            index = bisect_right(self._offsets, position) - 1
+            yield self._nodes[index]
+            position = self._text.find(search_string, self._offset(index + 1), end)
+
+    def has_text(self, node: TreeNode) -> bool:
+        # If node is in the buffer with its current text
+        if node.parent.is_none():
+            # The top node has no text in the buffer
+            return True
+        index = self._index_of(node)
+        start = self._offsets[index]
+        return self._text[start : self._offset(index + 1) - len(SEPARATOR)] == (
+            node.data.text.casefold()
+        )
+
+    def _offset(self, index: int) -> int:
+        if index < len(self._offsets):
+            return self._offsets[index]
+        return len(self._text) + len(SEPARATOR)
+
+    def _index_of(self, node: TreeNode) -> int:
+        # Steps over the subtrees of the siblings before node and each of
+        # its parents, going down from the top
+        path = []
+        while parent := node.parent.value_or_none():
+            path.append((parent, node))
+            node = parent
+
+        index = -1
+        for parent, child in reversed(path):
+            index += 1
+            for sibling in parent.children:
+                if sibling is child:
+                    break
+                index = self._subtree_ends[index]
+        return index
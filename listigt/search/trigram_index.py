@@ -0,0 +1,86 @@
+from collections import defaultdict
+from typing import Dict, List, Set
+
+from listigt.todo_list.change_listener import ChangeListener
+from listigt.todo_list.tree import TreeNode
+from listigt.utils.optional import Optional
+
+TRIGRAM_LENGTH = 3
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i : i + TRIGRAM_LENGTH] for i in range(len(text) - TRIGRAM_LENGTH + 1)}
+
+
+class TrigramIndex(ChangeListener):
+    # Maps every three characters in the casefolded item texts to the nodes
+    # that have them. A text that contains a string has all of its trigrams,
+    # so only the nodes in all of those posting lists need to be checked.
+    def __init__(self):
+        self._postings: Dict[str, Set[TreeNode]] = defaultdict(set)
+        # What each node was indexed with, to find its postings after an edit
+        self._indexed_texts: Dict[TreeNode, str] = {}
+
+    def add_tree(self, tree_root: TreeNode):
+        for node in tree_root.root().gen_all_nodes():
+            self._add(node, node.data.text)
+
+    def add_texts(self, nodes: List[TreeNode], texts: List[str]):
+        # Like add_tree, with texts copied from the nodes earlier
+        for node, text in zip(nodes, texts):
+            self._add(node, text)
+
+    def candidates(self, search_string: str) -> Optional[Set[TreeNode]]:
+        # The nodes that can have search_string in their text, or none() if
+        # it is too short to be looked up
+        search_trigrams = trigrams(search_string.casefold())
+        if not search_trigrams:
+            return Optional.none()
+
+        postings = []
+        for trigram in search_trigrams:
+            if trigram not in self._postings:
+                return Optional.some(set())
+            postings.append(self._postings[trigram])
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+        return Optional.some(candidates)
+
+    def __len__(self) -> int:
+        return len(self._indexed_texts)
+
+    def node_inserted(self, node: TreeNode):
+        for subtree_node in [node, *node.gen_all_nodes()]:
+            self._add(subtree_node, subtree_node.data.text)
+
+    def node_removed(self, node: TreeNode, old_parent: TreeNode, old_index: int):
+        for subtree_node in [node, *node.gen_all_nodes()]:
+            self._remove(subtree_node)
+
+    def node_changed(self, node: TreeNode):
+        if self._indexed_texts.get(node) != node.data.text.casefold():
+            self._remove(node)
+            self._add(node, node.data.text)
+
+    def tree_replaced(self, tree_root: TreeNode):
+        self._postings.clear()
+        self._indexed_texts.clear()
+        self.add_tree(tree_root)
+
+    def _add(self, node: TreeNode, text: str):
+        text = text.casefold()
+        self._indexed_texts[node] = text
+        for trigram in trigrams(text):
+            self._postings[trigram].add(node)
+
+    def _remove(self, node: TreeNode):
+        text = self._indexed_texts.pop(node, None)
+        if text is None:
+            return
+        for trigram in trigrams(text):
+            posting = self._postings[trigram]
+            posting.discard(node)
+            if not posting:
+                del self._postings[trigram]
@@ -0,0 +1,120 @@
+from pathlib import Path
+from typing import List
+
+from listigt.storage.storage import TextFileStorage
+from listigt.todo_list.todo_list import TodoItem, gen_subtree_lines, subtree_from_str
+from listigt.todo_list.tree import TreeNode
+from listigt.utils.optional import Optional
+
+
+class Archive:
+    # A save file for completed subtrees that were moved out of the working
+    # tree. Each one is kept below items with the texts of its ancestors,
+    # so it can be found by its original breadcrumb path and put back there.
+    def __init__(self, archive_file: Path):
+        self._storage = TextFileStorage(archive_file)
+
+    @property
+    def archive_file(self) -> Path:
+        return self._storage.save_file
+
+    def add(self, nodes: List[TreeNode]):
+        # Copies nodes into the archive, they are still in the working tree
+        archive_root = self._storage.load()
+        for node in nodes:
+            archived = subtree_from_str("\n".join(gen_subtree_lines(node))).value()
+            insert_at_breadcrumbs(archive_root, breadcrumbs(node)[:-1], archived)
+        self._storage.save(archive_root)
+
+    def search(self, search_string: str) -> List[List[str]]:
+        # Breadcrumb paths of the archived items with search_string in them
+        search_string = search_string.lower()
+        return [
+            breadcrumbs(node)
+            for node in self._storage.load().gen_all_nodes()
+            if search_string in node.data.text.lower()
+        ]
+
+    def find(self, path: List[str]) -> Optional[TreeNode]:
+        # The item at path, still in the archive until remove() is called.
+        # Kept apart, so that it can be written to the save file first.
+        return node_at_breadcrumbs(self._storage.load(), path)
+
+    def remove(self, path: List[str]):
+        # Removes the item at path from the archive, along with the items
+        # above it that have nothing else archived below them
+        archive_root = self._storage.load()
+        node = node_at_breadcrumbs(archive_root, path)
+        if node.is_none():
+            return
+
+        parent = node.value().parent.value()
+        parent.remove_node(node.value())
+        while parent.parent.has_value() and not parent.has_children():
+            grandparent = parent.parent.value()
+            grandparent.remove_node(parent)
+            parent = grandparent
+        self._storage.save(archive_root)
+
+
+def completed_subtrees(tree_root: TreeNode, keep: TreeNode) -> List[TreeNode]:
+    # The topmost items whose whole subtree is complete, apart from keep and
+    # the items above it
+    fully_complete = {}
+
+    def visit(node: TreeNode) -> bool:
+        children_complete = [visit(child) for child in node.children]
+        fully_complete[node] = node.data.complete and all(children_complete)
+        return fully_complete[node]
+
+    visit(tree_root)
+
+    subtrees = []
+
+    def collect(node: TreeNode):
+        for child in node.children:
+            if fully_complete[child] and child != keep and not keep.is_descendant_of(child):
+                subtrees.append(child)
+            else:
+                collect(child)
+
+    collect(tree_root)
+    return subtrees
+
+
+def insert_at_breadcrumbs(tree_root: TreeNode, parent_path: List[str], node: TreeNode) -> TreeNode:
+    # Adds node below the item at parent_path, creating the items on the way
+    # that don't exist. Returns the topmost item that was added.
+    parent = tree_root
+    first_created: Optional[TreeNode] = Optional.none()
+    for text in parent_path:
+        child = node_at_breadcrumbs(parent, [text]).value_or_none()
+        if child is None:
+            child = TreeNode(TodoItem(text))
+            parent.add_child(child)
+            if first_created.is_none():
+                first_created = Optional.some(child)
+        parent = child
+    parent.add_child(node)
+    top_node = first_created.value_or(node)
+    top_node.update_level_to_parent()
+    return top_node
+
+
+def breadcrumbs(node: TreeNode) -> List[str]:
+    texts = []
+    while parent := node.parent.value_or_none():
+        texts.append(node.data.text)
+        node = parent
+    return list(reversed(texts))
+
+
+def node_at_breadcrumbs(tree_root: TreeNode, path: List[str]) -> Optional[TreeNode]:
+    # The first item with each text, going down from tree_root
+    node = tree_root
+    for text in path:
+        matching = [child for child in node.children if child.data.text == text]
+        if not matching:
+            return Optional.none()
+        node = matching[0]
+    return Optional.some(node)
@@ -0,0 +1,112 @@
+import threading
+import time
+from typing import Any, Callable, ContextManager
+
+from listigt.storage.storage import Storage
+from listigt.todo_list.change_listener import ChangeListener
+from listigt.todo_list.tree import TreeNode
+from listigt.utils.optional import Optional
+
+
+class Autosaver(ChangeListener):
+    # Saves on a worker thread once there has been no change for idle_seconds,
+    # or when max_edits changes have piled up. The snapshot is taken while
+    # holding tree_lock, the writing and what comes after is done without it.
+    def __init__(
+        self,
+        storage: Storage,
+        tree_root: Callable[[], TreeNode],
+        tree_lock: ContextManager,
+        idle_seconds: float = 2.0,
+        max_edits: int = 50,
+        fsync: bool = True,
+    ):
+        self._storage = storage
+        self._tree_root = tree_root
+        self._tree_lock = tree_lock
+        self._idle_seconds = idle_seconds
+        self._max_edits = max_edits
+        self._fsync = fsync
+        self._condition = threading.Condition()
+        self._num_edits = 0
+        self._last_edit = time.monotonic()
+        self._save_requested = False
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        # Called with the snapshot, while still holding tree_lock
+        self.on_snapshot: Optional[Callable[[Any], None]] = Optional.none()
+        # Called with what was written, which differs from the snapshot if it
+        # was merged, without tree_lock so that the tree can be edited meanwhile
+        self.on_saved: Optional[Callable[[Any], None]] = Optional.none()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def request_save(self):
+        with self._condition:
+            self._save_requested = True
+            self._condition.notify()
+
+    def node_inserted(self, node: TreeNode):
+        self._register_edit()
+
+    def node_removed(self, node: TreeNode, old_parent: TreeNode, old_index: int):
+        self._register_edit()
+
+    def node_changed(self, node: TreeNode):
+        self._register_edit()
+
+    def tree_replaced(self, tree_root: TreeNode):
+        self._register_edit()
+
+    def _register_edit(self):
+        with self._condition:
+            self._num_edits += 1
+            self._last_edit = time.monotonic()
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._should_save():
+                    if self._stopped:
+                        return
+                    self._condition.wait(self._seconds_until_idle())
+                self._num_edits = 0
+                self._save_requested = False
+            self._save()
+
+    def _should_save(self) -> bool:
+        if self._save_requested:
+            return True
+        if self._num_edits == 0:
+            return False
+        return self._num_edits >= self._max_edits or self._seconds_until_idle() == 0
+
+    def _seconds_until_idle(self) -> float | None:
+        if self._num_edits == 0:
+            return None
+        return max(0.0, self._last_edit + self._idle_seconds - time.monotonic())
+
+    def _save(self):
+        with self._tree_lock:
+            snapshot = self._storage.snapshot(self._tree_root())
+            if on_snapshot := self.on_snapshot.value_or_none():
+                on_snapshot(snapshot)
+
+        try:
+            written = self._storage.write_snapshot(snapshot, self._fsync)
+        except OSError:
+            # Try again after the next idle period
+            self._register_edit()
+            return
+
+        if on_saved := self.on_saved.value_or_none():
+            on_saved(written)
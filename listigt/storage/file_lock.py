@@ -0,0 +1,43 @@
+from pathlib import Path
+from typing import IO
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+from listigt.utils.optional import Optional
+
+
+class FileLock:
+    # Advisory lock shared by all listigt processes using the same lock file.
+    # Without fcntl or msvcrt it does nothing.
+    def __init__(self, path: Path):
+        self._path = path
+        self._file: Optional[IO] = Optional.none()
+
+    def __enter__(self) -> "FileLock":
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        file = open(self._path, "a+")
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+        self._file = Optional.some(file)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        file = self._file.value()
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+        elif msvcrt is not None:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        file.close()
+        self._file = Optional.none()
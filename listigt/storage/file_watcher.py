@@ -0,0 +1,66 @@
+import os
+import threading
+from pathlib import Path
+from typing import Callable
+
+from listigt.storage.storage import content_hash
+
+
+class FileWatcher:
+    # Polls path for changes, so that it works the same on every platform.
+    # A cheap stat() is done on every poll, and the file is only read and
+    # hashed when its modification time or size has changed.
+    def __init__(
+        self,
+        path: Path,
+        on_change: Callable[[str], None],
+        known_hash: Callable[[], str],
+        interval: float = 1.0,
+    ):
+        self._path = path
+        self._on_change = on_change
+        # Hash of the contents this process already has, e.g. from its own save
+        self._known_hash = known_hash
+        self._interval = interval
+        self._last_stat = self._stat()
+        self._last_hash = known_hash()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def poll(self):
+        stat = self._stat()
+        if stat == self._last_stat:
+            return
+        self._last_stat = stat
+
+        try:
+            with open(self._path) as f:
+                text = f.read()
+        except FileNotFoundError:
+            return
+
+        text_hash = content_hash(text)
+        if text_hash in (self._last_hash, self._known_hash()):
+            self._last_hash = text_hash
+            return
+        self._last_hash = text_hash
+        self._on_change(text)
+
+    def _run(self):
+        while not self._stopped.wait(self._interval):
+            self.poll()
+
+    def _stat(self) -> tuple | None:
+        try:
+            stat = os.stat(self._path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
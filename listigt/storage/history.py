@@ -0,0 +1,219 @@
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Dict, List
+
+from listigt.todo_list.change_listener import ChangeListener
+from listigt.todo_list.todo_list import TodoItem
+from listigt.todo_list.tree import TreeNode
+from listigt.utils.optional import Optional
+
+
+@dataclass
+class Version:
+    id: int
+    tree_hash: str
+    time: float
+
+
+@dataclass
+class HistorySnapshot:
+    tree_hash: str
+    # The objects hashed for this snapshot, some of them may be stored already
+    objects: Dict[str, str]
+
+
+class HistoryStore(ChangeListener):
+    # Versions of the tree, stored like git stores trees: every node is an
+    # object named by the hash of its data and its children's hashes, so
+    # subtrees that didn't change between versions are stored only once.
+    # The hash of each node is cached until a change below it is reported,
+    # so a snapshot only visits the paths to changed nodes. Like Storage, the
+    # snapshot is taken holding the tree lock and written without it. The
+    # objects of a version are appended to one pack file in one write.
+    def __init__(self, directory: Path, fsync: bool = False):
+        self._directory = directory
+        self._fsync = fsync
+        self._hashes: Dict[TreeNode, str] = {}
+        # Set until a snapshot is written, the objects of one that never got
+        # written may be in the cache and have to be hashed again
+        self._rehash_all = False
+        self._latest_version: Optional[Version] = Optional.none()
+        # Offset of each object in the pack file, read when first needed
+        self._pack_offsets: Optional[Dict[str, int]] = Optional.none()
+        self._pack_end = 0
+
+    @property
+    def directory(self) -> Path:
+        return self._directory
+
+    def record(self, tree_root: TreeNode) -> Optional[Version]:
+        return self.write_snapshot(self.snapshot(tree_root))
+
+    def snapshot(self, tree_root: TreeNode) -> HistorySnapshot:
+        if self._rehash_all:
+            self._hashes.clear()
+        self._rehash_all = True
+        objects: Dict[str, str] = {}
+        return HistorySnapshot(tree_hash=self._hash(tree_root, objects), objects=objects)
+
+    def write_snapshot(self, snapshot: HistorySnapshot) -> Optional[Version]:
+        # Returns the new version, or none() if the tree is the same as in
+        # the latest version
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._store_objects(snapshot.objects)
+        self._rehash_all = False
+        if self._latest_version.is_none():
+            versions = self.versions()
+            if versions:
+                self._latest_version = Optional.some(versions[-1])
+        latest_version = self._latest_version.value_or_none()
+        if latest_version and latest_version.tree_hash == snapshot.tree_hash:
+            return Optional.none()
+
+        version_id = latest_version.id + 1 if latest_version else 1
+        version = Version(id=version_id, tree_hash=snapshot.tree_hash, time=time.time())
+        with open(self._versions_file, "a") as f:
+            f.write(json.dumps({"hash": version.tree_hash, "time": version.time}) + "\n")
+            f.flush()
+            if self._fsync:
+                os.fsync(f.fileno())
+        self._latest_version = Optional.some(version)
+        return Optional.some(version)
+
+    def versions(self) -> List[Version]:
+        if not self._versions_file.exists():
+            return []
+
+        versions = []
+        with open(self._versions_file) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn write at the end, stop here
+                    break
+                versions.append(
+                    Version(id=len(versions) + 1, tree_hash=record["hash"], time=record["time"])
+                )
+        return versions
+
+    def version(self, version_id: int) -> Optional[Version]:
+        versions = self.versions()
+        if 1 <= version_id <= len(versions):
+            return Optional.some(versions[version_id - 1])
+        return Optional.none()
+
+    def load(self, tree_hash: str) -> TreeNode:
+        with open(self._pack_file, "rb") as pack:
+            tree_root = self._load_node(tree_hash, pack)
+        tree_root.set_level(-1)
+        for child in tree_root.children:
+            child.update_level_to_parent()
+        return tree_root
+
+    def node_inserted(self, node: TreeNode):
+        self._invalidate_from(node.parent.value())
+
+    def node_removed(self, node: TreeNode, old_parent: TreeNode, old_index: int):
+        self._invalidate_from(old_parent)
+
+    def node_changed(self, node: TreeNode):
+        self._invalidate_from(node)
+
+    def tree_replaced(self, tree_root: TreeNode):
+        self._hashes.clear()
+
+    def _invalidate_from(self, node: TreeNode):
+        current = Optional.some(node)
+        while current.has_value():
+            self._hashes.pop(current.value(), None)
+            current = current.value().parent
+
+    def _hash(self, node: TreeNode, objects: Dict[str, str]) -> str:
+        if node in self._hashes:
+            return self._hashes[node]
+
+        data = node.data
+        content = json.dumps(
+            {
+                "text": data.text,
+                "subtitle": data.subtitle,
+                "complete": data.complete,
+                "collapsed": data.collapsed,
+                "children": [self._hash(child, objects) for child in node.children],
+            },
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        node_hash = hashlib.sha1(content.encode()).hexdigest()
+        objects[node_hash] = content
+        self._hashes[node] = node_hash
+        return node_hash
+
+    def _store_objects(self, objects: Dict[str, str]):
+        pack_offsets = self._read_pack_offsets()
+        new_objects = [
+            (node_hash, content)
+            for node_hash, content in objects.items()
+            if node_hash not in pack_offsets
+        ]
+        if not new_objects:
+            return
+
+        with open(self._pack_file, "ab") as f:
+            # Drop a torn write at the end, from a crash in the middle of one
+            f.truncate(self._pack_end)
+            offset = self._pack_end
+            for node_hash, content in new_objects:
+                line = f"{node_hash} {content}\n".encode()
+                f.write(line)
+                pack_offsets[node_hash] = offset
+                offset += len(line)
+            f.flush()
+            if self._fsync:
+                os.fsync(f.fileno())
+        self._pack_end = offset
+
+    def _read_pack_offsets(self) -> Dict[str, int]:
+        if self._pack_offsets.has_value():
+            return self._pack_offsets.value()
+
+        pack_offsets = {}
+        offset = 0
+        if self._pack_file.exists():
+            with open(self._pack_file, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    pack_offsets[line[:40].decode()] = offset
+                    offset += len(line)
+        self._pack_offsets = Optional.some(pack_offsets)
+        self._pack_end = offset
+        return pack_offsets
+
+    def _load_node(self, node_hash: str, pack: BinaryIO) -> TreeNode:
+        pack.seek(self._read_pack_offsets()[node_hash])
+        content = json.loads(pack.readline().decode()[len(node_hash) + 1 :])
+        node = TreeNode(
+            TodoItem(
+                text=content["text"],
+                subtitle=content["subtitle"],
+                complete=content["complete"],
+                collapsed=content["collapsed"],
+            )
+        )
+        for child_hash in content["children"]:
+            node.add_child(self._load_node(child_hash, pack))
+        return node
+
+    @property
+    def _pack_file(self) -> Path:
+        return self._directory / "objects.pack"
+
+    @property
+    def _versions_file(self) -> Path:
+        return self._directory / "versions"
@@ -0,0 +1,249 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, TextIO
+
+from listigt.storage.storage import write_atomically
+from listigt.todo_list.change_listener import ChangeListener
+from listigt.todo_list.todo_list import TodoItem, gen_subtree_lines, subtree_from_str
+from listigt.todo_list.tree import TreeNode
+from listigt.utils.optional import Optional
+
+
+class Journal(ChangeListener):
+    # Append-only log of tree changes since the save file was last written.
+    # Nodes are addressed by their path of child indices from the top root.
+    # Changes are recorded holding the tree lock, while compact() runs on the
+    # autosave thread without it, so the file is guarded by a lock of its own.
+    def __init__(
+        self,
+        journal_file: Path,
+        fsync_every: int = 50,
+        fsync_interval: float = 1.0,
+        compact_after: int = 1000,
+    ):
+        self._journal_file = journal_file
+        self._fsync_every = fsync_every
+        self._fsync_interval = fsync_interval
+        self._compact_after = compact_after
+        self._file: Optional[TextIO] = Optional.none()
+        self._num_records = 0
+        self._num_unsynced_records = 0
+        self._last_fsync = time.monotonic()
+        self._lock = threading.RLock()
+        self.on_compact: Optional[Callable[[], None]] = Optional.none()
+
+    @property
+    def journal_file(self) -> Path:
+        return self._journal_file
+
+    def replay(self, tree_root: TreeNode, save_file_hash: str) -> TreeNode:
+        records = self._read_records()
+        start = _start_of_unsaved_records(records, save_file_hash)
+        if start.is_none():
+            # Empty, or written against another version of the save file
+            return tree_root
+
+        unsaved_records = records[start.value() :]
+        for record in unsaved_records:
+            tree_root = _apply_record(tree_root, record)
+        self._num_records = len(unsaved_records)
+        return tree_root
+
+    @property
+    def num_records(self) -> int:
+        return self._num_records
+
+    def reset(self, save_file_hash: str):
+        with self._lock:
+            self.close()
+            self._journal_file.parent.mkdir(exist_ok=True)
+            self._file = Optional.some(open(self._journal_file, "w"))
+            self._num_records = 0
+            self._write({"op": "base", "hash": save_file_hash})
+            self._fsync()
+
+    def checkpoint(self, save_file_hash: str):
+        # Marks that a save file with this hash is about to be written from the
+        # current state. If it makes it to disk, only later records are replayed
+        with self._lock:
+            if self._file.has_value():
+                self._write({"op": "checkpoint", "hash": save_file_hash})
+
+    def rebase(self, save_file_hash: str, tree_root: TreeNode):
+        # The save file was written with other contents than the snapshot the
+        # last checkpoint was for, e.g. merged with the changes of another
+        # process. Must be called holding the tree lock, once tree_root has
+        # those changes too, so that replaying from it gives tree_root.
+        with self._lock:
+            if self._file.is_none():
+                return
+            self._write({"op": "checkpoint", "hash": save_file_hash})
+        self.tree_replaced(tree_root)
+
+    def compact(self, save_file_hash: str):
+        # Drops everything up to the checkpoint for a save file that has now
+        # been written, keeping the records that came in after it. The records
+        # up to now are read without the lock, and the ones that come in
+        # meanwhile are copied over when the compacted journal is written.
+        with self._lock:
+            if self._file.is_none():
+                return
+            end = self._file.value().tell()
+        records = self._read_records(end)
+        start = _start_of_unsaved_records(records, save_file_hash)
+        if start.is_none():
+            return
+
+        unsaved_records = [
+            record for record in records[start.value() :] if record["op"] != "checkpoint"
+        ]
+        compacted_text = "".join(
+            _record_line(record)
+            for record in [{"op": "base", "hash": save_file_hash}, *unsaved_records]
+        )
+        with self._lock:
+            if self._file.is_none():
+                return
+            with open(self._journal_file, "rb") as f:
+                f.seek(end)
+                new_text = f.read().decode()
+            self.close()
+            write_atomically(self._journal_file, compacted_text + new_text)
+            self._file = Optional.some(open(self._journal_file, "a"))
+            self._num_records = len(unsaved_records) + new_text.count("\n")
+
+    def close(self):
+        with self._lock:
+            if file := self._file.value_or_none():
+                self._fsync()
+                file.close()
+                self._file = Optional.none()
+
+    def node_inserted(self, node: TreeNode):
+        self._record(
+            {"op": "insert", "path": _path(node), "tree": "\n".join(gen_subtree_lines(node))}
+        )
+
+    def node_removed(self, node: TreeNode, old_parent: TreeNode, old_index: int):
+        self._record({"op": "remove", "path": _path(old_parent) + [old_index]})
+
+    def node_changed(self, node: TreeNode):
+        self._record(
+            {
+                "op": "change",
+                "path": _path(node),
+                "text": node.data.text,
+                "subtitle": node.data.subtitle,
+                "complete": node.data.complete,
+                "collapsed": node.data.collapsed,
+            }
+        )
+
+    def tree_replaced(self, tree_root: TreeNode):
+        self._record(
+            {"op": "replace", "tree": "\n".join(str(item) for item in tree_root.children)}
+        )
+
+    def _record(self, record: dict):
+        with self._lock:
+            if self._file.is_none():
+                return
+
+            self._write(record)
+            self._num_records += 1
+            self._num_unsynced_records += 1
+            if (
+                self._num_unsynced_records >= self._fsync_every
+                or time.monotonic() - self._last_fsync >= self._fsync_interval
+            ):
+                self._fsync()
+
+        if self._num_records >= self._compact_after and self.on_compact.has_value():
+            self.on_compact.value()()
+
+    def _write(self, record: dict):
+        file = self._file.value()
+        file.write(_record_line(record))
+        # Flush right away, so that the record survives the process being killed
+        file.flush()
+
+    def _fsync(self):
+        if file := self._file.value_or_none():
+            os.fsync(file.fileno())
+        self._num_unsynced_records = 0
+        self._last_fsync = time.monotonic()
+
+    def _read_records(self, end: int = -1) -> List[dict]:
+        # The records in the first end bytes, or in the whole file
+        if not self._journal_file.exists():
+            return []
+
+        records = []
+        with open(self._journal_file, "rb") as f:
+            for line in f.read(end).decode().split("\n"):
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn write at the end of the journal, stop here
+                    break
+        return records
+
+
+def _record_line(record: dict) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _start_of_unsaved_records(records: List[dict], save_file_hash: str) -> Optional[int]:
+    start = Optional.none()
+    for index, record in enumerate(records):
+        if record["op"] in ("base", "checkpoint") and record["hash"] == save_file_hash:
+            start = Optional.some(index + 1)
+    return start
+
+
+def _path(node: TreeNode) -> List[int]:
+    path = []
+    while parent := node.parent.value_or_none():
+        path.append(parent.children.index(node))
+        node = parent
+    return list(reversed(path))
+
+
+def _node_at_path(tree_root: TreeNode, path: List[int]) -> TreeNode:
+    node = tree_root
+    for index in path:
+        node = node.children[index]
+    return node
+
+
+def _apply_record(tree_root: TreeNode, record: dict) -> TreeNode:
+    op = record["op"]
+    if op in ("base", "checkpoint"):
+        return tree_root
+
+    if op == "replace":
+        return TreeNode.from_string(record["tree"], TodoItem.tree_node_from_str)
+
+    if op == "change":
+        node = _node_at_path(tree_root, record["path"])
+        node.data.text = record["text"]
+        node.data.subtitle = record["subtitle"]
+        node.data.complete = record["complete"]
+        node.data.collapsed = record["collapsed"]
+        return tree_root
+
+    parent = _node_at_path(tree_root, record["path"][:-1])
+    index = record["path"][-1]
+    if op == "insert":
+        node = subtree_from_str(record["tree"]).value()
+        if index < len(parent.children):
+            parent.add_child(node, before_child=Optional.some(parent.children[index]))
+        else:
+            parent.add_child(node)
+        node.update_level_to_parent()
+    elif op == "remove":
+        parent.remove_node(parent.children[index])
+    return tree_root
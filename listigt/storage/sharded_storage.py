@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import logging
+import uuid
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Set, Generator
+
+import toml
+
+from listigt.storage.storage import Storage, write_atomically
+from listigt.todo_list.todo_list import TodoItem, gen_subtree_lines, subtree_from_str
+from listigt.todo_list.tree import TreeNode
+from listigt.utils.optional import Optional
+
+MANIFEST_NAME = "manifest.toml"
+SHARD_SUFFIX = ".txt"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ShardedSnapshot:
+    shard_texts: Dict[str, str]
+    manifest: Optional[dict]
+    files_to_delete: Set[str]
+
+
+class ShardedStorage(Storage):
+    # Every subtree at shard_depth is kept in its own file. The nodes above
+    # the shards are stored inline in the manifest, in pre-order together with
+    # references to the shard files.
+    def __init__(self, directory: Path, shard_depth: int = 1):
+        if shard_depth < 1:
+            raise ValueError("shard_depth must be at least 1")
+        self._directory = directory
+        self._shard_level = shard_depth - 1
+        self._shard_names: Dict[TreeNode, str] = {}
+        self._files_on_disk: Set[str] = set()
+        self._dirty_shards: Set[TreeNode] = set()
+        self._manifest_dirty = False
+        self._rewrite_all = False
+
+    @property
+    def manifest_file(self) -> Path:
+        return self._directory / MANIFEST_NAME
+
+    def is_empty(self) -> bool:
+        return not self.manifest_file.exists()
+
+    def load(self) -> TreeNode:
+        self._directory.mkdir(parents=True, exist_ok=True)
+        root = TreeNode.from_string("", TodoItem.tree_node_from_str)
+        if self.is_empty():
+            return root
+
+        manifest = toml.load(str(self.manifest_file))
+        entries = manifest.get("entries", [])
+        self._rewrite_all = manifest.get("shard_depth") != self._shard_level + 1
+
+        # Only the reading is spread over threads, the parsing holds the GIL
+        shard_names = [entry["shard"] for entry in entries if "shard" in entry]
+        with ThreadPoolExecutor() as executor:
+            shard_texts = dict(zip(shard_names, executor.map(self._read_shard, shard_names)))
+        # Shard files that no entry refers to, e.g. left behind by a failed
+        # save, are deleted by the next one
+        self._files_on_disk = {
+            path.name for path in self._directory.iterdir() if path.suffix == SHARD_SUFFIX
+        }
+
+        # parents[level + 1] is the node that new nodes at level are added to
+        parents = [root]
+        for entry in entries:
+            level = entry["level"]
+            if "shard" in entry:
+                text = shard_texts[entry["shard"]]
+                if text.is_none():
+                    logger.warning("Shard file %s is missing, leaving it out", entry["shard"])
+                    self._manifest_dirty = True
+                    continue
+                node = subtree_from_str(text.value()).value_or_none()
+                if node is None:
+                    continue
+                self._shard_names[node] = entry["shard"]
+            else:
+                node = TreeNode(
+                    TodoItem(
+                        text=entry["text"],
+                        subtitle=entry.get("subtitle", ""),
+                        complete=entry.get("complete", False),
+                        collapsed=entry.get("collapsed", False),
+                        id=entry.get("id", ""),
+                    )
+                )
+            parent = parents[min(level, len(parents) - 1)]
+            parent.add_child(node)
+            node.update_level_to_parent()
+            del parents[node.level + 1 :]
+            parents.append(node)
+        return root
+
+    def snapshot(self, tree_root: TreeNode) -> ShardedSnapshot:
+        snapshot = ShardedSnapshot(shard_texts={}, manifest=Optional.none(), files_to_delete=set())
+        entries = []
+        shard_names = {}
+        for node in self._gen_skeleton_nodes(tree_root):
+            if node.level < self._shard_level:
+                entries.append(
+                    {
+                        "level": node.level,
+                        "text": node.data.text,
+                        "subtitle": node.data.subtitle,
+                        "complete": node.data.complete,
+                        "collapsed": node.data.collapsed,
+                        "id": node.data.id,
+                    }
+                )
+                continue
+
+            name = self._shard_names.get(node)
+            if name is None:
+                name = f"{uuid.uuid4().hex[:16]}{SHARD_SUFFIX}"
+                self._manifest_dirty = True
+            if self._rewrite_all or node in self._dirty_shards or name not in self._files_on_disk:
+                snapshot.shard_texts[name] = "\n".join(gen_subtree_lines(node)) + "\n"
+            entries.append({"level": node.level, "shard": name})
+            shard_names[node] = name
+
+        if self._rewrite_all or self._manifest_dirty:
+            snapshot.manifest = Optional.some(
+                {"shard_depth": self._shard_level + 1, "entries": entries}
+            )
+
+        # Items that were removed no longer keep their shard names
+        self._shard_names = shard_names
+        snapshot.files_to_delete = self._files_on_disk - set(shard_names.values())
+        self._files_on_disk = set(shard_names.values())
+        self._dirty_shards = set()
+        self._manifest_dirty = False
+        self._rewrite_all = False
+        return snapshot
+
+    def write_snapshot(self, snapshot: ShardedSnapshot, fsync: bool = True):
+        try:
+            for name, text in snapshot.shard_texts.items():
+                write_atomically(self._directory / name, text, fsync)
+            if manifest := snapshot.manifest.value_or_none():
+                write_atomically(self.manifest_file, toml.dumps(manifest), fsync)
+        except OSError:
+            # The dirty state was cleared by snapshot(), so write everything next time
+            self._rewrite_all = True
+            self._files_on_disk |= snapshot.files_to_delete
+            raise
+        for name in snapshot.files_to_delete:
+            (self._directory / name).unlink(missing_ok=True)
+        return snapshot
+
+    def node_inserted(self, node: TreeNode):
+        self._mark_dirty(node)
+        if node.level <= self._shard_level:
+            self._manifest_dirty = True
+
+    def node_removed(self, node: TreeNode, old_parent: TreeNode, old_index: int):
+        self._mark_dirty(old_parent)
+        if node.level <= self._shard_level:
+            self._manifest_dirty = True
+
+    def node_changed(self, node: TreeNode):
+        self._mark_dirty(node)
+
+    def tree_replaced(self, tree_root: TreeNode):
+        self._rewrite_all = True
+
+    def _mark_dirty(self, node: TreeNode):
+        shard_root = self._shard_root_for(node)
+        if shard_root.has_value():
+            self._dirty_shards.add(shard_root.value())
+        else:
+            self._manifest_dirty = True
+
+    def _shard_root_for(self, node: TreeNode) -> Optional[TreeNode]:
+        if node.level < self._shard_level:
+            return Optional.none()
+        while node.level > self._shard_level:
+            node = node.parent.value()
+        return Optional.some(node)
+
+    def _gen_skeleton_nodes(self, node: TreeNode) -> Generator[TreeNode]:
+        for child in node.children:
+            yield child
+            if child.level < self._shard_level:
+                yield from self._gen_skeleton_nodes(child)
+
+    def _read_shard(self, name: str) -> Optional[str]:
+        try:
+            with open(self._directory / name) as f:
+                return Optional.some(f.read())
+        except FileNotFoundError:
+            return Optional.none()
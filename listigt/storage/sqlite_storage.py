@@ -0,0 +1,196 @@
+import sqlite3
+from pathlib import Path
+from typing import Dict, List
+
+from listigt.storage.storage import Storage
+from listigt.todo_list.todo_list import TodoItem
+from listigt.todo_list.tree import TreeNode
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+    id INTEGER PRIMARY KEY,
+    parent_id INTEGER REFERENCES nodes(id),
+    sort_key REAL NOT NULL,
+    text TEXT NOT NULL,
+    subtitle TEXT NOT NULL DEFAULT '',
+    complete INTEGER NOT NULL DEFAULT 0,
+    collapsed INTEGER NOT NULL DEFAULT 0,
+    uid TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS nodes_by_parent ON nodes(parent_id, sort_key);
+-- Left by versions that kept a full text index, which nothing searched
+DROP TRIGGER IF EXISTS nodes_after_insert;
+DROP TRIGGER IF EXISTS nodes_after_delete;
+DROP TRIGGER IF EXISTS nodes_after_update;
+DROP TABLE IF EXISTS nodes_fts;
+"""
+
+
+class SqliteStorage(Storage):
+    def __init__(self, db_file: Path):
+        db_file.parent.mkdir(exist_ok=True)
+        self._db_file = db_file
+        self._connection = sqlite3.connect(str(db_file))
+        self._connection.executescript(SCHEMA)
+        self._add_missing_columns()
+        self._row_ids: Dict[TreeNode, int] = {}
+
+    def is_empty(self) -> bool:
+        return self._connection.execute("SELECT 1 FROM nodes LIMIT 1").fetchone() is None
+
+    def load(self) -> TreeNode:
+        self._row_ids = {}
+        children_by_parent: Dict[int | None, List[tuple]] = {}
+        rows = self._connection.execute(
+            "SELECT id, parent_id, text, subtitle, complete, collapsed, uid FROM nodes "
+            "ORDER BY parent_id, sort_key"
+        )
+        for row in rows:
+            children_by_parent.setdefault(row[1], []).append(row)
+
+        root = TreeNode.from_string("", TodoItem.tree_node_from_str)
+        # Build top-down, so add_child() sees the final level of each parent
+        stack = [(root, None)]
+        while stack:
+            parent, parent_row_id = stack.pop()
+            for row_id, _, text, subtitle, complete, collapsed, uid in children_by_parent.get(
+                parent_row_id, []
+            ):
+                node = TreeNode(
+                    TodoItem(
+                        text=text,
+                        subtitle=subtitle,
+                        complete=bool(complete),
+                        collapsed=bool(collapsed),
+                        id=uid,
+                    )
+                )
+                parent.add_child(node)
+                self._remember(node, row_id)
+                stack.append((node, row_id))
+        return root
+
+    def snapshot(self, tree_root: TreeNode) -> None:
+        # Every edit is committed as it happens, so there is nothing left to write
+        return None
+
+    def write_snapshot(self, snapshot: None, fsync: bool = True) -> None:
+        return snapshot
+
+    def node_inserted(self, node: TreeNode):
+        with self._connection:
+            self._insert_subtree(node, self._sort_key_for_new_node(node))
+
+    def node_removed(self, node: TreeNode, old_parent: TreeNode, old_index: int):
+        if node not in self._row_ids:
+            return
+
+        with self._connection:
+            self._connection.execute(
+                "DELETE FROM nodes WHERE id IN ("
+                "WITH RECURSIVE subtree(id) AS ("
+                "SELECT ? UNION ALL "
+                "SELECT nodes.id FROM nodes JOIN subtree ON nodes.parent_id = subtree.id"
+                ") SELECT id FROM subtree)",
+                (self._row_ids[node],),
+            )
+        node.apply_to_self_and_children(self._forget)
+
+    def node_changed(self, node: TreeNode):
+        if node not in self._row_ids:
+            return
+
+        with self._connection:
+            self._connection.execute(
+                "UPDATE nodes SET text = ?, subtitle = ?, complete = ?, collapsed = ? "
+                "WHERE id = ?",
+                (
+                    node.data.text,
+                    node.data.subtitle,
+                    node.data.complete,
+                    node.data.collapsed,
+                    self._row_ids[node],
+                ),
+            )
+
+    def tree_replaced(self, tree_root: TreeNode):
+        self._row_ids = {}
+        with self._connection:
+            self._connection.execute("DELETE FROM nodes")
+            for index, child in enumerate(tree_root.children):
+                self._insert_subtree(child, float(index + 1))
+
+    def _insert_subtree(self, node: TreeNode, sort_key: float):
+        parent_row_id = self._row_id_for_parent(node)
+        cursor = self._connection.execute(
+            "INSERT INTO nodes (parent_id, sort_key, text, subtitle, complete, collapsed, uid) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                parent_row_id,
+                sort_key,
+                node.data.text,
+                node.data.subtitle,
+                node.data.complete,
+                node.data.collapsed,
+                node.data.id,
+            ),
+        )
+        self._remember(node, cursor.lastrowid)
+        for index, child in enumerate(node.children):
+            self._insert_subtree(child, float(index + 1))
+
+    def _add_missing_columns(self):
+        # Databases created before items had ids
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(nodes)")}
+        if "uid" not in columns:
+            with self._connection:
+                self._connection.execute(
+                    "ALTER TABLE nodes ADD COLUMN uid TEXT NOT NULL DEFAULT ''"
+                )
+
+    def _sort_key_for_new_node(self, node: TreeNode) -> float:
+        siblings = node.parent.value().children
+        index = siblings.index(node)
+        before = self._sort_key(siblings[index - 1]) if index > 0 else None
+        after = self._sort_key(siblings[index + 1]) if index < len(siblings) - 1 else None
+
+        if before is None and after is None:
+            return 1.0
+        if before is None:
+            return after - 1.0
+        if after is None:
+            return before + 1.0
+
+        sort_key = (before + after) / 2
+        if before < sort_key < after:
+            return sort_key
+
+        # Out of float precision between the neighbours, so renumber the siblings
+        for sibling_index, sibling in enumerate(siblings):
+            if sibling in self._row_ids:
+                self._connection.execute(
+                    "UPDATE nodes SET sort_key = ? WHERE id = ?",
+                    (float(2 * sibling_index + 2), self._row_ids[sibling]),
+                )
+        return float(2 * index + 1)
+
+    def _sort_key(self, node: TreeNode) -> float | None:
+        if node not in self._row_ids:
+            return None
+        row = self._connection.execute(
+            "SELECT sort_key FROM nodes WHERE id = ?", (self._row_ids[node],)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _row_id_for_parent(self, node: TreeNode) -> int | None:
+        parent = node.parent.value()
+        # Top-level items are stored without a parent row
+        if parent.parent.is_none():
+            return None
+        return self._row_ids[parent]
+
+    def _remember(self, node: TreeNode, row_id: int):
+        self._row_ids[node] = row_id
+
+    def _forget(self, node: TreeNode):
+        self._row_ids.pop(node, None)
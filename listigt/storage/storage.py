@@ -0,0 +1,143 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Callable
+
+from listigt.storage.file_lock import FileLock
+from listigt.todo_list.change_listener import ChangeListener
+from listigt.todo_list.todo_list import TodoItem
+from listigt.todo_list.tree import TreeNode
+from listigt.todo_list.tree_diff import merge_trees
+from listigt.utils.optional import Optional
+
+
+class Storage(ChangeListener):
+    def load(self) -> TreeNode:
+        raise NotImplementedError()
+
+    def save(self, tree_root: TreeNode, fsync: bool = True) -> Any:
+        return self.write_snapshot(self.snapshot(tree_root), fsync)
+
+    def snapshot(self, tree_root: TreeNode) -> Any:
+        # Everything write_snapshot() needs, so that the writing can be done
+        # on another thread while the tree keeps changing
+        raise NotImplementedError()
+
+    def write_snapshot(self, snapshot: Any, fsync: bool = True) -> Any:
+        # Returns what was written, which for a save file merged with the
+        # changes of another process is not the snapshot
+        raise NotImplementedError()
+
+
+class TextFileStorage(Storage):
+    def __init__(self, save_file: Path, merge_on_save: bool = False):
+        self._save_file = save_file
+        self._merge_on_save = merge_on_save
+        # The save file contents as last loaded or saved by this process
+        self._base_text = ""
+        self._content_hash = content_hash("")
+        # Called with the saved tree and the tree it was merged into, when
+        # another process had changed the save file since it was loaded
+        self.on_merged: Optional[Callable[[TreeNode, TreeNode], None]] = Optional.none()
+
+    @property
+    def save_file(self) -> Path:
+        return self._save_file
+
+    @property
+    def lock_file(self) -> Path:
+        return self._save_file.with_name(self._save_file.name + ".lock")
+
+    @property
+    def content_hash(self) -> str:
+        # Hash of the save file contents, as last loaded or saved
+        return self._content_hash
+
+    def base_tree(self) -> TreeNode:
+        return TreeNode.from_string(self._base_text, TodoItem.tree_node_from_str)
+
+    def rebase(self, text: str):
+        # The tree now includes the changes in text, which is on disk
+        self._base_text = text
+        self._content_hash = content_hash(text)
+
+    def load(self) -> TreeNode:
+        self._save_file.parent.mkdir(exist_ok=True)
+
+        text = self._read_save_file()
+        self.rebase(text)
+        return TreeNode.from_string(text, TodoItem.tree_node_from_str)
+
+    def snapshot(self, tree_root: TreeNode) -> str:
+        return "\n".join([str(item) for item in tree_root.children])
+
+    def write_snapshot(self, snapshot: str, fsync: bool = True) -> str:
+        if not self._merge_on_save:
+            self._write(snapshot, fsync)
+            return snapshot
+
+        # Reading, merging and writing is done holding the lock, so that
+        # another process can't write in between and have its changes lost
+        merged_text = Optional.none()
+        with FileLock(self.lock_file):
+            disk_text = self._read_save_file()
+            if content_hash(disk_text) != self._content_hash:
+                merged_text = Optional.some(self._merge(snapshot, disk_text))
+            self._write(merged_text.value_or(snapshot), fsync)
+
+        if merged_text.has_value() and self.on_merged.has_value():
+            self.on_merged.value()(
+                TreeNode.from_string(snapshot, TodoItem.tree_node_from_str),
+                TreeNode.from_string(merged_text.value(), TodoItem.tree_node_from_str),
+            )
+        return merged_text.value_or(snapshot)
+
+    def _write(self, text: str, fsync: bool):
+        # The hash is updated before the file is moved into place, so that the
+        # file watcher never takes this write for a change by someone else
+        old_hash = self._content_hash
+        self._content_hash = content_hash(text)
+        try:
+            write_atomically(self._save_file, text, fsync)
+        except BaseException:
+            self._content_hash = old_hash
+            raise
+        self._base_text = text
+
+    def _merge(self, snapshot: str, disk_text: str) -> str:
+        merged = merge_trees(
+            self.base_tree(),
+            TreeNode.from_string(snapshot, TodoItem.tree_node_from_str),
+            TreeNode.from_string(disk_text, TodoItem.tree_node_from_str),
+        )
+        return self.snapshot(merged)
+
+    def _read_save_file(self) -> str:
+        if not self._save_file.exists():
+            return ""
+        with open(self._save_file) as f:
+            return f.read()
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def write_atomically(path: Path, text: str, fsync: bool = True):
+    # Write to a temporary file next to path and move it into place, so that
+    # a crash while writing never leaves a truncated file behind
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        if path.exists():
+            os.chmod(temp_name, path.stat().st_mode)
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_name, path)
+    except BaseException:
+        os.unlink(temp_name)
+        raise
@@ -0,0 +1,15 @@
+from listigt.todo_list.tree import TreeNode
+
+
+class ChangeListener:
+    def node_inserted(self, node: TreeNode):
+        pass
+
+    def node_removed(self, node: TreeNode, old_parent: TreeNode, old_index: int):
+        pass
+
+    def node_changed(self, node: TreeNode):
+        pass
+
+    def tree_replaced(self, tree_root: TreeNode):
+        pass
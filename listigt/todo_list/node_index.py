@@ -0,0 +1,69 @@
+import secrets
+from typing import Dict
+
+from listigt.todo_list.change_listener import ChangeListener
+from listigt.todo_list.tree import TreeNode
+from listigt.utils.optional import Optional
+
+
+def new_node_id() -> str:
+    # 8 characters, from 48 random bits
+    return secrets.token_urlsafe(6)
+
+
+class NodeIndex(ChangeListener):
+    # Finds nodes by the id of their item. Items without an id, or with the
+    # same id as another node in the tree, are given a new one when added.
+    # Must be notified of changes before listeners that save the ids.
+    def __init__(self):
+        self._nodes: Dict[str, TreeNode] = {}
+        # The id each node was added with, to find it again when it changes
+        self._ids: Dict[TreeNode, str] = {}
+
+    def add_tree(self, tree_root: TreeNode) -> int:
+        # Returns how many items had to be given a new id
+        num_new_ids = 0
+        for node in tree_root.root().gen_all_nodes():
+            num_new_ids += self._add(node)
+        return num_new_ids
+
+    def node(self, node_id: str) -> Optional[TreeNode]:
+        return Optional(self._nodes.get(node_id))
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def node_inserted(self, node: TreeNode):
+        self._add(node)
+        for subtree_node in node.gen_all_nodes():
+            self._add(subtree_node)
+
+    def node_removed(self, node: TreeNode, old_parent: TreeNode, old_index: int):
+        for subtree_node in [node, *node.gen_all_nodes()]:
+            self._remove(subtree_node)
+
+    def node_changed(self, node: TreeNode):
+        if self._ids.get(node) != node.data.id:
+            self._remove(node)
+            self._add(node)
+
+    def tree_replaced(self, tree_root: TreeNode):
+        self._nodes.clear()
+        self._ids.clear()
+        self.add_tree(tree_root)
+
+    def _add(self, node: TreeNode) -> bool:
+        node_id = node.data.id
+        has_new_id = False
+        while not node_id or self._nodes.get(node_id, node) is not node:
+            node_id = new_node_id()
+            has_new_id = True
+        node.data.id = node_id
+        self._nodes[node_id] = node
+        self._ids[node] = node_id
+        return has_new_id
+
+    def _remove(self, node: TreeNode):
+        node_id = self._ids.pop(node, None)
+        if node_id is not None and self._nodes.get(node_id) is node:
+            del self._nodes[node_id]
@@ -0,0 +1,79 @@
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+from listigt.todo_list.change_listener import ChangeListener
+from listigt.todo_list.tree import TreeNode
+
+
+@dataclass
+class NodeStats:
+    __slots__ = ("num_descendants", "num_completed", "complete")
+    num_descendants: int
+    # Of the descendants, not counting the node itself
+    num_completed: int
+    # As it was when last counted, to tell what a change did
+    complete: bool
+
+
+class SubtreeStats(ChangeListener):
+    # Counts the items below each node, and how many of them are complete.
+    # The counts are kept up to date by adding what changed to the nodes
+    # above it, so a change costs the depth of the tree, and an insert or
+    # removal the size of the subtree as well.
+    def __init__(self):
+        self._stats: Dict[TreeNode, NodeStats] = {}
+
+    def progress(self, node: TreeNode) -> Tuple[int, int]:
+        # How many of the items below node are complete, and how many there are
+        stats = self._stats.get(node)
+        if stats is None:
+            return 0, 0
+        return stats.num_completed, stats.num_descendants
+
+    def node_inserted(self, node: TreeNode):
+        stats = self._count(node)
+        self._add_to_self_and_up(
+            node.parent.value(), 1 + stats.num_descendants, stats.complete + stats.num_completed
+        )
+
+    def node_removed(self, node: TreeNode, old_parent: TreeNode, old_index: int):
+        stats = self._stats.get(node)
+        if stats is None:
+            return
+        num_removed = 1 + stats.num_descendants
+        num_completed = stats.complete + stats.num_completed
+        for subtree_node in [node, *node.gen_all_nodes()]:
+            self._stats.pop(subtree_node, None)
+        self._add_to_self_and_up(old_parent, -num_removed, -num_completed)
+
+    def node_changed(self, node: TreeNode):
+        stats = self._stats.get(node)
+        if stats is None or stats.complete == node.data.complete:
+            return
+        stats.complete = node.data.complete
+        if parent := node.parent.value_or_none():
+            self._add_to_self_and_up(parent, 0, 1 if stats.complete else -1)
+
+    def tree_replaced(self, tree_root: TreeNode):
+        self._stats.clear()
+        self._count(tree_root.root())
+
+    def _count(self, node: TreeNode) -> NodeStats:
+        num_descendants = 0
+        num_completed = 0
+        for child in node.children:
+            child_stats = self._count(child)
+            num_descendants += 1 + child_stats.num_descendants
+            num_completed += child_stats.complete + child_stats.num_completed
+        stats = NodeStats(num_descendants, num_completed, node.data.complete)
+        self._stats[node] = stats
+        return stats
+
+    def _add_to_self_and_up(self, node: TreeNode, num_descendants: int, num_completed: int):
+        while True:
+            if stats := self._stats.get(node):
+                stats.num_descendants += num_descendants
+                stats.num_completed += num_completed
+            if node.parent.is_none():
+                return
+            node = node.parent.value()
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import re
+from dataclasses import dataclass, field
+from typing import Generator
 
 from listigt.utils.optional import Optional
 from listigt.todo_list import tree
@@ -9,6 +11,10 @@ from listigt.todo_list import tree
 COMPLETE_TEXT = "[COMPLETE]"
 COLLAPSED_TEXT = "[COLLAPSED]"
 SPACES_PER_LEVEL = 2
+# Written after the text, like "Buy milk {#x1Y2z3A4}". An item without an id
+# whose text ends like one is written with an empty id, "See {#tag} {#}", so
+# that the end of its text isn't taken for the id when read back.
+ID_PATTERN = re.compile(r"\s*\{#([A-Za-z0-9_-]*)\}$")
 
 
 @dataclass
@@ -17,12 +23,16 @@ class TodoItem:
     subtitle: str = ""
     complete: bool = False
     collapsed: bool = False
+    # Stays the same for as long as the item exists. Empty until the item is
+    # added to a NodeIndex, which hands out the ids
+    id: str = field(default="", compare=False)
 
     def __str__(self):
         complete_str = f"{COMPLETE_TEXT} " if self.complete else ""
         collapsed_str = f"{COLLAPSED_TEXT} " if self.collapsed else ""
+        id_str = f" {{#{self.id}}}" if self.id or ID_PATTERN.search(self.text) else ""
         subtitle_str = f'\n"{self.subtitle}"' if self.subtitle else ""
-        return f"{complete_str}{collapsed_str}{self.text}{subtitle_str}"
+        return f"{complete_str}{collapsed_str}{self.text}{id_str}{subtitle_str}"
 
     @classmethod
     def tree_node_from_str(
@@ -34,19 +44,34 @@ class TodoItem:
             last_node.value().data.subtitle = subtitle
             return Optional.none()
 
-        indent, text = s.split("- ")[:2]
+        indent, text = s.split("- ", 1)
         if len(indent) % SPACES_PER_LEVEL != 0:
             raise ValueError(
                 f"Found indent that is not a multiple of {SPACES_PER_LEVEL}"
             )
         level = int(len(indent) / SPACES_PER_LEVEL)
+        node_id = ""
+        if id_match := ID_PATTERN.search(text):
+            node_id = id_match.group(1)
+            text = text[: id_match.start()]
         complete = COMPLETE_TEXT in text
         collapsed = COLLAPSED_TEXT in text
         text = text.replace(COMPLETE_TEXT, "").strip()
         text = text.replace(COLLAPSED_TEXT, "").strip()
         return Optional.some(
             tree.TreeNode(
-                data=TodoItem(text=text, complete=complete, collapsed=collapsed),
+                data=TodoItem(text=text, complete=complete, collapsed=collapsed, id=node_id),
                 level=level,
             )
         )
+
+
+def gen_subtree_lines(node: tree.TreeNode) -> Generator[str]:
+    # Lines in the save file format, indented relative to node
+    for subtree_node in [node, *node.gen_all_nodes()]:
+        indent = " " * (subtree_node.level - node.level) * SPACES_PER_LEVEL
+        yield f"{indent}- {subtree_node.data}"
+
+
+def subtree_from_str(s: str) -> Optional[tree.TreeNode]:
+    return tree.TreeNode.from_string(s, TodoItem.tree_node_from_str).first_child()
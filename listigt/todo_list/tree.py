@@ -18,7 +18,10 @@ class TreeNode:
         self._id = uuid.uuid1()
 
     def prepend_child(self, child: TreeNode):
-        self._children.insert(0, child)
+        self.insert_child(0, child)
+
+    def insert_child(self, index: int, child: TreeNode):
+        self._children.insert(index, child)
         child._level = self._level + 1
         child._parent = Optional.some(self)
 
@@ -44,6 +47,11 @@ class TreeNode:
         child._level = self._level + 1
         child._parent = Optional.some(self)
 
+    def remove_child_at(self, index: int) -> TreeNode:
+        child = self._children.pop(index)
+        child._parent = Optional.none()
+        return child
+
     def has_children(self) -> bool:
         return len(self.children) > 0
 
@@ -56,6 +64,7 @@ class TreeNode:
     def remove_node(self, node: TreeNode):
         if node in self._children:
             self._children.remove(node)
+            node._parent = Optional.none()
             return
         for child in self.children:
             child.remove_node(node)
@@ -195,6 +204,16 @@ class TreeNode:
     def children(self) -> List[TreeNode]:
         return self._children
 
+    def is_descendant_of(self, node: TreeNode) -> bool:
+        # Removed nodes have no parent, so the nodes below them aren't
+        # descendants of where they used to be
+        parent = self.parent.value_or_none()
+        while parent is not None:
+            if parent is node:
+                return True
+            parent = parent.parent.value_or_none()
+        return False
+
     def root(self) -> TreeNode:
         out = self
         while True:
@@ -212,6 +231,9 @@ class TreeNode:
     def __eq__(self, other) -> bool:
         return self._id == other._id
 
+    def __hash__(self) -> int:
+        return hash(self._id)
+
     def is_equivalent_to(self, other) -> bool:
         data_equal = self.data == other.data
         level_equal = self._level == other._level
@@ -0,0 +1,269 @@
+import bisect
+import hashlib
+from collections import defaultdict, deque
+from copy import copy
+from typing import Callable, Deque, Dict, Iterable, List, Tuple
+
+from listigt.todo_list.change_listener import ChangeListener
+from listigt.todo_list.tree import TreeNode
+from listigt.utils.optional import Optional
+
+
+def sync_tree(tree_root: TreeNode, new_tree_root: TreeNode, listeners: List[ChangeListener]):
+    # Changes tree_root in place until it has the same content as new_tree_root.
+    # Children are matched like in merge_trees, so nodes that still exist keep
+    # their identity and collapse state. new_tree_root is taken apart in the
+    # process.
+    _sync_children(
+        tree_root,
+        new_tree_root,
+        subtree_hashes(tree_root, include_collapsed=False),
+        subtree_hashes(new_tree_root, include_collapsed=False),
+        listeners,
+    )
+
+
+def _sync_children(
+    parent: TreeNode,
+    new_parent: TreeNode,
+    hashes: Dict[TreeNode, str],
+    new_hashes: Dict[TreeNode, str],
+    listeners: List[ChangeListener],
+):
+    children = list(parent.children)
+    new_children = list(new_parent.children)
+
+    def sync(child: TreeNode, new_child: TreeNode):
+        _sync_data(child, new_child, listeners)
+        _sync_children(child, new_child, hashes, new_hashes, listeners)
+
+    # Between two matched children, the ones that are left are paired in
+    # order as edited, and the rest are removed or inserted
+    index = 0
+    start = new_start = 0
+    matches = _matching_indices(children, new_children, hashes, new_hashes)
+    for end, new_end in [*matches, (len(children), len(new_children))]:
+        num_paired = min(end - start, new_end - new_start)
+        for offset in range(num_paired):
+            sync(children[start + offset], new_children[new_start + offset])
+            index += 1
+        for child in children[start + num_paired : end]:
+            parent.remove_child_at(index)
+            for listener in listeners:
+                listener.node_removed(child, parent, index)
+        for new_child in new_children[new_start + num_paired : new_end]:
+            parent.insert_child(index, new_child)
+            new_child.update_level_to_parent()
+            for listener in listeners:
+                listener.node_inserted(new_child)
+            index += 1
+        if end < len(children):
+            sync(children[end], new_children[new_end])
+            index += 1
+        start, new_start = end + 1, new_end + 1
+
+
+def _sync_data(node: TreeNode, new_node: TreeNode, listeners: List[ChangeListener]):
+    # Items without an id in the file keep theirs
+    new_id = new_node.data.id or node.data.id
+    changed = (
+        node.data.text != new_node.data.text
+        or node.data.subtitle != new_node.data.subtitle
+        or node.data.complete != new_node.data.complete
+        or node.data.id != new_id
+    )
+    if not changed:
+        return
+
+    node.data.id = new_id
+    node.data.text = new_node.data.text
+    node.data.subtitle = new_node.data.subtitle
+    node.data.complete = new_node.data.complete
+    for listener in listeners:
+        listener.node_changed(node)
+
+
+CONFLICT_TEXT = "[CONFLICT]"
+
+
+def subtree_hashes(tree_root: TreeNode, include_collapsed: bool = True) -> Dict[TreeNode, str]:
+    # Content hash of every subtree, computed bottom-up in one pass
+    hashes = {}
+
+    def visit(node: TreeNode) -> str:
+        h = hashlib.sha1(_data_key(node, include_collapsed).encode())
+        for child in node.children:
+            h.update(visit(child).encode())
+        hashes[node] = h.hexdigest()
+        return hashes[node]
+
+    visit(tree_root)
+    return hashes
+
+
+def merge_trees(base: TreeNode, ours: TreeNode, theirs: TreeNode) -> TreeNode:
+    # Three-way merge of two versions of the same tree. Subtrees that only
+    # changed on one side are taken as a whole from that side, so only the
+    # paths to nodes changed on both sides are visited. Where both sides made
+    # different changes to the same children, both are kept and the nodes
+    # only found in theirs are marked with CONFLICT_TEXT.
+    # The input trees are taken apart in the process.
+    merger = _Merger(subtree_hashes(base), subtree_hashes(ours), subtree_hashes(theirs))
+    merged = merger.merge_node(base, ours, theirs)
+    for child in merged.children:
+        child.update_level_to_parent()
+    return merged
+
+
+class _Merger:
+    def __init__(self, base_hashes, our_hashes, their_hashes):
+        self._base_hashes = base_hashes
+        self._our_hashes = our_hashes
+        self._their_hashes = their_hashes
+
+    def merge_node(self, base: TreeNode, ours: TreeNode, theirs: TreeNode) -> TreeNode:
+        base_hash = self._base_hashes[base]
+        if self._our_hashes[ours] == base_hash:
+            return theirs
+        if self._their_hashes[theirs] in (base_hash, self._our_hashes[ours]):
+            return ours
+
+        merged = TreeNode(copy(ours.data), level=ours.level)
+        for field in ("text", "subtitle", "complete", "collapsed"):
+            if getattr(ours.data, field) == getattr(base.data, field):
+                setattr(merged.data, field, getattr(theirs.data, field))
+        if ours.data.text != base.data.text and theirs.data.text not in (
+            base.data.text,
+            ours.data.text,
+        ):
+            # Both sides edited the text, so both edits are kept
+            merged.data.text = f"{ours.data.text} {CONFLICT_TEXT} {theirs.data.text}"
+        for child in self._merge_children(base.children, ours.children, theirs.children):
+            merged.add_child(child)
+        return merged
+
+    def _merge_children(
+        self, base: List[TreeNode], ours: List[TreeNode], theirs: List[TreeNode]
+    ) -> List[TreeNode]:
+        ours_for_base = dict(_matching_indices(base, ours, self._base_hashes, self._our_hashes))
+        theirs_for_base = dict(
+            _matching_indices(base, theirs, self._base_hashes, self._their_hashes)
+        )
+
+        merged = []
+        base_start = our_start = their_start = 0
+        for base_index in range(len(base)):
+            our_index = ours_for_base.get(base_index)
+            their_index = theirs_for_base.get(base_index)
+            if our_index is None or their_index is None:
+                continue
+            if our_index < our_start or their_index < their_start:
+                continue
+
+            merged += self._merge_chunk(
+                base[base_start:base_index],
+                ours[our_start:our_index],
+                theirs[their_start:their_index],
+            )
+            merged.append(
+                self.merge_node(base[base_index], ours[our_index], theirs[their_index])
+            )
+            base_start, our_start, their_start = base_index + 1, our_index + 1, their_index + 1
+
+        merged += self._merge_chunk(base[base_start:], ours[our_start:], theirs[their_start:])
+        return merged
+
+    def _merge_chunk(
+        self, base: List[TreeNode], ours: List[TreeNode], theirs: List[TreeNode]
+    ) -> List[TreeNode]:
+        base_hashes = [self._base_hashes[node] for node in base]
+        our_hashes = [self._our_hashes[node] for node in ours]
+        their_hashes = [self._their_hashes[node] for node in theirs]
+        if our_hashes == base_hashes:
+            return theirs
+        if their_hashes in (base_hashes, our_hashes):
+            return ours
+
+        # Changed on both sides. Keep everything from ours, and unless both
+        # sides only added nodes, mark the nodes that are only in theirs
+        conflicts = []
+        for node, node_hash in zip(theirs, their_hashes):
+            if node_hash not in our_hashes:
+                if base:
+                    node.data.text = f"{CONFLICT_TEXT} {node.data.text}"
+                conflicts.append(node)
+        return ours + conflicts
+
+
+def _matching_indices(
+    a: List[TreeNode],
+    b: List[TreeNode],
+    a_hashes: Dict[TreeNode, str],
+    b_hashes: Dict[TreeNode, str],
+) -> List[Tuple[int, int]]:
+    # Pairs of indices of the same node in a and in b, increasing in both.
+    # Nodes are paired by id, then by content, then by text in order, each
+    # through a dict so that many nodes with the same text take linear time.
+    b_for_a: Dict[int, int] = {}
+    a_for_b: Dict[int, int] = {}
+
+    def pair_unique(a_key: Callable[[TreeNode], str], b_key: Callable[[TreeNode], str]):
+        b_by_key = _unique_keys((j, b_key(b[j])) for j in range(len(b)) if j not in a_for_b)
+        a_by_key = _unique_keys((i, a_key(a[i])) for i in range(len(a)) if i not in b_for_a)
+        for key, i in a_by_key.items():
+            j = b_by_key.get(key, -1)
+            if i != -1 and j != -1:
+                b_for_a[i] = j
+                a_for_b[j] = i
+
+    pair_unique(lambda node: node.data.id, lambda node: node.data.id)
+    pair_unique(a_hashes.__getitem__, b_hashes.__getitem__)
+
+    b_by_text: Dict[str, Deque[int]] = defaultdict(deque)
+    for j in range(len(b)):
+        if j not in a_for_b:
+            b_by_text[b[j].data.text].append(j)
+    for i in range(len(a)):
+        if i not in b_for_a and b_by_text[a[i].data.text]:
+            b_for_a[i] = b_by_text[a[i].data.text].popleft()
+
+    return _increasing_pairs(sorted(b_for_a.items()))
+
+
+def _unique_keys(indexed_keys: Iterable[Tuple[int, str]]) -> Dict[str, int]:
+    # The index for each key, or -1 if more than one has it
+    indices: Dict[str, int] = {}
+    for index, key in indexed_keys:
+        if key:
+            indices[key] = -1 if key in indices else index
+    return indices
+
+
+def _increasing_pairs(pairs: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    # The longest run of pairs, sorted by the first index, where the second
+    # index increases too. Nodes that were moved past others are left out.
+    tails: List[int] = []
+    tail_indices: List[int] = []
+    previous: List[int] = []
+    for pair_index, (_, j) in enumerate(pairs):
+        position = bisect.bisect_left(tails, j)
+        if position == len(tails):
+            tails.append(j)
+            tail_indices.append(pair_index)
+        else:
+            tails[position] = j
+            tail_indices[position] = pair_index
+        previous.append(tail_indices[position - 1] if position > 0 else -1)
+
+    result = []
+    pair_index = tail_indices[-1] if tail_indices else -1
+    while pair_index != -1:
+        result.append(pairs[pair_index])
+        pair_index = previous[pair_index]
+    return list(reversed(result))
+
+
+def _data_key(node: TreeNode, include_collapsed: bool = True) -> str:
+    data = node.data
+    key = f"{data.text}\0{data.subtitle}\0{data.complete}"
+    return f"{key}\0{data.collapsed}" if include_collapsed else key
@@ -19,13 +19,21 @@ class Action(enum.Enum):
     MOVE_ROOT_UP = enum.auto()
     PASTE_ITEM_AFTER = enum.auto()
     PASTE_ITEM_BEFORE = enum.auto()
+    IMPORT_FROM_CLIPBOARD = enum.auto()
+    EXPORT_ROOT = enum.auto()
+    ARCHIVE_COMPLETED = enum.auto()
     EDIT_ITEM = enum.auto()
     TOGGLE_HIDE_COMPLETE = enum.auto()
     UNDO = enum.auto()
+    REDO = enum.auto()
     TOGGLE_COMPLETE = enum.auto()
     COLLAPSE = enum.auto()
+    VISUAL_MODE = enum.auto()
+    TOGGLE_MARK = enum.auto()
+    MOVE_SELECTION_HERE = enum.auto()
     SEARCH = enum.auto()
     CANCEL_SEARCH = enum.auto()
+    NEXT_SEARCH_MODE = enum.auto()
     SELECT_NEXT_SEARCH_RESULT = enum.auto()
     SELECT_PREVIOUS_SEARCH_RESULT = enum.auto()
     QUIT = enum.auto
@@ -64,19 +72,35 @@ ALL_ACTIONS = {
     Action.PASTE_ITEM_BEFORE: KeyboardAction(
         key="P", help_text="Paste item before selection"
     ),
+    Action.IMPORT_FROM_CLIPBOARD: KeyboardAction(
+        key="I", help_text="Import outline from clipboard"
+    ),
+    Action.EXPORT_ROOT: KeyboardAction(key="E", help_text="Export items below top"),
+    Action.ARCHIVE_COMPLETED: KeyboardAction(
+        key="A", help_text="Archive completed items (press twice)"
+    ),
     Action.EDIT_ITEM: KeyboardAction(key="e", help_text="Edit item"),
     Action.TOGGLE_HIDE_COMPLETE: KeyboardAction(
         key="c", help_text="Hide/show completed items"
     ),
     Action.UNDO: KeyboardAction(key="u", help_text="Undo"),
+    Action.REDO: KeyboardAction(key=ptg.keys.CTRL_R, help_text="Redo"),
     Action.TOGGLE_COMPLETE: KeyboardAction(
         key=ptg.keys.ENTER, help_text="Complete/uncomplete item"
     ),
     Action.COLLAPSE: KeyboardAction(
         key=ptg.keys.SPACE, help_text="Collapse/uncollapse item"
     ),
+    Action.VISUAL_MODE: KeyboardAction(key="v", help_text="Start/stop selecting a range"),
+    Action.TOGGLE_MARK: KeyboardAction(key="m", help_text="Mark/unmark item"),
+    Action.MOVE_SELECTION_HERE: KeyboardAction(
+        key="t", help_text="Move selected items after item"
+    ),
     Action.SEARCH: KeyboardAction(key="/", help_text="Search"),
     Action.CANCEL_SEARCH: KeyboardAction(key=ptg.keys.ESC, help_text="Cancel search"),
+    Action.NEXT_SEARCH_MODE: KeyboardAction(
+        key=ptg.keys.TAB, help_text="Switch exact/fuzzy/regex search"
+    ),
     Action.SELECT_NEXT_SEARCH_RESULT: KeyboardAction(
         key=ptg.keys.DOWN, help_text="Select next search result"
     ),
@@ -103,5 +127,7 @@ def display_text_for_key(key: str) -> str:
         ptg.keys.UP: "Up",
         ptg.keys.DOWN: "Down",
         ptg.keys.ESC: "Esc",
+        ptg.keys.TAB: "Tab",
+        ptg.keys.CTRL_R: "Ctrl+R",
     }
     return display_names.get(key, key)
\ No newline at end of file
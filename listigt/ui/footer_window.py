@@ -23,7 +23,7 @@ class FooterWindow(ptg.Window):
         if key == search_key and (not self._view_model.is_searching):
             self._search_input.select(0)
             self._view_model.update_search("")
-            self._search_input.prompt = "Search: "
+            self._search_input.show_search_prompt()
             return True
 
         return False
@@ -32,8 +32,19 @@ class HelpWindow(ptg.Window):
             Action.EDIT_ITEM,
             Action.TOGGLE_COMPLETE,
             Action.TOGGLE_HIDE_COMPLETE,
+            Action.UNDO,
+            Action.REDO,
+            None,
+            Action.VISUAL_MODE,
+            Action.TOGGLE_MARK,
+            Action.MOVE_SELECTION_HERE,
+            None,
+            Action.IMPORT_FROM_CLIPBOARD,
+            Action.EXPORT_ROOT,
+            Action.ARCHIVE_COMPLETED,
             None,
             Action.SEARCH,
+            Action.NEXT_SEARCH_MODE,
             Action.SELECT_NEXT_SEARCH_RESULT,
             Action.SELECT_PREVIOUS_SEARCH_RESULT,
             None,
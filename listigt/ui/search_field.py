@@ -3,6 +3,7 @@ from typing import Any
 import pyperclip
 import pytermgui as ptg
 
+from listigt.ui.action import ALL_ACTIONS, Action
 from listigt.view_model import view_model
 
 
@@ -21,6 +22,11 @@ class SearchInput(ptg.InputField):
         if not self._view_model.is_searching:
             return False
 
+        if key == ALL_ACTIONS[Action.NEXT_SEARCH_MODE].key:
+            self._view_model.next_search_mode()
+            self.show_search_prompt()
+            return True
+
         if super().handle_key(key):
             self._on_type()
             return True
@@ -48,6 +54,10 @@ class SearchInput(ptg.InputField):
             return True
         return False
 
+    def show_search_prompt(self):
+        mode = self._view_model.search_mode
+        self.prompt = "Search: " if mode == "exact" else f"Search ({mode}): "
+
     def _on_type(self):
         self._view_model.update_search(self.value)
 
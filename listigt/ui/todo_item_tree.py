@@ -1,13 +1,18 @@
+import functools
 from typing import Any
+from xml.etree import ElementTree
 
+import pyperclip
 import pytermgui as ptg
 from pytermgui import HorizontalAlignment
 
-from listigt.ui.action import Action, action_for_key, ALL_ACTIONS
+from listigt.import_export.importers import import_text
+from listigt.ui.action import Action, action_for_key, ALL_ACTIONS, display_text_for_key
 from listigt.ui.new_item_input import NewItemInput
 from listigt.ui.search_field import SearchInput
 from listigt.view_model import view_model
 from listigt.view_model.view_model import ListItem
+from listigt.utils.optional import Optional
 
 
 class TodoItemTree(ptg.Container):
@@ -38,13 +43,35 @@ class TodoItemTree(ptg.Container):
             Action.MOVE_ROOT_UP: self._view_model.move_root_upwards,
             Action.PASTE_ITEM_AFTER: self._view_model.paste_item,
             Action.PASTE_ITEM_BEFORE: lambda: self._view_model.paste_item(before=True),
+            Action.IMPORT_FROM_CLIPBOARD: self._import_from_clipboard,
+            Action.EXPORT_ROOT: self._view_model.export_root,
+            Action.ARCHIVE_COMPLETED: self._archive_completed,
             Action.EDIT_ITEM: self._view_model.start_edit,
             Action.TOGGLE_HIDE_COMPLETE: self._view_model.toggle_hide_complete_items,
             Action.UNDO: self._view_model.undo,
+            Action.REDO: self._view_model.redo,
             Action.TOGGLE_COMPLETE: self._view_model.toggle_complete,
             Action.COLLAPSE: self._view_model.toggle_collapse_node,
+            Action.VISUAL_MODE: self._view_model.toggle_visual_mode,
+            Action.TOGGLE_MARK: self._view_model.toggle_mark,
+            Action.MOVE_SELECTION_HERE: self._view_model.move_selection_here,
         }
 
+    def _archive_completed(self):
+        # Only done when the key is pressed twice in a row
+        if self._view_model.num_items_to_archive.has_value():
+            self._view_model.archive_completed()
+        else:
+            self._view_model.start_archive()
+
+    def _import_from_clipboard(self):
+        try:
+            imported_root = import_text(pyperclip.paste())
+        except (ElementTree.ParseError, ValueError, KeyError):
+            # Not an outline in any of the formats we know
+            return
+        self._view_model.import_items(imported_root)
+
     def _create_edit_item_widget(self, value: str = ""):
         def on_edit_item_submit(text):
             self._view_model.finish_edit(text)
@@ -96,7 +123,13 @@ class TodoItemTree(ptg.Container):
         if self._view_model.is_editing:
             return self.edit_item_field.handle_key(key)
 
-        if action := action_for_key(key).value_or_none():
+        self._view_model.message = Optional.none()
+        action = action_for_key(key).value_or_none()
+        if action is not Action.ARCHIVE_COMPLETED and self._view_model.num_items_to_archive.has_value():
+            # Any other key cancels archiving
+            self._view_model.cancel_archive()
+            self._update_widgets()
+        if action:
             if action in self._key_handlers:
                 self._key_handlers[action]()
                 self._update_widgets()
@@ -114,6 +147,9 @@ class TodoItemTree(ptg.Container):
     def on_resize(self):
         self._update_widgets()
 
+    def refresh(self):
+        self._update_widgets()
+
     def _update_widgets(self):
         def update_texts_for_labels(list_items):
             for index, label in enumerate(self._item_labels):
@@ -125,7 +161,18 @@ class TodoItemTree(ptg.Container):
                     label.value = ""
 
             list_title, breadcrumbs = self._view_model.list_title()
-            self._title_label.value = f"[gray]{breadcrumbs}[bold primary]{list_title}"
+            progress = self._view_model.root_progress()
+            self._title_label.value = (
+                f"[gray]{breadcrumbs}[bold primary]{list_title}[/] [gray]{progress}"
+            )
+            if num_items := self._view_model.num_items_to_archive.value_or_none():
+                key = display_text_for_key(ALL_ACTIONS[Action.ARCHIVE_COMPLETED].key)
+                self._title_label.value = (
+                    f"[bold]Press {key} again to archive {num_items} completed items, "
+                    "any other key to cancel"
+                )
+            if message := self._view_model.message.value_or_none():
+                self._title_label.value = f"[bold red]{message}"
 
         def show_or_hide_input_field(list_items):
             input_field_visible = self.input_field in self._widgets
@@ -169,18 +216,43 @@ class TodoItemTree(ptg.Container):
         show_or_hide_edit_field(list_items)
 
     def _text_for_list_item(self, item: ListItem) -> str:
-        def symbol_for_item(item: ListItem) -> str:
-            if not item.has_children:
-                return "•"
-            elif item.is_collapsed:
-                return "►"
-            return "▼"
-
         highlighted = item.is_selected and not self._view_model.is_inserting
-        style = "[inverse]" if highlighted else ""
-        symbol = symbol_for_item(item)
-        completed_style = "[strikethrough forestgreen]" if item.is_completed else ""
-        search_style = "[yellow]" if item.is_search_result else ""
-        return (
-            style + completed_style + search_style + symbol + " " + item.text
+        return _markup_for_item(
+            item.text,
+            item.has_children,
+            item.is_collapsed,
+            highlighted,
+            item.is_completed,
+            item.is_search_result,
+            item.progress,
+            item.is_marked,
         )
+
+
+@functools.lru_cache(maxsize=view_model.LABEL_CACHE_SIZE)
+def _markup_for_item(
+    text: str,
+    has_children: bool,
+    is_collapsed: bool,
+    highlighted: bool,
+    is_completed: bool,
+    is_search_result: bool,
+    progress: str,
+    is_marked: bool,
+) -> str:
+    if not has_children:
+        symbol = "•"
+    elif is_collapsed:
+        symbol = "►"
+    else:
+        symbol = "▼"
+    if highlighted:
+        style = "[inverse]"
+    elif is_marked:
+        style = "[@surface]"
+    else:
+        style = ""
+    completed_style = "[strikethrough forestgreen]" if is_completed else ""
+    search_style = "[yellow]" if is_search_result else ""
+    progress_text = f" [/inverse dim]{progress}" if progress else ""
+    return style + completed_style + search_style + symbol + " " + text + progress_text
@@ -7,6 +7,7 @@ from listigt.ui.todo_item_tree import TodoItemTree
 from listigt.view_model import view_model
 from listigt.ui.help_window import HelpWindow
 from listigt.ui.footer_window import FooterWindow
+from listigt.utils.optional import Optional
 
 
 def _define_layout() -> ptg.Layout:
@@ -39,10 +40,12 @@ def start_ui(vm: view_model.ViewModel):
 
         def on_resize(size: tuple[int, int]):
             w, h = size
-            vm.set_window_size(w - border_size * 2, h - border_size * 2)
-            todo_item_tree.on_resize()
+            with vm.lock:
+                vm.set_window_size(w - border_size * 2, h - border_size * 2)
+                todo_item_tree.on_resize()
 
         manager.resize_callback = on_resize
+        vm.on_background_update = Optional.some(todo_item_tree.refresh)
 
         body_window = ptg.Window(
             todo_item_tree,
@@ -55,6 +58,10 @@ def start_ui(vm: view_model.ViewModel):
         manager.add(footer_window, animate=False)
 
         def handle_key(key):
+            with vm.lock:
+                return _handle_key(key)
+
+        def _handle_key(key):
             key_handled = False
             if todo_item_tree.handle_key(key):
                 key_handled = True
@@ -0,0 +1,166 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, List, Tuple
+
+from listigt.todo_list.change_listener import ChangeListener
+from listigt.todo_list.tree import TreeNode
+from listigt.utils.optional import Optional
+
+# Old entries are dropped past either limit. Removed items are kept alive by
+# their entries, so the number of them is limited too.
+MAX_UNDO_ENTRIES = 1000
+MAX_UNDO_NODES = 100000
+
+
+class Command:
+    # A change to the tree that can be undone and done again, at the cost of
+    # the change itself. The listeners are told about it like they were when
+    # the change was first made.
+    node: TreeNode
+
+    def undo(self, listeners: List[ChangeListener]):
+        raise NotImplementedError
+
+    def redo(self, listeners: List[ChangeListener]):
+        raise NotImplementedError
+
+    @property
+    def num_nodes(self) -> int:
+        # How many nodes the command keeps alive
+        return 1
+
+
+@dataclass
+class InsertCommand(Command):
+    node: TreeNode
+    parent: TreeNode
+    index: int
+
+    def undo(self, listeners: List[ChangeListener]):
+        _remove(self.node, self.parent, self.index, listeners)
+
+    def redo(self, listeners: List[ChangeListener]):
+        _insert(self.node, self.parent, self.index, listeners)
+
+
+@dataclass
+class RemoveCommand(Command):
+    node: TreeNode
+    parent: TreeNode
+    index: int
+
+    def undo(self, listeners: List[ChangeListener]):
+        _insert(self.node, self.parent, self.index, listeners)
+
+    def redo(self, listeners: List[ChangeListener]):
+        _remove(self.node, self.parent, self.index, listeners)
+
+    @property
+    def num_nodes(self) -> int:
+        return 1 + sum(1 for _ in self.node.gen_all_nodes())
+
+
+@dataclass
+class MoveCommand(Command):
+    node: TreeNode
+    old_parent: TreeNode
+    old_index: int
+    new_parent: TreeNode
+    new_index: int
+
+    def undo(self, listeners: List[ChangeListener]):
+        _remove(self.node, self.new_parent, self.new_index, listeners)
+        _insert(self.node, self.old_parent, self.old_index, listeners)
+
+    def redo(self, listeners: List[ChangeListener]):
+        _remove(self.node, self.old_parent, self.old_index, listeners)
+        _insert(self.node, self.new_parent, self.new_index, listeners)
+
+
+@dataclass
+class ChangeCommand(Command):
+    # Sets an attribute of the item, like its text, complete or collapsed
+    node: TreeNode
+    attribute: str
+    old_value: Any
+    new_value: Any
+
+    def undo(self, listeners: List[ChangeListener]):
+        self._set(self.old_value, listeners)
+
+    def redo(self, listeners: List[ChangeListener]):
+        self._set(self.new_value, listeners)
+
+    def _set(self, value: Any, listeners: List[ChangeListener]):
+        setattr(self.node.data, self.attribute, value)
+        for listener in listeners:
+            listener.node_changed(self.node)
+
+
+def _insert(node: TreeNode, parent: TreeNode, index: int, listeners: List[ChangeListener]):
+    if index < len(parent.children):
+        parent.add_child(node, before_child=Optional.some(parent.children[index]))
+    else:
+        parent.add_child(node)
+    node.update_level_to_parent()
+    for listener in listeners:
+        listener.node_inserted(node)
+
+
+def _remove(node: TreeNode, parent: TreeNode, index: int, listeners: List[ChangeListener]):
+    parent.remove_child_at(index)
+    for listener in listeners:
+        listener.node_removed(node, parent, index)
+
+
+@dataclass
+class UndoEntry:
+    # The commands of one user action, in the order they were done
+    commands: List[Command]
+    selected_before: Optional[TreeNode]
+    selected_after: Optional[TreeNode]
+
+
+class UndoLog:
+    def __init__(self, max_entries: int = MAX_UNDO_ENTRIES, max_nodes: int = MAX_UNDO_NODES):
+        self._max_entries = max_entries
+        self._max_nodes = max_nodes
+        # With the number of nodes each entry keeps alive
+        self._undo_entries: Deque[Tuple[UndoEntry, int]] = deque()
+        self._redo_entries: List[Tuple[UndoEntry, int]] = []
+        self._num_nodes = 0
+
+    def __len__(self) -> int:
+        return len(self._undo_entries)
+
+    def record(self, entry: UndoEntry):
+        if not entry.commands:
+            return
+        num_nodes = sum(command.num_nodes for command in entry.commands)
+        self._undo_entries.append((entry, num_nodes))
+        self._num_nodes += num_nodes
+        # Whatever was undone before can't be redone on top of a new change
+        self._num_nodes -= sum(entry_nodes for _, entry_nodes in self._redo_entries)
+        self._redo_entries.clear()
+        while len(self._undo_entries) > self._max_entries or (
+            self._num_nodes > self._max_nodes and len(self._undo_entries) > 1
+        ):
+            self._num_nodes -= self._undo_entries.popleft()[1]
+
+    def undo(self) -> Optional[UndoEntry]:
+        # The entry to undo, it can be redone after that
+        if not self._undo_entries:
+            return Optional.none()
+        self._redo_entries.append(self._undo_entries.pop())
+        return Optional.some(self._redo_entries[-1][0])
+
+    def redo(self) -> Optional[UndoEntry]:
+        if not self._redo_entries:
+            return Optional.none()
+        self._undo_entries.append(self._redo_entries.pop())
+        return Optional.some(self._undo_entries[-1][0])
+
+    def clear(self):
+        self._undo_entries.clear()
+        self._redo_entries.clear()
+        self._num_nodes = 0
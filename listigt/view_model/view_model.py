@@ -1,17 +1,73 @@
 import copy
 import enum
+import functools
 import re
+import threading
+import time
+from collections import deque
 from dataclasses import dataclass
-from typing import List, Tuple
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterator, List, Set, Tuple
 
 from listigt.config import config
+from listigt.import_export import exporters
+from listigt.search.fuzzy import fuzzy_search
+from listigt.search.highlight import Spans, match_spans
+from listigt.search.parallel import ParallelSearcher
+from listigt.search.search_engine import SearchEngine, in_tree_order
+from listigt.search.search_worker import SearchWorker
+from listigt.storage.archive import Archive, completed_subtrees
+from listigt.storage.storage import Storage, TextFileStorage
 from listigt.utils.optional import Optional
+from listigt.todo_list.change_listener import ChangeListener
+from listigt.todo_list.node_index import NodeIndex
+from listigt.todo_list.subtree_stats import SubtreeStats
 from listigt.todo_list.todo_list import TodoItem
 from listigt.todo_list.tree import TreeNode
+from listigt.todo_list.tree_diff import sync_tree
+from listigt.view_model.undo_log import (
+    ChangeCommand,
+    Command,
+    InsertCommand,
+    MoveCommand,
+    RemoveCommand,
+    UndoEntry,
+    UndoLog,
+)
+
+LINK_PATTERN = re.compile(
+    r"((http|ftp|https):\/\/([\w_-]+(?:(?:\.[\w_-]+)+))([\w.,@?^=%&:\/~+#-]*[\w@?^=%&\/~+#-]))"
+)
+# Enough for the labels on a few screens, for each width and indentation
+LABEL_CACHE_SIZE = 4096
+# Around the characters a search matched, keeping the colour of the label
+MATCH_START = "[bold underline]"
+MATCH_END = "[/bold /underline]"
+# Searches start once no key has been pressed for this long, so that typing
+# a word doesn't start a search for every letter
+SEARCH_DEBOUNCE_SECONDS = 0.05
+# The first screenful of results should be shown this soon after the last
+# key press. Later results come in batches of SEARCH_BATCH_SIZE.
+SEARCH_LATENCY_TARGET_SECONDS = 0.15
+SEARCH_BATCH_SIZE = 1000
 
 
 @dataclass
 class ListItem:
+    # Reused between calls to list_items, there are lots of them
+    __slots__ = (
+        "text",
+        "indentation_level",
+        "is_selected",
+        "has_children",
+        "is_completed",
+        "is_collapsed",
+        "is_search_result",
+        "match_spans",
+        "progress",
+        "is_marked",
+    )
     text: str
     indentation_level: int
     is_selected: bool
@@ -19,6 +75,11 @@ class ListItem:
     is_completed: bool
     is_collapsed: bool
     is_search_result: bool
+    match_spans: Spans
+    # Like "12/40" for 12 of 40 items below it complete, empty without children
+    progress: str
+    # In the multi-selection
+    is_marked: bool
 
 
 @dataclass
@@ -34,68 +95,171 @@ class InsertionState(enum.Enum):
 
 
 class ViewModel:
-    def __init__(self, tree_root: TreeNode, config_manager: config.ConfigManager):
+    def __init__(
+        self,
+        tree_root: TreeNode,
+        config_manager: config.ConfigManager,
+        storage: Optional[Storage] = Optional.none(),
+    ):
         self._config_manager = config_manager
+        # Held while the tree is being changed or read outside of the UI thread
+        self.lock = threading.RLock()
+        self._storage = storage.value_or(TextFileStorage(config_manager.save_file))
+        # First, so that new items have their ids before they are saved
+        self._node_index = NodeIndex()
+        self._search_engine = SearchEngine()
+        self._subtree_stats = SubtreeStats()
+        # Searches run on the worker, so typing never waits for them
+        self._search_worker = SearchWorker()
+        self._parallel_searcher = ParallelSearcher()
+        self._change_listeners: List[ChangeListener] = [
+            self._node_index,
+            self._subtree_stats,
+            self._search_engine,
+            self._storage,
+        ]
+        # Called after the tree was changed from another thread, to redraw
+        self.on_background_update: Optional[Callable[[], None]] = Optional.none()
         self.tree_root = tree_root
         self.selected_node: Optional[TreeNode] = Optional.none()
         self._insertion_state = InsertionState.NOT_INSERTING
-        self._cut_item: Optional[TreeNode] = Optional.none()
+        self._cut_items: List[TreeNode] = []
+        # In visual mode, the rows from the anchor to the selection are
+        # selected, along with the items marked one by one
+        self._visual_anchor: Optional[TreeNode] = Optional.none()
+        self._marked_nodes: Set[TreeNode] = set()
         self._item_being_edited: Optional[TreeNode] = Optional.none()
         self._search_string: Optional[str] = Optional.none()
         self._search_results: List[TreeNode] = []
+        # The position of each node in _search_results
+        self._search_result_indices: Dict[TreeNode, int] = {}
+        # Casefolded query that _search_results were found for
+        self._searched_string: Optional[str] = Optional.none()
+        self._list_items: List[ListItem] = []
         self._state_before_search = StateBeforeSearch(
             selected_node=Optional.none(), collapsed_nodes=[]
         )
+        # Set if items were loaded from a save file without ids, or with
+        # duplicated ones, and have ids that the save file doesn't have yet
+        self.has_unsaved_ids = self._node_index.add_tree(tree_root) > 0
+        if self.has_unsaved_ids:
+            self._storage.tree_replaced(tree_root.root())
+        self._subtree_stats.tree_replaced(tree_root)
+        self._update_node_visibility()
         self._restore_saved_root_node()
 
         self.set_window_size(0, 0)
 
         if self.tree_root.children:
             self.selected_node = self.tree_root.first_child(only_visible=True)
+        self._restore_saved_selection()
 
-        self._undo_stack: List[TreeNode] = []
-
-        self._update_node_visibility()
+        self._undo_log = UndoLog()
+        # Set while waiting for archiving to be confirmed, to how many items
+        # would be archived
+        self._num_items_to_archive: Optional[int] = Optional.none()
+        # Shown to the user until the next key press, e.g. why something failed
+        self.message: Optional[str] = Optional.none()
 
     def save_to_file(self):
-        with open(self._config_manager.save_file, "w") as f:
-            f.write("\n".join([str(item) for item in self.tree_root.root().children]))
+        self._storage.save(self.tree_root.root())
+        self.has_unsaved_ids = False
+
+    def add_change_listener(self, listener: ChangeListener):
+        self._change_listeners.append(listener)
+
+    def apply_external_changes(self, new_tree_root: TreeNode):
+        top_level = self.tree_root.root()
+        sync_tree(top_level, new_tree_root, self._change_listeners)
+        # The logged changes may not fit the tree that came in
+        self._undo_log.clear()
+
+        if self.tree_root != top_level and not self.tree_root.is_descendant_of(top_level):
+            self.tree_root = top_level
+            self._config_manager.root_node_id = Optional.none()
+        if selected_node := self.selected_node.value_or_none():
+            if not selected_node.is_descendant_of(self.tree_root):
+                self.selected_node = self.tree_root.first_child(only_visible=True)
+        if self.is_searching:
+            # The old results can't be narrowed down after the tree changed
+            self._searched_string = Optional.none()
+            self._update_search_results()
+
+        self._update_node_visibility()
+        self._notify_background_update()
 
     def set_window_size(self, width: int, height: int):
         self._width = width
         self._num_items_on_screen = height
-        self._first_item_on_screen = 0
-        self._last_item_on_screen = self._num_items_on_screen
+        # The items on screen are found by walking from this one, so that
+        # the cost follows the window height and not the position in the tree
+        self._first_node_on_screen: Optional[TreeNode] = Optional.none()
+
+    def node_with_id(self, node_id: str) -> Optional[TreeNode]:
+        return self._node_index.node(node_id)
+
+    def save_state_to_config(self):
+        self._config_manager.selected_node_id = Optional(
+            self.selected_node.value().data.id if self.selected_node.has_value() else None
+        )
 
     def _restore_saved_root_node(self):
-        root_index = self._config_manager.root_node_index
-        root_node = self.tree_root.root().node_at_index(root_index.value_or(-1))
+        if root_id := self._config_manager.root_node_id.value_or_none():
+            root_node = self._node_index.node(root_id)
+        else:
+            root_index = self._config_manager.root_node_index
+            root_node = self.tree_root.root().node_at_index(root_index.value_or(-1))
         if root_node.has_value():
             self.set_as_root(root_node)
 
+    def _restore_saved_selection(self):
+        selected_id = self._config_manager.selected_node_id.value_or_none()
+        if selected_id is None:
+            return
+        selected_node = self._node_index.node(selected_id).value_or_none()
+        if selected_node and selected_node.is_descendant_of(self.tree_root):
+            if selected_node.visible:
+                self.selected_node = Optional.some(selected_node)
+
     @property
     def num_items_on_screen(self) -> int:
         return self._num_items_on_screen
 
     def list_items(self) -> List[ListItem]:
-        def list_item_from_node(node):
-            indent = node.level - self.tree_root.level - 1
-            is_selected = (
-                self.selected_node.has_value() and node == self.selected_node.value()
-            )
-            return ListItem(
-                text=self._label_display_text(node.data.text, indent, is_selected),
-                indentation_level=indent,
-                is_selected=is_selected,
-                has_children=node.has_children(),
-                is_completed=node.data.complete,
-                is_collapsed=node.data.collapsed,
-                is_search_result=node in self._search_results,
-            )
-
-        items = [list_item_from_node(node) for node in self._all_visible_nodes()]
-        self._update_scrolling(len(items))
-        return items[self._first_item_on_screen : self._last_item_on_screen]
+        # Only the items on screen are made, so the cost follows the window
+        # height and not the size of the tree
+        self._update_scrolling()
+        nodes_on_screen = self._nodes_on_screen()
+        selected_set = self._selected_set() if self.is_multi_selecting else set()
+        num_items = 0
+        for num_items, node in enumerate(nodes_on_screen, start=1):
+            if num_items > len(self._list_items):
+                self._list_items.append(
+                    ListItem("", 0, False, False, False, False, False, (), "", False)
+                )
+            self._update_list_item(self._list_items[num_items - 1], node, selected_set)
+        return self._list_items[:num_items]
+
+    def _update_list_item(self, item: ListItem, node: TreeNode, selected_set: Set[TreeNode]):
+        indent = node.level - self.tree_root.level - 1
+        is_selected = self.selected_node.has_value() and node == self.selected_node.value()
+        item.is_search_result = node in self._search_result_indices
+        # Only worked out for the results on screen
+        item.match_spans = (
+            match_spans(node.data.text, self._search_string.value(), self.search_mode)
+            if item.is_search_result and self._search_string.has_value()
+            else ()
+        )
+        item.text = self._label_display_text(
+            node.data.text, indent, is_selected, item.match_spans
+        )
+        item.indentation_level = indent
+        item.is_selected = is_selected
+        item.has_children = node.has_children()
+        item.is_completed = node.data.complete
+        item.is_collapsed = node.data.collapsed
+        item.progress = self._progress(node) if item.has_children else ""
+        item.is_marked = node in selected_set
 
     def list_title(self) -> Tuple[str, str]:
         top_level = self.tree_root.root()
@@ -112,13 +276,18 @@ class ViewModel:
                 break
         return list_title, breadcrumbs
 
+    def root_progress(self) -> str:
+        # For the items below the current root, shown next to list_title
+        return self._progress(self.tree_root)
+
+    def _progress(self, node: TreeNode) -> str:
+        num_completed, num_descendants = self._subtree_stats.progress(node)
+        return f"{num_completed}/{num_descendants}"
+
     def toggle_hide_complete_items(self):
         self._config_manager.hide_complete_items = (
             not self._config_manager.hide_complete_items
         )
-        self._last_item_on_screen = (
-            self._first_item_on_screen + self._num_items_on_screen
-        )
         if (
             self.selected_node.has_value()
             and self._config_manager.hide_complete_items
@@ -151,22 +320,16 @@ class ViewModel:
             )
 
     def select_bottom(self):
-        nodes_list = list(self._all_visible_nodes())
-        if len(nodes_list) >= self._last_item_on_screen - 1:
-            self.selected_node = Optional.some(
-                nodes_list[self._last_item_on_screen - 1]
-            )
+        if nodes_on_screen := self._nodes_on_screen():
+            self.selected_node = Optional.some(nodes_on_screen[-1])
 
     def select_top(self):
-        nodes_list = list(self._all_visible_nodes())
-        if len(nodes_list) >= self._first_item_on_screen:
-            self.selected_node = Optional.some(nodes_list[self._first_item_on_screen])
+        if nodes_on_screen := self._nodes_on_screen():
+            self.selected_node = Optional.some(nodes_on_screen[0])
 
     def select_middle(self):
-        nodes_list = list(self._all_visible_nodes())
-        middle_index = (self._first_item_on_screen + self._last_item_on_screen) // 2
-        if len(nodes_list) >= middle_index:
-            self.selected_node = Optional.some(nodes_list[middle_index])
+        if nodes_on_screen := self._nodes_on_screen():
+            self.selected_node = Optional.some(nodes_on_screen[len(nodes_on_screen) // 2])
 
     def select_first(self):
         self.selected_node = self.tree_root.first_child(only_visible=True)
@@ -177,38 +340,34 @@ class ViewModel:
 
         # TODO: handle missing tree_root value properly
         self.tree_root = node.value()
-        self.tree_root.data.collapsed = False
-        self._config_manager.root_node_index = self.tree_root.root().index_for_node(
-            self.tree_root
-        )
-        self._update_node_visibility()
+        if self.tree_root.data.collapsed:
+            self.tree_root.data.collapsed = False
+            self._notify_node_changed(self.tree_root)
+        self._config_manager.root_node_id = Optional.some(self.tree_root.data.id)
+        self._update_node_visibility(Optional.some(self.tree_root))
         self.selected_node = self.tree_root.first_child(only_visible=True)
 
     def move_root_upwards(self):
         if self.tree_root.parent.has_value():
             self.selected_node = Optional.some(self.tree_root)
             self.tree_root = self.tree_root.parent.value()
-            self._first_item_on_screen = self.index_of_selected_node()
-            self._last_item_on_screen = (
-                self._first_item_on_screen + self._num_items_on_screen
-            )
-            try:
-                self._config_manager.root_node_index = (
-                    self.tree_root.root().index_for_node(self.tree_root)
-                )
-            except ValueError:
-                pass
+            self._first_node_on_screen = self.selected_node
+            self._config_manager.root_node_id = Optional(self.tree_root.data.id or None)
 
     def toggle_collapse_node(self):
-        if self.selected_node.has_value():
-            self.selected_node.value().data.collapsed = (
-                not self.selected_node.value().data.collapsed
-            )
-        self._last_item_on_screen = (
-            self._first_item_on_screen + self._num_items_on_screen
-        )
-
-        self._update_node_visibility()
+        # Collapses all of the selected items, unless they all are already
+        nodes = self.multi_selection()
+        if nodes:
+            collapsed = not all(node.data.collapsed for node in nodes)
+            commands = []
+            for node in nodes:
+                if node.data.collapsed != collapsed:
+                    node.data.collapsed = collapsed
+                    self._notify_node_changed(node)
+                    self._update_node_visibility(Optional.some(node))
+                    commands.append(ChangeCommand(node, "collapsed", not collapsed, collapsed))
+            self._record_undo(commands, selected_before=self.selected_node)
+            self.clear_multi_selection()
 
     def start_insert_before(self):
         self._insertion_state = InsertionState.BEFORE
@@ -233,7 +392,7 @@ class ViewModel:
         return self._insertion_state is not InsertionState.NOT_INSERTING
 
     def insert_item(self, item_text: str):
-        self._push_undo_state()
+        selected_before = self.selected_node
         new_node = TreeNode(data=TodoItem(item_text))
         if selected_node := self.selected_node.value_or_none():
             should_add_node_as_child = (
@@ -248,9 +407,10 @@ class ViewModel:
                     selected_node.add_sibling_before_self(new_node)
         else:
             self.tree_root.add_child(new_node)
+        self._notify_node_inserted(new_node)
         self._insertion_state = InsertionState.NOT_INSERTING
         self.selected_node = Optional.some(new_node)
-        self._last_item_on_screen += 1
+        self._record_undo([_insert_command(new_node)], selected_before)
 
     def insertion_indent(self) -> int:
         if selected_node := self.selected_node.value_or_none():
@@ -272,8 +432,12 @@ class ViewModel:
     def finish_edit(self, new_text: str):
         assert self.is_editing
         assert self.selected_node.has_value()
-        self.selected_node.value().data.text = new_text
+        node = self.selected_node.value()
+        command = ChangeCommand(node, "text", node.data.text, new_text)
+        node.data.text = new_text
+        self._notify_node_changed(node)
         self._item_being_edited = Optional.none()
+        self._record_undo([command], selected_before=self.selected_node)
 
     @property
     def is_editing(self):
@@ -284,205 +448,673 @@ class ViewModel:
         return self._search_string.has_value()
 
     def update_search(self, search_string: str):
-        if search_string == "" and self._state_before_search.selected_node.is_none():
+        # The results are shown when they are found, on_background_update is
+        # called for each batch of them
+        is_starting = search_string == "" and self._state_before_search.selected_node.is_none()
+        if is_starting:
             self._state_before_search.selected_node = self.selected_node
 
         self._search_string = Optional.some(search_string)
-        self._update_search_results()
-        if self._search_results:
-            self.selected_node = Optional.some(self._search_results[0])
+        self._update_search_results(select_first=True)
+        if is_starting:
+            self._search_worker.submit(self._prepare_search_job())
 
-        self._update_node_visibility()
+    @property
+    def search_mode(self) -> str:
+        return self._config_manager.search_mode
+
+    def next_search_mode(self):
+        modes = config.SEARCH_MODES
+        index = modes.index(self.search_mode) if self.search_mode in modes else -1
+        self._config_manager.search_mode = modes[(index + 1) % len(modes)]
+        if self.is_searching:
+            self._set_search_results([])
+            self._update_search_results(select_first=True)
+
+    def stop_searches(self):
+        # Cancels the search that is running and stops the search worker and
+        # the processes of the regex search
+        self._search_worker.stop()
+        self._parallel_searcher.shutdown()
+
+    def wait_for_search(self, timeout: float = None) -> bool:
+        # False if the search was still running after timeout
+        return self._search_worker.wait_until_idle(timeout)
 
     def cancel_search(self):
+        self._search_worker.cancel()
         self._search_string = Optional.none()
-        self._search_results = []
+        self._set_search_results([])
         self._restore_search_state()
 
-        self._update_node_visibility()
-
     def finish_search(self):
+        self._search_worker.cancel()
         self._search_string = Optional.none()
-        self._search_results = []
+        self._set_search_results([])
 
     def select_next_search_result(self):
-        for i, search_result in enumerate(self._search_results):
-            if search_result == self.selected_node.value():
-                self.selected_node = Optional.some(
-                    self._search_results[(i + 1) % len(self._search_results)]
-                )
-                break
+        self._select_search_result(step=1)
 
     def select_previous_search_result(self):
-        for i, search_result in enumerate(self._search_results):
-            if search_result == self.selected_node.value():
-                self.selected_node = Optional.some(
-                    self._search_results[(i - 1) % len(self._search_results)]
-                )
-                break
+        self._select_search_result(step=-1)
 
-    def _is_search_result(self, node: TreeNode) -> bool:
-        if not self.is_searching:
-            return False
-        return self._search_string.value().lower() in node.data.text.lower()
+    def _select_search_result(self, step: int):
+        index = self._search_result_indices.get(self.selected_node.value_or_none())
+        if index is not None:
+            self.selected_node = Optional.some(
+                self._search_results[(index + step) % len(self._search_results)]
+            )
 
-    def _update_search_results(self):
-        if len(self._search_string.value_or("")) < 2:
-            self._search_results = []
+    def _update_search_results(self, select_first: bool = False):
+        search_string = self._search_string.value_or("")
+        # Results from an earlier search would be out of date
+        self._search_worker.cancel()
+        if len(search_string) < 2:
+            self._set_search_results([])
             return
 
+        if self.search_mode == "regex":
+            # Case is ignored by the pattern, not by changing it
+            job = self._regex_search_job(search_string, select_first)
+        elif self.search_mode == "fuzzy":
+            job = self._fuzzy_search_job(search_string.casefold(), select_first)
+        else:
+            job = self._exact_search_job(search_string.casefold(), select_first)
+        self._search_worker.submit(job, delay=SEARCH_DEBOUNCE_SECONDS)
+
+    def _prepare_search_job(self):
+        # Gets the search index ready while the first letters are typed, so
+        # that the first search doesn't have to
+        def run(is_cancelled: Callable[[], bool]):
+            self._prepare_search(is_cancelled)
+
+        return run
+
+    def _prepare_search(self, is_cancelled: Callable[[], bool]) -> bool:
+        # Makes the search index from a copy of the texts, without holding
+        # the lock. False if cancelled before it was done.
+        while True:
+            with self.lock:
+                if is_cancelled():
+                    return False
+                if self._search_engine.is_prepared():
+                    return True
+                texts, version = self._search_engine.copy_texts(self.tree_root)
+            prepared = self._search_engine.prepare(texts, version, is_cancelled)
+            if prepared.is_none():
+                return False
+            with self.lock:
+                if self._search_engine.set_prepared(prepared.value()):
+                    return True
+            # The tree was changed meanwhile, so copy it again
+
+    def _exact_search_job(self, search_string: str, select_first: bool):
+        # Shows the first screenful of results as soon as it is found, and
+        # the rest in batches after it. The lock is let go between batches.
+        def run(is_cancelled: Callable[[], bool]):
+            if not self._prepare_search(is_cancelled):
+                return
+            search_results: Iterator[TreeNode] = iter([])
+            batch_size = max(self._num_items_on_screen, 1)
+            is_first_batch = True
+            while True:
+                with self.lock:
+                    if is_cancelled():
+                        return
+                    if is_first_batch:
+                        search_results = self._find_search_results(search_string)
+                    batch = list(islice(search_results, batch_size))
+                    if is_first_batch:
+                        self._set_search_results([])
+                    self._add_search_results(batch, select_first)
+                    is_done = len(batch) < batch_size
+                    if is_done:
+                        self._searched_string = Optional.some(search_string)
+                    self._notify_background_update()
+                if is_done:
+                    return
+                is_first_batch = False
+                batch_size = SEARCH_BATCH_SIZE
+
+        return run
+
+    def _find_search_results(self, search_string: str) -> Iterator[TreeNode]:
+        searched_string = self._searched_string.value_or_none()
+        if searched_string is not None and searched_string in search_string:
+            # Everything that matches now matched the last query too
+            previous_results = self._search_results
+            return (
+                node for node in previous_results if search_string in node.data.text.casefold()
+            )
+        return iter(self._search_engine.search(self.tree_root, search_string))
+
+    def _fuzzy_search_job(self, search_string: str, select_first: bool):
+        # Scores a copy of the texts without holding the lock, the results
+        # are only shown if no other search has been started since
+        def run(is_cancelled: Callable[[], bool]):
+            with self.lock:
+                if is_cancelled():
+                    return
+                entries = self._search_engine.fuzzy_entries(self.tree_root)
+            search_results = fuzzy_search(entries, search_string, is_cancelled)
+            with self.lock:
+                if search_results.is_none() or is_cancelled():
+                    return
+                self._set_search_results([])
+                self._add_search_results(search_results.value(), select_first)
+                self._notify_background_update()
+
+        return run
+
+    def _regex_search_job(self, pattern: str, select_first: bool):
+        # Like the fuzzy search, the texts are searched without holding the
+        # lock. Big trees are split up and searched in several processes.
+        def run(is_cancelled: Callable[[], bool]):
+            with self.lock:
+                if is_cancelled():
+                    return
+                shards = self._search_engine.shards(
+                    self.tree_root, self._parallel_searcher.num_shards
+                )
+            try:
+                search_results = self._parallel_searcher.search(shards, pattern, is_cancelled)
+            except re.error:
+                # Not a whole pattern yet, while it's being typed
+                search_results = Optional.some([])
+            with self.lock:
+                if search_results.is_none() or is_cancelled():
+                    return
+                self._set_search_results([])
+                self._add_search_results(search_results.value(), select_first)
+                self._notify_background_update()
+
+        return run
+
+    def _add_search_results(self, search_results: List[TreeNode], select_first: bool):
         def uncollapse_parents(node):
             if node.parent.value().data.collapsed:
                 node.parent.value().data.collapsed = False
+                self._notify_node_changed(node.parent.value())
                 self._state_before_search.collapsed_nodes.append(node.parent.value())
                 uncollapse_parents(node.parent.value())
 
-        self._search_results = [
-            node
-            for node in self.tree_root.gen_all_nodes()
-            if self._is_search_result(node)
-        ]
-        for result in self._search_results:
-            uncollapse_parents(result)
+        if select_first and search_results and not self._search_results:
+            self.selected_node = Optional.some(search_results[0])
+        num_collapsed_before = len(self._state_before_search.collapsed_nodes)
+        for node in search_results:
+            self._search_result_indices[node] = len(self._search_results)
+            self._search_results.append(node)
+            uncollapse_parents(node)
+        for node in self._state_before_search.collapsed_nodes[num_collapsed_before:]:
+            self._update_node_visibility(Optional.some(node))
+
+    def _set_search_results(self, search_results: List[TreeNode]):
+        self._search_results = search_results
+        self._search_result_indices = {node: i for i, node in enumerate(search_results)}
+        self._searched_string = Optional.none()
 
     def _restore_search_state(self):
         self.selected_node = self._state_before_search.selected_node
         for node in self._state_before_search.collapsed_nodes:
             node.data.collapsed = True
+            self._notify_node_changed(node)
+            self._update_node_visibility(Optional.some(node))
         self._state_before_search = StateBeforeSearch(
             selected_node=Optional.none(), collapsed_nodes=[]
         )
 
     def toggle_complete(self):
-        if self.selected_node.is_none():
+        # Completes the selected items and everything below them, or if they
+        # are all complete already, makes just them not complete
+        nodes_to_complete = self.multi_selection()
+        if not nodes_to_complete:
             return
 
         # Need to move selection before completing, or select_previous will not work
-        node_to_complete = self.selected_node
+        selected_before = self.selected_node
         if self._config_manager.hide_complete_items:
-            self.select_previous()
+            self.selected_node = Optional.some(
+                self.tree_root.node_before(nodes_to_complete[0], only_visible=True)
+            )
 
-        if not node_to_complete.value().data.complete:
+        commands = []
+        if not all(node.data.complete for node in nodes_to_complete):
 
             def set_complete(node):
-                node.data.complete = True
+                if not node.data.complete:
+                    node.data.complete = True
+                    self._notify_node_changed(node)
+                    commands.append(ChangeCommand(node, "complete", False, True))
 
-            node_to_complete.value().apply_to_self_and_children(set_complete)
+            for node in nodes_to_complete:
+                node.apply_to_self_and_children(set_complete)
         else:
-            node_to_complete.value().data.complete = False
+            for node in nodes_to_complete:
+                node.data.complete = False
+                self._notify_node_changed(node)
+                commands.append(ChangeCommand(node, "complete", True, False))
 
-        self._update_node_visibility()
+        # The subtrees don't overlap, so this goes through each node once
+        for node in nodes_to_complete:
+            self._update_node_visibility(Optional.some(node))
+        self._record_undo(commands, selected_before)
+        self.clear_multi_selection()
+
+    @property
+    def is_multi_selecting(self) -> bool:
+        return self._visual_anchor.has_value() or bool(self._marked_nodes)
+
+    def toggle_visual_mode(self):
+        if self._visual_anchor.has_value():
+            self._visual_anchor = Optional.none()
+        else:
+            self._visual_anchor = self.selected_node
+
+    def toggle_mark(self):
+        if node := self.selected_node.value_or_none():
+            if node in self._marked_nodes:
+                self._marked_nodes.remove(node)
+            else:
+                self._marked_nodes.add(node)
+
+    def clear_multi_selection(self):
+        self._visual_anchor = Optional.none()
+        self._marked_nodes.clear()
+
+    def multi_selection(self) -> List[TreeNode]:
+        # The items that the next change applies to, in the order they are
+        # listed. Items below another selected item are left out, since
+        # changes to an item apply to the ones below it too.
+        if not self.is_multi_selecting:
+            return [self.selected_node.value()] if self.selected_node.has_value() else []
+
+        selected = self._selected_set()
+        return [
+            node
+            for node in in_tree_order(selected)
+            if not any(ancestor in selected for ancestor in _ancestors(node))
+        ]
+
+    def _selected_set(self) -> Set[TreeNode]:
+        selected = {node for node in self._marked_nodes if node.is_descendant_of(self.tree_root)}
+        anchor = self._visual_anchor.value_or_none()
+        if anchor is None or self.selected_node.is_none():
+            return selected
+        cursor = self.selected_node.value()
+        if not anchor.visible or not anchor.is_descendant_of(self.tree_root):
+            # Hidden since visual mode was started
+            anchor = cursor
+
+        is_in_range = False
+        for node in self._all_visible_nodes():
+            is_end = node is anchor or node is cursor
+            if is_end or is_in_range:
+                selected.add(node)
+            if is_end:
+                if is_in_range or anchor is cursor:
+                    break
+                is_in_range = True
+        return selected
 
     def index_of_selected_node(self) -> int:
-        for index, item in enumerate(self._all_visible_nodes()):
+        # Among the items on screen
+        for index, item in enumerate(self._nodes_on_screen()):
             if self.selected_node.has_value() and (item == self.selected_node.value()):
                 return index
         return 0
 
     def delete_item(self):
-        self._push_undo_state()
-        if node_to_remove := self.selected_node.value_or_none():
-            self._cut_item = Optional.some(node_to_remove)
-            self.select_previous()
-            self.tree_root.remove_node(node_to_remove)
-            self.select_next()
-            if not self.tree_root.has_children():
-                self.selected_node = Optional.none()
+        # Cuts the selected items, so they can be pasted somewhere else
+        nodes_to_remove = self.multi_selection()
+        if not nodes_to_remove:
+            return
+
+        selected_before = self.selected_node
+        self._cut_items = nodes_to_remove
+        self.selected_node = Optional.some(
+            self.tree_root.node_before(nodes_to_remove[0], only_visible=True)
+        )
+        commands: List[Command] = []
+        for node in nodes_to_remove:
+            old_parent = node.parent.value()
+            old_index = old_parent.children.index(node)
+            old_parent.remove_node(node)
+            self._notify_node_removed(node, old_parent, old_index)
+            commands.append(RemoveCommand(node, old_parent, old_index))
+        self.select_next()
+        if not self.tree_root.has_children():
+            self.selected_node = Optional.none()
+        elif not self.selected_node.value().is_descendant_of(self.tree_root):
+            # It was below one of the removed items
+            self.selected_node = self.tree_root.first_child(only_visible=True)
+        self._record_undo(commands, selected_before)
+        self.clear_multi_selection()
 
     def paste_item(self, before=False):
-        if self._cut_item.is_none():
+        if not self._cut_items:
             return
 
-        if self.selected_node.has_value():
-            if before:
-                self.selected_node.value().add_sibling_before_self(
-                    self._cut_item.value()
-                )
+        selected_before = self.selected_node
+        commands: List[Command] = []
+        previous_node = self.selected_node
+        for node in self._cut_items:
+            if selected_node := self.selected_node.value_or_none():
+                if before:
+                    selected_node.add_sibling_before_self(node)
+                else:
+                    previous_node.value().add_sibling_after_self(node)
             else:
-                self.selected_node.value().add_sibling_after_self(
-                    self._cut_item.value()
-                )
-        else:
-            self.tree_root.add_child(self._cut_item.value())
-        self._cut_item.value().update_level_to_parent()
-        self._cut_item = Optional.none()
+                self.tree_root.add_child(node)
+            node.update_level_to_parent()
+            self._notify_node_inserted(node)
+            self._update_node_visibility(Optional.some(node))
+            commands.append(_insert_command(node))
+            previous_node = Optional.some(node)
+        self._record_undo(commands, selected_before)
+        self._cut_items = []
+
+    def move_selection_here(self):
+        # Moves the multi-selection to after the selected item, apart from
+        # the items that the selected item is in
+        target = self.selected_node.value_or_none()
+        if target is None or not self.is_multi_selecting:
+            return
 
-    def undo(self):
-        if not self._undo_stack:
+        commands: List[Command] = []
+        previous_node = target
+        for node in self.multi_selection():
+            if node is target or target.is_descendant_of(node):
+                continue
+            old_parent = node.parent.value()
+            old_index = old_parent.children.index(node)
+            old_parent.remove_node(node)
+            self._notify_node_removed(node, old_parent, old_index)
+            previous_node.add_sibling_after_self(node)
+            node.update_level_to_parent()
+            self._notify_node_inserted(node)
+            self._update_node_visibility(Optional.some(node))
+            new_parent = node.parent.value()
+            new_index = new_parent.children.index(node)
+            commands.append(MoveCommand(node, old_parent, old_index, new_parent, new_index))
+            previous_node = node
+        self._record_undo(commands, selected_before=self.selected_node)
+        self.clear_multi_selection()
+
+    def import_items(self, imported_root: TreeNode):
+        # Adds the top level items of imported_root after the selection
+        if not imported_root.has_children():
             return
 
-        tree_root_index = self.tree_root.root().index_for_node(self.tree_root)
-        selected_node_index = (  # TODO: clean up
-            None
-            if self.selected_node.is_none()
-            else self.tree_root.root().index_for_node(self.selected_node.value())
-        )
+        selected_before = self.selected_node
+        imported_nodes = list(imported_root.children)
+        previous_node = self.selected_node
+        commands: List[Command] = []
+        for node in imported_nodes:
+            imported_root.remove_node(node)
+            if previous_node.has_value():
+                previous_node.value().add_sibling_after_self(node)
+            else:
+                self.tree_root.add_child(node)
+            node.update_level_to_parent()
+            self._notify_node_inserted(node)
+            self._update_node_visibility(Optional.some(node))
+            commands.append(_insert_command(node))
+            previous_node = Optional.some(node)
+        self.selected_node = Optional.some(imported_nodes[0])
+        self._record_undo(commands, selected_before)
+
+    def start_archive(self):
+        # Archiving clears the undo log, so the UI asks before it is done
+        nodes = completed_subtrees(self.tree_root.root(), keep=self.tree_root)
+        if nodes:
+            self._num_items_to_archive = Optional.some(len(nodes))
 
-        undo_state = self._undo_stack.pop()
-        self.tree_root = undo_state
+    @property
+    def num_items_to_archive(self) -> Optional[int]:
+        return self._num_items_to_archive
+
+    def cancel_archive(self):
+        self._num_items_to_archive = Optional.none()
+
+    def archive_completed(self) -> int:
+        # Moves the completed subtrees to the archive file, except the ones
+        # with the current root in them. Returns how many were moved.
+        self._num_items_to_archive = Optional.none()
+        nodes = completed_subtrees(self.tree_root.root(), keep=self.tree_root)
+        self._config_manager.last_archived = Optional.some(time.time())
+        if not nodes:
+            return 0
+
+        Archive(self._config_manager.archive_file).add(nodes)
+        for node in nodes:
+            parent = node.parent.value()
+            index = parent.children.index(node)
+            parent.remove_node(node)
+            self._notify_node_removed(node, parent, index)
+        # Undoing would bring back items that are in the archive now
+        self._undo_log.clear()
 
-        if tree_root_index.has_value():
-            self.set_as_root(
-                self.tree_root.root().node_at_index(tree_root_index.value())
-            )
-        if selected_node_index.has_value():
-            self.selected_node = self.tree_root.root().node_at_index(
-                selected_node_index.value()
-            )
+        if selected_node := self.selected_node.value_or_none():
+            if not selected_node.is_descendant_of(self.tree_root):
+                self.selected_node = self.tree_root.first_child(only_visible=True)
+        return len(nodes)
+
+    def export_root(self) -> Optional[Path]:
+        export_file = self._config_manager.export_file
+        export_format = self._config_manager.export_format
+        if not export_file.suffix:
+            export_file = export_file.with_suffix(exporters.SUFFIXES[export_format])
+        try:
+            exporters.export_to_path(self.tree_root, export_format, export_file)
+        except OSError as e:
+            self.message = Optional.some(f"Could not export to {export_file}: {e.strerror}")
+            return Optional.none()
+        return Optional.some(export_file)
 
-        self._update_node_visibility()
+    def undo(self):
+        if entry := self._undo_log.undo().value_or_none():
+            top_level = self.tree_root.root()
+            for command in reversed(entry.commands):
+                command.undo(self._change_listeners)
+            self._after_undo_or_redo(top_level, entry.commands, entry.selected_before)
+
+    def redo(self):
+        if entry := self._undo_log.redo().value_or_none():
+            top_level = self.tree_root.root()
+            for command in entry.commands:
+                command.redo(self._change_listeners)
+            self._after_undo_or_redo(top_level, entry.commands, entry.selected_after)
+            removed = [
+                command.node for command in entry.commands if isinstance(command, RemoveCommand)
+            ]
+            if removed:
+                # Cut again, so they can be pasted like the first time
+                self._cut_items = removed
+
+    def _after_undo_or_redo(
+        self, top_level: TreeNode, commands: List[Command], selection: Optional[TreeNode]
+    ):
+        for command in commands:
+            self._update_node_visibility(Optional.some(command.node))
+
+        # top_level is found before the commands run, since they can take
+        # tree_root out of the tree
+        if self.tree_root != top_level and not self.tree_root.is_descendant_of(top_level):
+            # The root was taken out of the tree
+            self.tree_root = top_level
+            self._config_manager.root_node_id = Optional.none()
+        # The ones that were put back would be added twice if pasted
+        self._cut_items = [
+            node for node in self._cut_items if not node.is_descendant_of(top_level)
+        ]
+        self.clear_multi_selection()
+
+        selected_node = selection.value_or_none()
+        if selected_node and selected_node.visible:
+            if selected_node.is_descendant_of(self.tree_root):
+                self.selected_node = selection
+                return
+        self.selected_node = self.tree_root.first_child(only_visible=True)
 
-    def _update_scrolling(self, num_lines: int):
+    def _update_scrolling(self):
+        # Scrolls as little as needed to show the selection. When it has gone
+        # further down than the items just below the screen, it is shown at
+        # the top instead of walking down to it.
+        first_node = self._valid_first_node_on_screen()
+        num_lines = sum(1 for _ in islice(self._all_visible_nodes(), self._num_items_on_screen + 1))
         if num_lines <= self._num_items_on_screen:
-            self._first_item_on_screen = 0
-            self._last_item_on_screen = num_lines
-
-        selection_index = self.index_of_selected_node()
-        if selection_index < self._first_item_on_screen:
-            self._first_item_on_screen = selection_index
-            self._last_item_on_screen = min(
-                self._first_item_on_screen + self._num_items_on_screen, num_lines
-            )
-        elif selection_index >= self._last_item_on_screen:
-            self._last_item_on_screen = selection_index + 1
-            self._first_item_on_screen = max(
-                0, self._last_item_on_screen - self._num_items_on_screen
-            )
+            first_node = self.tree_root.first_child(only_visible=True).value_or_none()
+        self._first_node_on_screen = Optional(first_node)
+        selected_node = self.selected_node.value_or_none()
+        if first_node is None or selected_node is None or not self._is_listed(selected_node):
+            return
+
+        if _listed_path(selected_node, self.tree_root) < _listed_path(first_node, self.tree_root):
+            self._first_node_on_screen = Optional.some(selected_node)
+            return
+        last_nodes: Deque[TreeNode] = deque(maxlen=max(self._num_items_on_screen, 1))
+        for node in islice(self._visible_nodes_from(first_node), 2 * self._num_items_on_screen):
+            last_nodes.append(node)
+            if node is selected_node:
+                if len(last_nodes) == last_nodes.maxlen:
+                    self._first_node_on_screen = Optional.some(last_nodes[0])
+                return
+        self._first_node_on_screen = Optional.some(selected_node)
+
+    def _valid_first_node_on_screen(self) -> TreeNode | None:
+        # Scrolls to the selection if the first item on screen was removed or
+        # hidden, or to the top if it wasn't set or there is no selection
+        first_node = self._first_node_on_screen.value_or_none()
+        if first_node is not None and self._is_listed(first_node):
+            return first_node
+        selected_node = self.selected_node.value_or_none()
+        if first_node is not None and selected_node is not None and self._is_listed(selected_node):
+            return selected_node
+        return self.tree_root.first_child(only_visible=True).value_or_none()
+
+    def _is_listed(self, node: TreeNode) -> bool:
+        return node.visible and node.is_descendant_of(self.tree_root)
+
+    def _nodes_on_screen(self) -> List[TreeNode]:
+        first_node = self._valid_first_node_on_screen()
+        if first_node is None:
+            return []
+        return list(islice(self._visible_nodes_from(first_node), self._num_items_on_screen))
+
+    def _visible_nodes_from(self, node: TreeNode) -> Iterator[TreeNode]:
+        # The visible nodes from node on, in the order they are listed
+        yield node
+        yield from node.gen_all_visible_nodes()
+        while node is not self.tree_root:
+            parent = node.parent.value()
+            siblings = parent.children
+            for sibling in islice(siblings, _child_index(parent, node) + 1, None):
+                if sibling.visible:
+                    yield sibling
+                    yield from sibling.gen_all_visible_nodes()
+            node = parent
 
     def _all_visible_nodes(self):
         return self.tree_root.gen_all_visible_nodes()
 
-    def _update_node_visibility(self):
-        # TODO: optimize this
-        def node_is_visible(node: TreeNode) -> bool:
-            # Always hide completed items if hide_complete is set
-            if self._config_manager.hide_complete_items and node.data.complete:
-                return False
-            # Hide children of collapsed nodes
-            if node.parent.has_value() and node.parent.value().data.collapsed:
-                return False
-            # Make sure we hide all children of hidden nodes
-            if node.parent.has_value() and not node_is_visible(node.parent.value()):
-                return False
-            return True
-
-        for node in self.tree_root.root().gen_all_nodes():
-            node.visible = node_is_visible(node)
-
-    def _push_undo_state(self):
-        saved_tree = copy.deepcopy(self.tree_root.root())
-        self._undo_stack.append(saved_tree)
-
-    def _label_display_text(self, text: str, indent: int, is_selected: bool) -> str:
-        def process_links(text: str) -> str:
-            pattern = re.compile(
-                r"((http|ftp|https):\/\/([\w_-]+(?:(?:\.[\w_-]+)+))([\w.,@?^=%&:\/~+#-]*[\w@?^=%&\/~+#-]))")
-            return pattern.sub(r"[skyblue underline ~\1]\1[/]", text)
-
-        if is_selected:
-            return text
-
-        limit = self._width - indent * 3 - 2  # TODO: this should use INDENT_SPACES
-        if len(text) > (limit - 3):
-            return text[: limit - 3] + "..."
-        return process_links(text)
+    def _update_node_visibility(self, from_node: Optional[TreeNode] = Optional.none()):
+        # Updates from_node and the nodes below it, or the whole tree if not
+        # given. The nodes below a hidden node are all hidden too, so that
+        # the flag can be read without looking at the ancestors.
+        hide_complete = self._config_manager.hide_complete_items
+        top_node = from_node.value_or(self.tree_root.root())
+        parent = top_node.parent.value_or_none()
+        parent_shows_children = parent is None or (parent.visible and not parent.data.collapsed)
+
+        nodes_to_update = [(top_node, parent_shows_children)]
+        while nodes_to_update:
+            node, parent_shows_children = nodes_to_update.pop()
+            node.visible = parent_shows_children and not (hide_complete and node.data.complete)
+            shows_children = node.visible and not node.data.collapsed
+            nodes_to_update.extend((child, shows_children) for child in node.children)
+
+    def _notify_background_update(self):
+        if on_background_update := self.on_background_update.value_or_none():
+            on_background_update()
+
+    def _notify_node_inserted(self, node: TreeNode):
+        for listener in self._change_listeners:
+            listener.node_inserted(node)
+
+    def _notify_node_removed(self, node: TreeNode, old_parent: TreeNode, old_index: int):
+        for listener in self._change_listeners:
+            listener.node_removed(node, old_parent, old_index)
+
+    def _notify_node_changed(self, node: TreeNode):
+        for listener in self._change_listeners:
+            listener.node_changed(node)
+
+    def _record_undo(self, commands: List[Command], selected_before: Optional[TreeNode]):
+        self._undo_log.record(UndoEntry(commands, selected_before, self.selected_node))
+
+    def _label_display_text(
+        self, text: str, indent: int, is_selected: bool, spans: Spans = ()
+    ) -> str:
+        return label_display_text(text, self._width, indent, is_selected, spans)
+
+
+def _listed_path(node: TreeNode, tree_root: TreeNode) -> List[int]:
+    # The child indices from tree_root down to node, which sort in the order
+    # the nodes are listed
+    path = []
+    while node is not tree_root:
+        parent = node.parent.value()
+        path.append(_child_index(parent, node))
+        node = parent
+    return list(reversed(path))
+
+
+def _child_index(parent: TreeNode, node: TreeNode) -> int:
+    # Compares the ids, which is much faster than calling TreeNode.__eq__ on
+    # every sibling before node
+    return list(map(id, parent.children)).index(id(node))
+
+
+def _ancestors(node: TreeNode) -> Iterator[TreeNode]:
+    while parent := node.parent.value_or_none():
+        yield parent
+        node = parent
+
+
+def _insert_command(node: TreeNode) -> InsertCommand:
+    parent = node.parent.value()
+    return InsertCommand(node, parent, parent.children.index(node))
+
+
+@functools.lru_cache(maxsize=LABEL_CACHE_SIZE)
+def label_display_text(
+    text: str, width: int, indent: int, is_selected: bool, spans: Spans = ()
+) -> str:
+    # Cached by text, so an edited item gets formatted again and the label
+    # for the old text is dropped once enough other labels have been used
+    if is_selected:
+        return _highlight_spans(text, spans)
+
+    limit = width - indent * 3 - 2  # TODO: this should use INDENT_SPACES
+    if len(text) > (limit - 3):
+        return _highlight_spans(text[: limit - 3], spans) + "..."
+    if spans:
+        # Links are not marked up in search results, the tags would overlap
+        return _highlight_spans(text, spans)
+    if "://" not in text:
+        return text
+    return LINK_PATTERN.sub(r"[skyblue underline ~\1]\1[/]", text)
+
+
+def _highlight_spans(text: str, spans: Spans) -> str:
+    # Spans past the end of text were cut off with it
+    parts = []
+    position = 0
+    for start, end in spans:
+        if start >= len(text):
+            break
+        parts.append(text[position:start])
+        parts.append(MATCH_START + text[start:end] + MATCH_END)
+        position = end
+    parts.append(text[position:])
+    return "".join(parts)
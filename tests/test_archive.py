@@ -0,0 +1,128 @@
+import sys
+
+import pytest
+
+from listigt import archive as archive_command
+
+from listigt.config import config
+from listigt.storage.archive import Archive, completed_subtrees, insert_at_breadcrumbs
+from listigt.storage.journal import Journal
+from listigt.storage.storage import TextFileStorage
+from listigt.todo_list.todo_list import TodoItem, gen_subtree_lines
+from listigt.todo_list.tree import TreeNode
+from listigt.utils.optional import Optional
+from listigt.view_model.view_model import ViewModel
+
+TREE_STR = """- Work
+  - [COMPLETE] Done
+    - [COMPLETE] Done 1
+  - [COMPLETE] Almost done
+    - Not done
+- [COMPLETE] Old"""
+
+
+@pytest.fixture
+def tree():
+    return TreeNode.from_string(TREE_STR, TodoItem.tree_node_from_str)
+
+
+def tree_str(tree):
+    return "\n".join(line for child in tree.children for line in gen_subtree_lines(child))
+
+
+def test_completed_subtrees(tree):
+    nodes = completed_subtrees(tree, keep=tree)
+    assert [node.data.text for node in nodes] == ["Done", "Old"]
+
+
+def test_completed_subtrees_keeps_root(tree):
+    done = tree.children[0].children[0]
+    nodes = completed_subtrees(tree, keep=done.children[0])
+    assert [node.data.text for node in nodes] == ["Old"]
+
+
+def test_archive_and_restore(tmp_path, tree):
+    archive = Archive(tmp_path / "savefile.archive")
+    archive.add(completed_subtrees(tree, keep=tree))
+
+    assert archive.search("done") == [["Work", "Done"], ["Work", "Done", "Done 1"]]
+
+    node = archive.find(["Work", "Done"]).value()
+    work_tree = TreeNode.from_string("- Other", TodoItem.tree_node_from_str)
+    top_node = insert_at_breadcrumbs(work_tree, ["Work"], node)
+    assert top_node.data.text == "Work"
+    assert tree_str(work_tree) == "- Other\n- Work\n  - [COMPLETE] Done\n    - [COMPLETE] Done 1"
+
+    assert archive.search("done") == [["Work", "Done"], ["Work", "Done", "Done 1"]]
+    archive.remove(["Work", "Done"])
+    assert archive.archive_file.read_text() == "- [COMPLETE] Old"
+
+
+def test_view_model_archive_completed(tmp_path, tree):
+    config_manager = config.ConfigManager(save_file=Optional.some(tmp_path / "savefile"))
+    config_manager.hide_complete_items = False
+    config_manager.root_node_id = Optional.none()
+    vm = ViewModel(tree, config_manager)
+    vm.select_next()
+    assert vm.selected_node.value().data.text == "Done"
+
+    assert vm.archive_completed() == 2
+
+    assert [node.data.text for node in tree.gen_all_nodes()] == ["Work", "Almost done", "Not done"]
+    assert vm.selected_node.value().data.text == "Work"
+    assert config_manager.archive_file.exists()
+    assert config_manager.last_archived.has_value()
+
+
+def test_view_model_asks_before_archiving(tmp_path, tree):
+    config_manager = config.ConfigManager(save_file=Optional.some(tmp_path / "savefile"))
+    config_manager.hide_complete_items = False
+    config_manager.root_node_id = Optional.none()
+    vm = ViewModel(tree, config_manager)
+    assert vm.num_items_to_archive.is_none()
+
+    vm.start_archive()
+    assert vm.num_items_to_archive.value() == 2
+    vm.cancel_archive()
+    assert vm.num_items_to_archive.is_none()
+    assert len(list(tree.gen_all_nodes())) == 6
+
+    vm.start_archive()
+    assert vm.archive_completed() == 2
+    assert vm.num_items_to_archive.is_none()
+
+
+def test_restore_command_keeps_journaled_changes(tmp_path, monkeypatch):
+    save_file = tmp_path / "savefile"
+    save_file.write_text("- Work")
+    Archive(tmp_path / "savefile.archive").add(
+        [TreeNode.from_string(TREE_STR, TodoItem.tree_node_from_str).children[0].children[0]]
+    )
+    # Left behind by a listigt that was killed before saving
+    storage = TextFileStorage(save_file)
+    tree = storage.load()
+    journal = Journal(tmp_path / "savefile.journal")
+    journal.reset(storage.content_hash)
+    tree.children[0].data.text = "Work edited"
+    journal.node_changed(tree.children[0])
+    journal.close()
+
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "listigt-archive",
+            "--save_file", str(save_file),
+            "--config_file", str(tmp_path / "config.toml"),
+            "restore", "Work > Done",
+        ],
+    )
+    archive_command.main()
+
+    storage = TextFileStorage(save_file)
+    tree = journal.replay(storage.load(), storage.content_hash)
+    assert journal.num_records == 0
+    assert [node.data.text for node in tree.gen_all_nodes()] == [
+        "Work edited", "Work", "Done", "Done 1"
+    ]
+    assert (tmp_path / "savefile.archive").read_text() == ""
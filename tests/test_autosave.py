@@ -0,0 +1,191 @@
+import threading
+import time
+
+import pytest
+
+from listigt.storage.autosave import Autosaver
+from listigt.storage.journal import Journal
+from listigt.storage.storage import TextFileStorage, content_hash
+from listigt.todo_list.todo_list import TodoItem
+from listigt.todo_list.tree import TreeNode
+from listigt.utils.optional import Optional
+
+
+@pytest.fixture
+def tree():
+    return TreeNode.from_string("- Item 1\n- Item 2", TodoItem.tree_node_from_str)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return TextFileStorage(tmp_path / "savefile")
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_saves_after_idle_period(storage, tree):
+    autosaver = Autosaver(
+        storage, tree_root=lambda: tree, tree_lock=threading.RLock(), idle_seconds=0.05
+    )
+    autosaver.start()
+    tree.children[0].data.text = "Changed"
+    autosaver.node_changed(tree.children[0])
+
+    wait_for(lambda: storage.save_file.exists())
+    autosaver.stop()
+    assert storage.save_file.read_text() == "- Changed\n- Item 2"
+
+
+def test_saves_after_max_edits(storage, tree):
+    autosaver = Autosaver(
+        storage,
+        tree_root=lambda: tree,
+        tree_lock=threading.RLock(),
+        idle_seconds=60,
+        max_edits=3,
+    )
+    autosaver.start()
+    for _ in range(2):
+        autosaver.node_changed(tree.children[0])
+    time.sleep(0.1)
+    assert not storage.save_file.exists()
+
+    autosaver.node_changed(tree.children[0])
+    wait_for(lambda: storage.save_file.exists())
+    autosaver.stop()
+
+
+def test_save_replaces_file_atomically(storage, tree):
+    storage.save(tree)
+    tree.children[0].data.text = "Changed"
+    storage.save(tree)
+
+    assert storage.save_file.read_text() == "- Changed\n- Item 2"
+    assert [p.name for p in storage.save_file.parent.iterdir()] == ["savefile"]
+
+
+def test_journal_keeps_changes_made_during_save(tmp_path, storage, tree):
+    storage.save(tree)
+    journal = Journal(tmp_path / "savefile.journal")
+    journal.reset(storage.content_hash)
+
+    tree.children[0].data.text = "Saved"
+    journal.node_changed(tree.children[0])
+    snapshot = storage.snapshot(tree)
+    journal.checkpoint(content_hash(snapshot))
+
+    # Arrives while the snapshot is being written
+    tree.children[1].data.text = "Not saved"
+    journal.node_changed(tree.children[1])
+
+    storage.write_snapshot(snapshot)
+    journal.compact(content_hash(snapshot))
+    journal.close()
+
+    recovered = journal.replay(storage.load(), storage.content_hash)
+    assert [n.data.text for n in recovered.children] == ["Saved", "Not saved"]
+    assert journal.num_records == 1
+
+
+def test_journal_keeps_changes_made_during_compaction(tmp_path, storage, tree):
+    storage.save(tree)
+    journal = Journal(tmp_path / "savefile.journal")
+    journal.reset(storage.content_hash)
+    tree.children[0].data.text = "Saved"
+    journal.node_changed(tree.children[0])
+    snapshot = storage.snapshot(tree)
+    journal.checkpoint(content_hash(snapshot))
+    storage.write_snapshot(snapshot)
+
+    read_records = journal._read_records
+
+    def read_records_while_editing(end=-1):
+        records = read_records(end)
+        # Arrives while the journal is being compacted, it isn't holding the tree lock
+        tree.children[1].data.text = "Not saved"
+        journal.node_changed(tree.children[1])
+        return records
+
+    journal._read_records = read_records_while_editing
+    journal.compact(content_hash(snapshot))
+    journal.close()
+
+    recovered = journal.replay(storage.load(), storage.content_hash)
+    assert [n.data.text for n in recovered.children] == ["Saved", "Not saved"]
+    assert journal.num_records == 1
+
+
+def test_journal_replays_from_checkpoint_before_compaction(tmp_path, storage, tree):
+    storage.save(tree)
+    journal = Journal(tmp_path / "savefile.journal")
+    journal.reset(storage.content_hash)
+
+    tree.children[0].data.text = "Saved"
+    journal.node_changed(tree.children[0])
+    snapshot = storage.snapshot(tree)
+    journal.checkpoint(content_hash(snapshot))
+    tree.children[1].data.text = "Not saved"
+    journal.node_changed(tree.children[1])
+    storage.write_snapshot(snapshot)
+    # Killed before the journal was compacted
+    journal.close()
+
+    recovered = journal.replay(storage.load(), storage.content_hash)
+    assert [n.data.text for n in recovered.children] == ["Saved", "Not saved"]
+
+
+def test_merge_on_save_keeps_changes_from_other_process(tmp_path, tree):
+    storage = TextFileStorage(tmp_path / "savefile", merge_on_save=True)
+    storage.save(tree)
+    merged_trees = []
+    storage.on_merged = Optional.some(
+        lambda saved, merged: merged_trees.append(storage.snapshot(merged))
+    )
+
+    # Written by another process since the last save
+    storage.save_file.write_text("- Item 1\n- Item 2\n- Item 3")
+    tree.children[0].data.text = "Changed"
+    storage.save(tree)
+
+    assert storage.save_file.read_text() == "- Changed\n- Item 2\n- Item 3"
+    assert merged_trees == ["- Changed\n- Item 2\n- Item 3"]
+    assert storage.content_hash == content_hash("- Changed\n- Item 2\n- Item 3")
+
+
+def test_journal_replays_onto_merged_save_file(tmp_path, tree):
+    storage = TextFileStorage(tmp_path / "savefile", merge_on_save=True)
+    storage.save(tree)
+    journal = Journal(tmp_path / "savefile.journal")
+    journal.reset(storage.content_hash)
+
+    def on_merged(saved, merged):
+        # Like the view model, takes in the changes of the other process
+        tree.add_child(TreeNode(TodoItem("Item 3")))
+        journal.node_inserted(tree.children[2])
+        journal.rebase(storage.content_hash, tree)
+
+    storage.on_merged = Optional.some(on_merged)
+
+    tree.children[0].data.text = "Changed"
+    journal.node_changed(tree.children[0])
+    snapshot = storage.snapshot(tree)
+    journal.checkpoint(content_hash(snapshot))
+    # Written by another process since the last save
+    storage.save_file.write_text("- Item 1\n- Item 2\n- Item 3")
+    # Arrives while the snapshot is being written
+    tree.children[1].data.text = "Not saved"
+    journal.node_changed(tree.children[1])
+
+    written = storage.write_snapshot(snapshot)
+    assert written == "- Changed\n- Item 2\n- Item 3"
+    journal.compact(content_hash(written))
+    # Killed before the next save
+    journal.close()
+
+    recovered = journal.replay(storage.load(), storage.content_hash)
+    assert [n.data.text for n in recovered.children] == ["Changed", "Not saved", "Item 3"]
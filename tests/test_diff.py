@@ -0,0 +1,74 @@
+import sys
+
+import pytest
+
+from listigt.diff import (
+    ADDED,
+    COMPLETED,
+    EDITED,
+    MOVED,
+    REMOVED,
+    UNCOMPLETED,
+    Change,
+    diff_trees,
+    main,
+)
+from listigt.todo_list.todo_list import TodoItem
+from listigt.todo_list.tree import TreeNode
+
+
+def make_tree(s):
+    return TreeNode.from_string(s, TodoItem.tree_node_from_str)
+
+
+def test_diff_identical_trees():
+    s = "- Item 1\n  - Item 1.1\n- Item 2"
+    assert diff_trees(make_tree(s), make_tree(s)) == []
+
+
+def test_diff_added_and_removed_subtrees():
+    old = "- Item 1\n  - Item 1.1\n    - Item 1.1.1\n- Item 2"
+    new = "- Item 1\n- Item 2\n  - Item 2.1\n  - Item 2.2"
+
+    assert diff_trees(make_tree(old), make_tree(new)) == [
+        Change(ADDED, ["Item 2", "Item 2.1"]),
+        Change(ADDED, ["Item 2", "Item 2.2"]),
+        Change(REMOVED, ["Item 1", "Item 1.1"], num_descendants=1),
+    ]
+
+
+def test_diff_edited_and_completed():
+    old = "- Item 1\n  - Item 1.1\n- [COMPLETE] Item 2"
+    new = "- Item 1\n  - [COMPLETE] Item 1.1 edited\n- Item 2"
+
+    assert diff_trees(make_tree(old), make_tree(new)) == [
+        Change(EDITED, ["Item 1", "Item 1.1 edited"], ["Item 1", "Item 1.1"]),
+        Change(COMPLETED, ["Item 1", "Item 1.1 edited"]),
+        Change(UNCOMPLETED, ["Item 2"]),
+    ]
+
+
+def test_diff_moved_subtree():
+    old = "- Item 1\n  - Item 1.1\n    - Item 1.1.1\n- Item 2\n- Item 3"
+    new = "- Item 1\n- Item 3\n- Item 2\n  - Item 1.1\n    - Item 1.1.1"
+
+    assert diff_trees(make_tree(old), make_tree(new)) == [
+        Change(MOVED, ["Item 3"], ["Item 3"]),
+        Change(MOVED, ["Item 2", "Item 1.1"], ["Item 1", "Item 1.1"]),
+    ]
+
+
+def test_diff_ignores_collapsed():
+    old = "- Item 1\n  - Item 1.1"
+    new = "- [COLLAPSED] Item 1\n  - Item 1.1"
+    assert diff_trees(make_tree(old), make_tree(new)) == []
+
+
+def test_main_missing_file(tmp_path, monkeypatch, capsys):
+    old_file = tmp_path / "old"
+    old_file.write_text("- Item 1")
+    monkeypatch.setattr(sys, "argv", ["diff", str(old_file), str(tmp_path / "new")])
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+    assert exit_info.value.code == 2
+    assert "is not a file" in capsys.readouterr().err
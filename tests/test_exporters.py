@@ -0,0 +1,61 @@
+import io
+from pathlib import Path
+
+import pytest
+
+from listigt.import_export import exporters
+from listigt.import_export.importers import import_json, import_markdown, import_opml
+from listigt.todo_list.todo_list import TodoItem, gen_subtree_lines
+from listigt.todo_list.tree import TreeNode
+
+TREE_STR = """- Item 1
+"Subtitle & notes"
+  - [COMPLETE] Item <1.1>
+  - [COLLAPSED] Item 1.2
+    - Item 1.2.1
+- Item 2"""
+
+
+@pytest.fixture
+def tree_root():
+    return TreeNode.from_string(TREE_STR, TodoItem.tree_node_from_str)
+
+
+def tree_str(tree):
+    return "\n".join(line for child in tree.children for line in gen_subtree_lines(child))
+
+
+def export_str(node, export_format):
+    f = io.StringIO()
+    exporters.export(node, export_format, f)
+    return f.getvalue()
+
+
+@pytest.mark.parametrize(
+    "export_format, importer",
+    [
+        ("opml", lambda s: import_opml(io.BytesIO(s.encode()))),
+        ("markdown", lambda s: import_markdown(io.StringIO(s))),
+        ("json", lambda s: import_json(io.StringIO(s))),
+    ],
+)
+def test_export_and_import_again(tree_root, export_format, importer):
+    assert tree_str(importer(export_str(tree_root, export_format))) == TREE_STR
+
+
+def test_export_subtree_includes_node(tree_root):
+    item_1_2 = tree_root.children[0].children[1]
+    assert export_str(item_1_2, "markdown") == "- [ ] Item 1.2 <!-- collapsed -->\n  - [ ] Item 1.2.1\n"
+
+
+def test_export_html(tree_root):
+    exported = export_str(tree_root, "html")
+    assert '<li class="complete"><span>Item &lt;1.1&gt;</span></li>' in exported
+    assert '<div class="subtitle">Subtitle &amp; notes</div>' in exported
+    assert exported.count("<ul>") == exported.count("</ul>")
+
+
+def test_format_for_path():
+    assert exporters.format_for_path(Path("out.md")) == "markdown"
+    with pytest.raises(ValueError):
+        exporters.format_for_path(Path("out.txt"))
@@ -0,0 +1,59 @@
+import os
+
+from listigt.storage.file_watcher import FileWatcher
+from listigt.storage.storage import TextFileStorage, content_hash
+from listigt.todo_list.todo_list import TodoItem
+from listigt.todo_list.tree import TreeNode
+
+
+def test_poll_reports_external_change(tmp_path):
+    path = tmp_path / "savefile"
+    path.write_text("- Item 1")
+    changes = []
+    watcher = FileWatcher(path, on_change=changes.append, known_hash=lambda: content_hash("- Item 1"))
+
+    watcher.poll()
+    assert changes == []
+
+    path.write_text("- Item 1\n- Item 2 from another machine")
+    watcher.poll()
+    assert changes == ["- Item 1\n- Item 2 from another machine"]
+
+    watcher.poll()
+    assert len(changes) == 1
+
+
+def test_poll_ignores_own_writes(tmp_path):
+    path = tmp_path / "savefile"
+    path.write_text("- Item 1")
+    own_hash = content_hash("- Item 1")
+    changes = []
+    watcher = FileWatcher(path, on_change=changes.append, known_hash=lambda: own_hash)
+
+    path.write_text("- Saved by us")
+    own_hash = content_hash("- Saved by us")
+    watcher.poll()
+    assert changes == []
+
+
+def test_poll_during_own_save_is_ignored(tmp_path, monkeypatch):
+    storage = TextFileStorage(tmp_path / "savefile")
+    tree = TreeNode.from_string("- Item 1", TodoItem.tree_node_from_str)
+    storage.save(tree)
+    changes = []
+    watcher = FileWatcher(
+        storage.save_file, on_change=changes.append, known_hash=lambda: storage.content_hash
+    )
+
+    replace = os.replace
+
+    def replace_and_poll(src, dst):
+        replace(src, dst)
+        # The watcher polls before the save has returned
+        watcher.poll()
+
+    monkeypatch.setattr(os, "replace", replace_and_poll)
+    tree.children[0].data.text = "Saved by us"
+    storage.save(tree)
+
+    assert changes == []
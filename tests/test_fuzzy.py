@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+
+from listigt.search.fuzzy import FuzzyEntry, fuzzy_score, fuzzy_search
+from listigt.search.search_engine import SearchEngine
+from listigt.search.search_worker import SearchWorker
+from listigt.todo_list.todo_list import TodoItem
+from listigt.todo_list.tree import TreeNode
+
+
+@pytest.fixture
+def tree_root():
+    return TreeNode.from_string(
+        """
+- Work
+  - Write report
+  - Review pull request
+- Home
+  - Water plants
+  - Wash the car""",
+        TodoItem.tree_node_from_str,
+    )
+
+
+def texts(nodes):
+    return [node.data.text for node in nodes]
+
+
+def test_fuzzy_score():
+    assert fuzzy_score("wrp", "write report") > 0
+    assert fuzzy_score("wrp", "review") == 0
+    # Word starts and runs of characters count more
+    assert fuzzy_score("rep", "write report") > fuzzy_score("rep", "ripe pear")
+    # Can match the texts above, but not only them
+    assert fuzzy_score("work rep", "write report", "work") > 0
+    assert fuzzy_score("work", "write report", "work") == 0
+
+
+def test_fuzzy_search(tree_root):
+    entries = SearchEngine().fuzzy_entries(tree_root)
+    assert texts(fuzzy_search(entries, "wrt").value()) == [
+        "Write report", "Review pull request", "Water plants"
+    ]
+    # Same score, in the order they are listed
+    assert texts(fuzzy_search(entries, "home wa").value()) == ["Water plants", "Wash the car"]
+    assert fuzzy_search(entries, "wrt", is_cancelled=lambda: True).is_none()
+
+
+def test_recently_changed_first(tree_root):
+    engine = SearchEngine()
+    wash = tree_root.children[1].children[1]
+    engine.node_changed(wash)
+    entries = engine.fuzzy_entries(tree_root)
+    assert texts(fuzzy_search(entries, "wa").value())[0] == "Wash the car"
+
+
+def test_fuzzy_entries_below_root(tree_root):
+    home = tree_root.children[1]
+    entries = SearchEngine().fuzzy_entries(home)
+    assert [entry.text for entry in entries] == ["water plants", "wash the car"]
+    assert entries[0] == FuzzyEntry(home.children[0], "water plants", "", 0.0)
+
+
+def test_worker_cancels_older_jobs():
+    worker = SearchWorker()
+    first_started = threading.Event()
+    release_first = threading.Event()
+    done = threading.Event()
+    finished = []
+
+    def first_job(is_cancelled):
+        first_started.set()
+        release_first.wait()
+        finished.append(("first", is_cancelled()))
+
+    def second_job(is_cancelled):
+        finished.append(("second", is_cancelled()))
+        done.set()
+
+    worker.submit(first_job)
+    first_started.wait()
+    worker.submit(second_job)
+    release_first.set()
+    assert done.wait(timeout=5)
+    worker.stop()
+    assert finished == [("first", True), ("second", False)]
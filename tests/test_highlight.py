@@ -0,0 +1,28 @@
+from listigt.search.highlight import match_spans
+
+
+def test_exact_spans():
+    assert match_spans("Write a report, re-read", "RE", "exact") == ((8, 10), (16, 18), (19, 21))
+    assert match_spans("Write a report", "x", "exact") == ()
+
+
+def test_regex_spans():
+    assert match_spans("Item 12, item 3", r"item \d+", "regex") == ((0, 7), (9, 15))
+    # Empty matches and half typed patterns highlight nothing
+    assert match_spans("Item", "x*", "regex") == ()
+    assert match_spans("Item", "(It", "regex") == ()
+
+
+def test_fuzzy_spans():
+    assert match_spans("Write report", "wrp", "fuzzy") == ((0, 1), (6, 7), (8, 9))
+    assert match_spans("Write report", "report", "fuzzy") == ((6, 12),)
+    # Only the characters matched in the item itself, not in the items above it
+    assert match_spans("Water plants", "work pla", "fuzzy") == ((5, 9),)
+
+
+def test_spans_of_casefolded_matches():
+    # Found like the search finds it, ß casefolds to ss
+    assert match_spans("Straße 1", "strasse", "exact") == ((0, 6),)
+    assert match_spans("Die Straße", "SS", "exact") == ((8, 9),)
+    assert match_spans("Straße 1", "e 1", "exact") == ((5, 8),)
+    assert match_spans("Straße 1", "se1", "fuzzy") == ((4, 6), (7, 8))
@@ -0,0 +1,125 @@
+import pytest
+
+from listigt.storage.history import HistoryStore
+from listigt.todo_list.todo_list import TodoItem, gen_subtree_lines
+from listigt.todo_list.tree import TreeNode
+
+TREE_STR = """- Item 1
+  - Item 1.1
+"Subtitle"
+  - [COMPLETE] Item 1.2
+- [COLLAPSED] Item 2
+  - Item 2.1"""
+
+
+@pytest.fixture
+def tree():
+    return TreeNode.from_string(TREE_STR, TodoItem.tree_node_from_str)
+
+
+@pytest.fixture
+def history(tmp_path):
+    return HistoryStore(tmp_path / "history")
+
+
+def tree_str(tree):
+    return "\n".join(line for child in tree.children for line in gen_subtree_lines(child))
+
+
+def num_objects(history):
+    return len((history.directory / "objects.pack").read_text().splitlines())
+
+
+def test_record_and_load(history, tree):
+    version = history.record(tree).value()
+
+    assert version.id == 1
+    assert [v.tree_hash for v in history.versions()] == [version.tree_hash]
+    loaded = history.load(version.tree_hash)
+    assert tree_str(loaded) == TREE_STR
+    assert loaded.children[0].children[0].level == 1
+
+
+def test_record_unchanged_tree(history, tree):
+    history.record(tree)
+    assert history.record(tree).is_none()
+    assert len(history.versions()) == 1
+
+
+def test_record_only_stores_changed_subtrees(history, tree):
+    history.record(tree)
+    assert num_objects(history) == 6
+
+    item_2_1 = tree.children[1].children[0]
+    item_2_1.data.text = "Item 2.1 edited"
+    history.node_changed(item_2_1)
+    version = history.record(tree).value()
+
+    # Item 2.1, Item 2 and the root
+    assert num_objects(history) == 9
+    assert tree_str(history.load(version.tree_hash)) == TREE_STR.replace("2.1", "2.1 edited")
+    assert tree_str(history.load(history.version(1).value().tree_hash)) == TREE_STR
+
+
+def test_moved_subtree_is_not_stored_again(history, tree):
+    history.record(tree)
+    item_1_1 = tree.children[0].children[0]
+    old_parent = item_1_1.parent.value()
+    old_parent.remove_node(item_1_1)
+    history.node_removed(item_1_1, old_parent, 0)
+    tree.children[1].add_child(item_1_1)
+    history.node_inserted(item_1_1)
+    history.record(tree)
+
+    # Item 1, Item 2 and the root
+    assert num_objects(history) == 9
+
+
+def test_snapshot_is_written_as_it_was_taken(history, tree):
+    snapshot = history.snapshot(tree)
+    tree.children[0].data.text = "Changed after the snapshot"
+    history.node_changed(tree.children[0])
+
+    version = history.write_snapshot(snapshot).value()
+
+    assert tree_str(history.load(version.tree_hash)) == TREE_STR
+
+
+def test_objects_of_unwritten_snapshot_are_stored_later(history, tree):
+    history.snapshot(tree)
+    version = history.record(tree).value()
+
+    assert num_objects(history) == 6
+    assert tree_str(history.load(version.tree_hash)) == TREE_STR
+
+
+def test_objects_are_not_stored_again_in_next_session(tmp_path, history, tree):
+    history.record(tree)
+    tree.children[1].data.text = "Item 2 edited"
+    history.node_changed(tree.children[1])
+
+    next_history = HistoryStore(tmp_path / "history")
+    version = next_history.record(tree).value()
+
+    assert version.id == 2
+    # Item 2 and the root
+    assert num_objects(next_history) == 8
+    assert tree_str(next_history.load(version.tree_hash)) == TREE_STR.replace(
+        "Item 2\n", "Item 2 edited\n"
+    )
+
+
+def test_torn_object_write_is_dropped(tmp_path, history, tree):
+    history.record(tree)
+    with open(history.directory / "objects.pack", "a") as f:
+        f.write("0123456789abcdef")
+
+    next_history = HistoryStore(tmp_path / "history")
+    tree.children[0].data.text = "Item 1 edited"
+    next_history.node_changed(tree.children[0])
+    version = next_history.record(tree).value()
+
+    assert num_objects(next_history) == 8
+    assert tree_str(next_history.load(version.tree_hash)) == TREE_STR.replace(
+        "Item 1\n", "Item 1 edited\n"
+    )
@@ -0,0 +1,122 @@
+import io
+
+import pytest
+
+from listigt.import_export.importers import (
+    import_file,
+    import_json,
+    import_markdown,
+    import_opml,
+    import_text,
+)
+from listigt.storage.storage import TextFileStorage
+from listigt.todo_list.todo_list import gen_subtree_lines
+
+
+def tree_str(tree):
+    return "\n".join(line for child in tree.children for line in gen_subtree_lines(child))
+
+
+OPML = """<?xml version="1.0"?>
+<opml version="2.0">
+  <head><title>Export</title></head>
+  <body>
+    <outline text="Item 1" _note="Note">
+      <outline text="Item 1.1" _complete="true" />
+      <outline text="Item 1.2">
+        <outline text="Item 1.2.1" />
+      </outline>
+    </outline>
+    <outline text="Item 2" />
+  </body>
+</opml>"""
+
+
+def test_import_opml():
+    tree = import_opml(io.BytesIO(OPML.encode()))
+
+    assert tree_str(tree) == (
+        '- Item 1\n"Note"\n  - [COMPLETE] Item 1.1\n  - Item 1.2\n    - Item 1.2.1\n- Item 2'
+    )
+    assert tree.children[0].children[1].children[0].level == 2
+
+
+def test_multi_line_opml_items_survive_saving(tmp_path):
+    opml = """<?xml version="1.0"?>
+<opml version="2.0"><body>
+  <outline text="multi&#10;line text" _note="line one&#10;line two" />
+</body></opml>"""
+    tree = import_opml(io.BytesIO(opml.encode()))
+    storage = TextFileStorage(tmp_path / "save.txt")
+    storage.save(tree)
+
+    item = storage.load().children[0].data
+    assert item.text == "multi line text"
+    assert item.subtitle == "line one line two"
+
+
+def test_import_markdown():
+    markdown = """# Project
+Some notes
+about it
+- [ ] Task 1
+    - [x] Task 1.1
+- Task 2 <!-- collapsed -->
+  * Task 2.1
+## Section
+1. Task 3
+"""
+    tree = import_markdown(io.StringIO(markdown))
+
+    assert tree_str(tree) == (
+        "- Project\n"
+        '"Some notes about it"\n'
+        "  - Task 1\n"
+        "    - [COMPLETE] Task 1.1\n"
+        "  - [COLLAPSED] Task 2\n"
+        "    - Task 2.1\n"
+        "  - Section\n"
+        "    - Task 3"
+    )
+
+
+def test_import_json():
+    lines = [
+        '{"level": 0, "text": "Item 1", "subtitle": "Note", "collapsed": true}',
+        '{"level": 1, "text": "Item 1.1", "complete": true}',
+        "",
+        '{"level": 0, "text": "Item 2"}',
+    ]
+    tree = import_json(lines)
+
+    assert tree_str(tree) == (
+        '- [COLLAPSED] Item 1\n"Note"\n  - [COMPLETE] Item 1.1\n- Item 2'
+    )
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        '{"level": "2", "text": "Item"}',
+        '{"level": true, "text": "Item"}',
+        '{"level": 0, "text": 1}',
+        '{"level": 0}',
+        '{"level": 0, "text": "Item", "complete": "yes"}',
+        '["Item"]',
+    ],
+)
+def test_import_json_with_wrong_types(line):
+    with pytest.raises(ValueError):
+        import_json([line])
+
+
+def test_import_text_detects_format():
+    assert tree_str(import_text(OPML)).startswith("- Item 1")
+    assert tree_str(import_text('{"level": 0, "text": "Item"}')) == "- Item"
+    assert tree_str(import_text("- [COMPLETE] Item")) == "- [COMPLETE] Item"
+
+
+def test_import_file_by_suffix(tmp_path):
+    path = tmp_path / "export.opml"
+    path.write_text(OPML)
+    assert [node.data.text for node in import_file(path).children] == ["Item 1", "Item 2"]
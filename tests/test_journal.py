@@ -0,0 +1,94 @@
+import pytest
+
+from listigt.storage.journal import Journal
+from listigt.todo_list.todo_list import TodoItem
+from listigt.todo_list.tree import TreeNode
+from listigt.utils.optional import Optional
+
+
+@pytest.fixture
+def tree_str():
+    return """- Item 1
+  - Item 1.1
+    - Item 1.1.1
+  - Item 1.2
+- Item 2"""
+
+
+def make_tree(tree_str):
+    return TreeNode.from_string(tree_str, TodoItem.tree_node_from_str)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = Journal(tmp_path / "savefile.journal")
+    journal.reset("base-hash")
+    return journal
+
+
+def test_replay_reproduces_changes(journal, tree_str):
+    tree = make_tree(tree_str)
+    item_1 = tree.children[0]
+
+    new_node = TreeNode(TodoItem("New item"))
+    item_1.add_child(new_node, after_child=Optional.some(item_1.children[0]))
+    journal.node_inserted(new_node)
+
+    item_1_1 = item_1.children[0]
+    tree.remove_node(item_1_1)
+    journal.node_removed(item_1_1, item_1, 0)
+
+    tree.children[1].data.complete = True
+    journal.node_changed(tree.children[1])
+
+    tree.add_child(item_1_1)
+    item_1_1.update_level_to_parent()
+    journal.node_inserted(item_1_1)
+    journal.close()
+
+    replayed = journal.replay(make_tree(tree_str), "base-hash")
+    assert replayed.is_equivalent_to(tree)
+    assert journal.num_records == 4
+
+
+def test_replay_replaced_tree(journal, tree_str):
+    replaced = make_tree("- Other\n  - Tree")
+    journal.tree_replaced(replaced)
+    journal.close()
+
+    assert journal.replay(make_tree(tree_str), "base-hash").is_equivalent_to(replaced)
+
+
+def test_journal_for_other_save_file_is_ignored(journal, tree_str):
+    tree = make_tree(tree_str)
+    tree.children[0].data.text = "Changed"
+    journal.node_changed(tree.children[0])
+    journal.close()
+
+    replayed = journal.replay(make_tree(tree_str), "other-hash")
+    assert replayed.children[0].data.text == "Item 1"
+
+
+def test_torn_record_is_ignored(journal, tree_str):
+    tree = make_tree(tree_str)
+    tree.children[0].data.text = "Changed"
+    journal.node_changed(tree.children[0])
+    journal.close()
+    with open(journal.journal_file, "a") as f:
+        f.write('{"op":"change","pa')
+
+    replayed = journal.replay(make_tree(tree_str), "base-hash")
+    assert replayed.children[0].data.text == "Changed"
+
+
+def test_compact_after(tmp_path, tree_str):
+    journal = Journal(tmp_path / "savefile.journal", compact_after=3)
+    journal.reset("base-hash")
+    compactions = []
+    journal.on_compact = Optional.some(lambda: compactions.append(True))
+
+    tree = make_tree(tree_str)
+    for _ in range(3):
+        journal.node_changed(tree.children[0])
+
+    assert compactions == [True]
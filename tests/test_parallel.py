@@ -0,0 +1,94 @@
+import re
+
+import pytest
+
+from listigt.search import parallel
+from listigt.search.parallel import ParallelSearcher, search_lines
+from listigt.search.search_engine import SearchEngine
+from listigt.todo_list.todo_list import TodoItem
+from listigt.todo_list.tree import TreeNode
+
+
+@pytest.fixture
+def tree_root():
+    return TreeNode.from_string(
+        """
+- Work
+  - Write report
+  - Review pull request
+- Home
+  - Water plants
+  - Wash the car""",
+        TodoItem.tree_node_from_str,
+    )
+
+
+def texts(nodes):
+    return [node.data.text for node in nodes]
+
+
+def test_search_lines():
+    assert search_lines("Write report\nreview\nWash", "^w") == [0, 2]
+    assert search_lines("", "x") == []
+
+
+def test_shards(tree_root):
+    engine = SearchEngine()
+    shards = engine.shards(tree_root, 4)
+    assert len(shards) == 4
+    assert [texts(shard.nodes) for shard in shards] == [
+        ["Work", "Write report"],
+        ["Review pull request", "Home"],
+        ["Water plants", "Wash the car"],
+        [],
+    ]
+    assert shards[0].text == "Work\nWrite report"
+    assert engine.shards(tree_root, 4) is shards
+
+    tree_root.children[0].data.text = "Job"
+    engine.node_changed(tree_root.children[0])
+    assert engine.shards(tree_root, 4)[0].text == "Job\nWrite report"
+
+
+def test_search_in_this_process(tree_root):
+    searcher = ParallelSearcher(max_workers=3)
+    shards = SearchEngine().shards(tree_root, searcher.num_shards)
+    assert texts(searcher.search(shards, r"w\w+ ").value()) == [
+        "Write report",
+        "Water plants",
+        "Wash the car",
+    ]
+    assert searcher.search(shards, "r", is_cancelled=lambda: True).is_none()
+    with pytest.raises(re.error):
+        searcher.search(shards, "(r")
+
+
+def test_search_in_processes(tree_root, monkeypatch):
+    monkeypatch.setattr(parallel, "PARALLEL_SEARCH_MIN_ITEMS", 0)
+    searcher = ParallelSearcher(max_workers=2)
+    try:
+        shards = SearchEngine().shards(tree_root, searcher.num_shards)
+        assert texts(searcher.search(shards, "^w").value()) == [
+            "Work",
+            "Write report",
+            "Water plants",
+            "Wash the car",
+        ]
+        assert searcher.search(shards, "^w", is_cancelled=lambda: True).is_none()
+    finally:
+        searcher.shutdown()
+
+
+def test_search_in_this_process_is_cancelled_within_a_shard(monkeypatch):
+    monkeypatch.setattr(parallel, "CANCEL_CHECK_LINES", 10)
+    nodes = [TreeNode(TodoItem(f"Item {i}")) for i in range(100)]
+    shard = parallel.Shard(nodes=nodes, text="\n".join(node.data.text for node in nodes))
+    num_checks = 0
+
+    def is_cancelled():
+        nonlocal num_checks
+        num_checks += 1
+        return num_checks > 3
+
+    assert ParallelSearcher(max_workers=1).search([shard], "item", is_cancelled).is_none()
+    assert num_checks == 4
@@ -0,0 +1,156 @@
+import pytest
+
+from listigt.search.search_engine import SearchEngine, in_tree_order
+from listigt.search.text_buffer import TextBuffer, listed_texts
+from listigt.search.trigram_index import TrigramIndex, trigrams
+from listigt.todo_list.todo_list import TodoItem
+from listigt.todo_list.tree import TreeNode
+
+
+@pytest.fixture
+def tree_root():
+    return TreeNode.from_string(
+        """
+- Buy milk
+  - Whole milk
+  - Oat milk
+- Work
+  - Write report
+  - Email Milko
+- Millennium""",
+        TodoItem.tree_node_from_str,
+    )
+
+
+@pytest.fixture
+def engine(tree_root):
+    search_engine = SearchEngine()
+    # Builds the index
+    search_engine.search(tree_root, "")
+    return search_engine
+
+
+def texts(nodes):
+    return [node.data.text for node in nodes]
+
+
+def test_trigrams():
+    assert trigrams("milk") == {"mil", "ilk"}
+    assert trigrams("mi") == set()
+
+
+def test_candidates(tree_root):
+    index = TrigramIndex()
+    index.add_tree(tree_root)
+    assert len(index) == 7
+    assert set(texts(index.candidates("MILK").value())) == {
+        "Buy milk", "Whole milk", "Oat milk", "Email Milko"
+    }
+    assert index.candidates("xyz").value() == set()
+    assert index.candidates("mi").is_none()
+
+
+def test_search_in_tree_order(tree_root, engine):
+    assert texts(engine.search(tree_root, "milk")) == [
+        "Buy milk", "Whole milk", "Oat milk", "Email Milko"
+    ]
+    assert texts(engine.search(tree_root, "mil")) == [
+        "Buy milk", "Whole milk", "Oat milk", "Email Milko", "Millennium"
+    ]
+    # Too short for the index, the tree is scanned
+    assert texts(engine.search(tree_root, "mi")) == texts(engine.search(tree_root, "mil"))
+
+
+def test_search_below_node(tree_root, engine):
+    work = tree_root.children[1]
+    assert texts(engine.search(work, "milk")) == ["Email Milko"]
+
+
+def test_index_follows_changes(tree_root, engine):
+    work = tree_root.children[1]
+    new_node = TreeNode(TodoItem("Milk the cow"))
+    work.prepend_child(new_node)
+    engine.node_inserted(new_node)
+    assert texts(engine.search(tree_root, "milk"))[-2:] == ["Milk the cow", "Email Milko"]
+
+    new_node.data.text = "Feed the cow"
+    engine.node_changed(new_node)
+    assert "Feed the cow" in texts(engine.search(tree_root, "cow"))
+    assert "Milk the cow" not in texts(engine.search(tree_root, "milk"))
+
+    buy_milk = tree_root.children[0]
+    tree_root.remove_node(buy_milk)
+    engine.node_removed(buy_milk, tree_root, 0)
+    assert texts(engine.search(tree_root, "milk")) == ["Email Milko"]
+
+
+def test_in_tree_order(tree_root):
+    nodes = list(tree_root.gen_all_nodes())
+    assert in_tree_order(reversed(nodes)) == nodes
+
+
+def test_text_buffer_search(tree_root):
+    text_buffer = TextBuffer(listed_texts(tree_root))
+    assert texts(text_buffer.search(tree_root, "MI")) == [
+        "Buy milk", "Whole milk", "Oat milk", "Email Milko", "Millennium"
+    ]
+    assert texts(text_buffer.search(tree_root.children[1], "mi")) == ["Email Milko"]
+    assert texts(text_buffer.search(tree_root.children[1].children[0], "mi")) == []
+    assert texts(text_buffer.search(tree_root, "xyz")) == []
+
+
+def test_text_buffer_casefolds():
+    tree_root = TreeNode.from_string(
+        """
+- Äta middag
+- Straße
+- Åka till Öland""",
+        TodoItem.tree_node_from_str,
+    )
+    text_buffer = TextBuffer(listed_texts(tree_root))
+    assert texts(text_buffer.search(tree_root, "ät")) == ["Äta middag"]
+    assert texts(text_buffer.search(tree_root, "ÖL")) == ["Åka till Öland"]
+    assert texts(text_buffer.search(tree_root, "ss")) == ["Straße"]
+
+
+def test_text_buffer_has_text(tree_root):
+    text_buffer = TextBuffer(listed_texts(tree_root))
+    node = tree_root.children[1].children[1]
+    node.data.complete = True
+    assert text_buffer.has_text(node)
+    node.data.text = "Email Milo"
+    assert not text_buffer.has_text(node)
+
+
+def test_short_search_after_edit(tree_root, engine):
+    assert texts(engine.search(tree_root, "wo")) == ["Work"]
+    node = tree_root.children[2]
+    node.data.text = "Word"
+    engine.node_changed(node)
+    assert texts(engine.search(tree_root, "wo")) == ["Work", "Word"]
+
+
+def test_prepare_from_copied_texts(tree_root):
+    engine = SearchEngine()
+    texts_copy, version = engine.copy_texts(tree_root)
+    prepared = engine.prepare(texts_copy, version, is_cancelled=lambda: False).value()
+
+    assert engine.set_prepared(prepared)
+    assert engine.is_prepared()
+    assert texts(engine.search(tree_root, "milk")) == [
+        "Buy milk", "Whole milk", "Oat milk", "Email Milko"
+    ]
+    assert texts(engine.search(tree_root, "mi")) == texts(engine.search(tree_root, "mil"))
+
+
+def test_prepared_from_changed_tree_is_not_used(tree_root):
+    engine = SearchEngine()
+    texts_copy, version = engine.copy_texts(tree_root)
+    prepared = engine.prepare(texts_copy, version, is_cancelled=lambda: False).value()
+    node = tree_root.children[2]
+    node.data.text = "Milk the cow"
+    engine.node_changed(node)
+
+    assert not engine.set_prepared(prepared)
+    assert not engine.is_prepared()
+    assert engine.prepare(texts_copy, version, is_cancelled=lambda: True).is_none()
@@ -0,0 +1,117 @@
+import pytest
+
+from listigt.storage.sharded_storage import ShardedStorage
+from listigt.todo_list.todo_list import TodoItem
+from listigt.todo_list.tree import TreeNode
+
+
+@pytest.fixture
+def tree_str():
+    return """- Item 1
+  - [COMPLETE] Item 1.1
+  "Subtitle"
+    - Item 1.1.1
+  - [COLLAPSED] Item 1.2
+- Item 2
+  - Item 2.1"""
+
+
+def saved_tree(directory, tree_str, shard_depth=1):
+    storage = ShardedStorage(directory, shard_depth=shard_depth)
+    tree = TreeNode.from_string(tree_str, TodoItem.tree_node_from_str)
+    storage.tree_replaced(tree)
+    storage.save(tree)
+    return storage, tree
+
+
+def shard_files(directory):
+    return sorted(p for p in directory.iterdir() if p.suffix == ".txt")
+
+
+@pytest.mark.parametrize("shard_depth", [1, 2, 3])
+def test_save_and_load(tmp_path, tree_str, shard_depth):
+    saved_tree(tmp_path, tree_str, shard_depth)
+
+    loaded = ShardedStorage(tmp_path, shard_depth=shard_depth).load()
+    expected = TreeNode.from_string(tree_str, TodoItem.tree_node_from_str)
+    assert loaded.is_equivalent_to(expected)
+    assert loaded.children[0].children[0].data.subtitle == "Subtitle"
+
+
+def test_one_file_per_top_level_item(tmp_path, tree_str):
+    saved_tree(tmp_path, tree_str)
+    assert len(shard_files(tmp_path)) == 2
+
+
+def test_only_dirty_shards_are_rewritten(tmp_path, tree_str):
+    saved_tree(tmp_path, tree_str)
+
+    storage = ShardedStorage(tmp_path)
+    tree = storage.load()
+    files_by_first_line = {p.read_text().splitlines()[0]: p for p in shard_files(tmp_path)}
+    item_1_file = files_by_first_line["- Item 1"]
+    item_2_file = files_by_first_line["- Item 2"]
+    item_1_file.write_text("- Not rewritten")
+
+    node = tree.children[1].children[0]
+    node.data.complete = True
+    storage.node_changed(node)
+    storage.save(tree)
+
+    assert item_1_file.read_text() == "- Not rewritten"
+    assert "[COMPLETE] Item 2.1" in item_2_file.read_text()
+
+
+def test_removed_shard_is_deleted(tmp_path, tree_str):
+    storage, tree = saved_tree(tmp_path, tree_str)
+
+    node = tree.children[0]
+    tree.remove_node(node)
+    storage.node_removed(node, tree, 0)
+    storage.save(tree)
+
+    assert len(shard_files(tmp_path)) == 1
+    loaded = ShardedStorage(tmp_path).load()
+    assert [n.data.text for n in loaded.gen_all_nodes()] == ["Item 2", "Item 2.1"]
+
+
+def test_inserted_top_level_item_gets_new_shard(tmp_path, tree_str):
+    storage, tree = saved_tree(tmp_path, tree_str)
+
+    new_node = TreeNode(TodoItem("Item 3"))
+    tree.add_child(new_node)
+    storage.node_inserted(new_node)
+    storage.save(tree)
+
+    assert len(shard_files(tmp_path)) == 3
+    loaded = ShardedStorage(tmp_path).load()
+    assert [n.data.text for n in loaded.children] == ["Item 1", "Item 2", "Item 3"]
+
+
+def test_missing_shard_is_left_out(tmp_path, tree_str):
+    saved_tree(tmp_path, tree_str)
+    storage = ShardedStorage(tmp_path)
+    storage.load()
+    item_1_file = [p for p in shard_files(tmp_path) if "Item 1" in p.read_text()][0]
+    item_1_file.unlink()
+
+    storage = ShardedStorage(tmp_path)
+    tree = storage.load()
+    assert [n.data.text for n in tree.gen_all_nodes()] == ["Item 2", "Item 2.1"]
+
+    storage.save(tree)
+    assert "shard" in (tmp_path / "manifest.toml").read_text()
+    assert item_1_file.name not in (tmp_path / "manifest.toml").read_text()
+
+
+def test_stale_shard_files_are_deleted(tmp_path, tree_str):
+    saved_tree(tmp_path, tree_str)
+    (tmp_path / "stale.txt").write_text("- Stale")
+
+    storage = ShardedStorage(tmp_path)
+    tree = storage.load()
+    assert [n.data.text for n in tree.children] == ["Item 1", "Item 2"]
+    storage.save(tree)
+
+    assert len(shard_files(tmp_path)) == 2
+    assert not (tmp_path / "stale.txt").exists()
@@ -0,0 +1,123 @@
+import sqlite3
+
+import pytest
+
+from listigt.storage.sqlite_storage import SqliteStorage
+from listigt.todo_list.todo_list import TodoItem
+from listigt.todo_list.tree import TreeNode
+from listigt.utils.optional import Optional
+
+
+@pytest.fixture
+def tree_str():
+    return """- Item 1
+  - [COMPLETE] Item 1.1
+  "Subtitle"
+    - Item 1.1.1
+  - [COLLAPSED] Item 1.2
+- Item 2"""
+
+
+@pytest.fixture
+def storage_and_tree(tmp_path, tree_str):
+    storage = SqliteStorage(tmp_path / "savefile.sqlite")
+    storage.tree_replaced(TreeNode.from_string(tree_str, TodoItem.tree_node_from_str))
+    return storage, storage.load()
+
+
+def test_load_after_tree_replaced(storage_and_tree, tree_str):
+    _, tree = storage_and_tree
+    expected = TreeNode.from_string(tree_str, TodoItem.tree_node_from_str)
+    assert tree.is_equivalent_to(expected)
+    assert tree.children[0].children[0].data.subtitle == "Subtitle"
+
+
+def test_node_inserted(tmp_path, storage_and_tree):
+    storage, tree = storage_and_tree
+    item_1 = tree.children[0]
+    new_node = TreeNode(TodoItem("New item"))
+    item_1.add_child(new_node, after_child=Optional.some(item_1.children[0]))
+    storage.node_inserted(new_node)
+
+    reloaded = SqliteStorage(tmp_path / "savefile.sqlite").load()
+    assert [c.data.text for c in reloaded.children[0].children] == [
+        "Item 1.1",
+        "New item",
+        "Item 1.2",
+    ]
+
+
+def test_many_inserts_between_same_siblings(tmp_path, storage_and_tree):
+    storage, tree = storage_and_tree
+    first = tree.children[0]
+    for i in range(100):
+        new_node = TreeNode(TodoItem(f"New {i}"))
+        first.add_sibling_after_self(new_node)
+        storage.node_inserted(new_node)
+
+    reloaded = SqliteStorage(tmp_path / "savefile.sqlite").load()
+    texts = [c.data.text for c in reloaded.children]
+    assert texts == ["Item 1"] + [f"New {i}" for i in reversed(range(100))] + ["Item 2"]
+
+
+def test_node_removed_removes_subtree(tmp_path, storage_and_tree):
+    storage, tree = storage_and_tree
+    item_1 = tree.children[0]
+    tree.remove_node(item_1)
+    storage.node_removed(item_1, tree, 0)
+
+    reloaded = SqliteStorage(tmp_path / "savefile.sqlite").load()
+    assert [c.data.text for c in reloaded.gen_all_nodes()] == ["Item 2"]
+
+
+def test_node_changed(tmp_path, storage_and_tree):
+    storage, tree = storage_and_tree
+    node = tree.children[1]
+    node.data.text = "Changed"
+    node.data.complete = True
+    storage.node_changed(node)
+
+    reloaded = SqliteStorage(tmp_path / "savefile.sqlite").load()
+    assert reloaded.children[1].data == TodoItem("Changed", complete=True)
+
+
+def test_old_full_text_index_is_dropped(tmp_path):
+    db_file = tmp_path / "savefile.sqlite"
+    connection = sqlite3.connect(str(db_file))
+    connection.executescript(
+        """
+        CREATE TABLE nodes (
+            id INTEGER PRIMARY KEY,
+            parent_id INTEGER REFERENCES nodes(id),
+            sort_key REAL NOT NULL,
+            text TEXT NOT NULL,
+            subtitle TEXT NOT NULL DEFAULT '',
+            complete INTEGER NOT NULL DEFAULT 0,
+            collapsed INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE VIRTUAL TABLE nodes_fts USING fts5(text, content='nodes', content_rowid='id');
+        CREATE TRIGGER nodes_after_insert AFTER INSERT ON nodes BEGIN
+            INSERT INTO nodes_fts(rowid, text) VALUES (new.id, new.text);
+        END;
+        """
+    )
+    connection.close()
+
+    storage = SqliteStorage(db_file)
+    storage.tree_replaced(TreeNode.from_string("- Item 1", TodoItem.tree_node_from_str))
+
+    rows = sqlite3.connect(str(db_file)).execute("SELECT name FROM sqlite_master")
+    names = {row[0] for row in rows}
+    assert not {name for name in names if name.startswith("nodes_fts") or "after" in name}
+    assert [c.data.text for c in SqliteStorage(db_file).load().children] == ["Item 1"]
+
+
+def test_ids_are_kept(tmp_path, storage_and_tree):
+    storage, tree = storage_and_tree
+    new_node = TreeNode(TodoItem("New item", id="abcd1234"))
+    tree.add_child(new_node)
+    storage.node_inserted(new_node)
+
+    reloaded = SqliteStorage(tmp_path / "savefile.sqlite").load()
+    assert reloaded.children[-1].data.id == "abcd1234"
+    assert reloaded.children[0].data.id == ""
@@ -0,0 +1,66 @@
+import random
+
+from listigt.todo_list.subtree_stats import SubtreeStats
+from listigt.todo_list.todo_list import TodoItem
+from listigt.todo_list.tree import TreeNode
+
+
+def counted_progress(node):
+    nodes = list(node.gen_all_nodes())
+    return sum(1 for n in nodes if n.data.complete), len(nodes)
+
+
+def test_progress():
+    tree_root = TreeNode.from_string(
+        "- A\n  - [COMPLETE] A1\n    - A1a\n  - A2\n- B", TodoItem.tree_node_from_str
+    )
+    stats = SubtreeStats()
+    stats.tree_replaced(tree_root)
+    a = tree_root.children[0]
+    assert stats.progress(tree_root) == (1, 5)
+    assert stats.progress(a) == (1, 3)
+    assert stats.progress(tree_root.children[1]) == (0, 0)
+
+    a2 = a.children[1]
+    a2.data.complete = True
+    stats.node_changed(a2)
+    assert stats.progress(a) == (2, 3)
+
+    a.remove_node(a2)
+    stats.node_removed(a2, a, 1)
+    assert stats.progress(tree_root) == (1, 4)
+
+    tree_root.children[1].add_child(a2)
+    stats.node_inserted(a2)
+    assert stats.progress(tree_root) == (2, 5)
+    assert stats.progress(tree_root.children[1]) == (1, 1)
+
+
+def test_progress_stays_right_after_many_changes():
+    rng = random.Random(4)
+    tree_root = TreeNode(TodoItem("root"), level=-1)
+    stats = SubtreeStats()
+    stats.tree_replaced(tree_root)
+    nodes = [tree_root]
+    for i in range(500):
+        action = rng.random()
+        if action < 0.5 or len(nodes) < 3:
+            node = TreeNode(TodoItem(f"Item {i}"))
+            rng.choice(nodes).add_child(node)
+            stats.node_inserted(node)
+            nodes.append(node)
+        elif action < 0.8:
+            node = rng.choice(nodes[1:])
+            node.data.complete = not node.data.complete
+            stats.node_changed(node)
+        else:
+            node = rng.choice(nodes[1:])
+            parent = node.parent.value()
+            index = parent.children.index(node)
+            parent.remove_node(node)
+            stats.node_removed(node, parent, index)
+            removed = {node, *node.gen_all_nodes()}
+            nodes = [n for n in nodes if n not in removed]
+
+    for node in nodes:
+        assert stats.progress(node) == counted_progress(node)
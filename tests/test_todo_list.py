@@ -77,3 +77,24 @@ def test_copy():
 
     assert node.data.text == "test"
     assert deep_copied_node.data.text == "changed"
+
+
+def test_item_id_in_save_format():
+    tree = TreeNode.from_string(
+        '- [COMPLETE] Buy milk - today {#aB3_x-9Q}\n"Subtitle"\n- Old item',
+        TodoItem.tree_node_from_str,
+    )
+    item = tree.children[0].data
+
+    assert item.text == "Buy milk - today"
+    assert item.id == "aB3_x-9Q"
+    assert item.subtitle == "Subtitle"
+    assert str(item) == '[COMPLETE] Buy milk - today {#aB3_x-9Q}\n"Subtitle"'
+    assert tree.children[1].data.id == ""
+
+
+def test_text_ending_like_an_id_is_kept():
+    for item in [TodoItem("See {#tag}"), TodoItem("See {#tag}", id="aB3_x-9Q"), TodoItem("{#}")]:
+        tree = TreeNode.from_string(f"- {item}", TodoItem.tree_node_from_str)
+        assert tree.children[0].data.text == item.text
+        assert tree.children[0].data.id == item.id
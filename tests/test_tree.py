@@ -340,3 +340,18 @@ def test_deepcopy(tree_and_nodes):
     root, _ = tree_and_nodes
     copied_tree = deepcopy(root)
     assert root.is_equivalent_to(copied_tree)
+
+
+def test_is_descendant_of_after_removal(tree_and_nodes):
+    root, nodes = tree_and_nodes
+    assert nodes["leaf3"].is_descendant_of(root)
+    assert nodes["leaf3"].is_descendant_of(nodes["branch1"])
+    assert not nodes["branch1"].is_descendant_of(nodes["leaf3"])
+
+    nodes["branch1"].remove_node(nodes["sub_branch"])
+    assert nodes["sub_branch"].parent.is_none()
+    assert not nodes["leaf3"].is_descendant_of(root)
+    assert nodes["leaf3"].is_descendant_of(nodes["sub_branch"])
+
+    assert root.remove_child_at(0) is nodes["branch1"]
+    assert not nodes["leaf1"].is_descendant_of(root)
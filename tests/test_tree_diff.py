@@ -0,0 +1,189 @@
+import time
+
+from listigt.todo_list.change_listener import ChangeListener
+from listigt.todo_list.todo_list import TodoItem
+from listigt.todo_list.tree import TreeNode
+from listigt.todo_list.tree_diff import CONFLICT_TEXT, merge_trees, sync_tree
+
+
+class RecordingListener(ChangeListener):
+    def __init__(self):
+        self.events = []
+
+    def node_inserted(self, node):
+        self.events.append(("inserted", node.data.text))
+
+    def node_removed(self, node, old_parent, old_index):
+        self.events.append(("removed", node.data.text, old_index))
+
+    def node_changed(self, node):
+        self.events.append(("changed", node.data.text))
+
+
+def make_tree(s):
+    return TreeNode.from_string(s, TodoItem.tree_node_from_str)
+
+
+def test_sync_tree_keeps_matching_nodes():
+    tree = make_tree("- Item 1\n  - [COLLAPSED] Item 1.1\n    - Item 1.1.1\n- Item 2\n- Item 3")
+    item_1_1 = tree.children[0].children[0]
+    item_3 = tree.children[2]
+    new_tree_str = "- Item 1\n  - Item 1.1\n    - [COMPLETE] Item 1.1.1\n- Item 3\n- Item 4"
+    listener = RecordingListener()
+
+    sync_tree(tree, make_tree(new_tree_str), [listener])
+
+    assert [n.data.text for n in tree.gen_all_nodes()] == [
+        "Item 1",
+        "Item 1.1",
+        "Item 1.1.1",
+        "Item 3",
+        "Item 4",
+    ]
+    assert tree.children[0].children[0] is item_1_1
+    assert tree.children[1] is item_3
+    assert item_1_1.data.collapsed
+    assert item_1_1.children[0].data.complete
+    assert listener.events == [
+        ("changed", "Item 1.1.1"),
+        ("removed", "Item 2", 1),
+        ("inserted", "Item 4"),
+    ]
+
+
+def test_sync_tree_edited_text():
+    tree = make_tree("- Item 1\n  - Item 1.1\n- Item 2")
+    item_1 = tree.children[0]
+
+    sync_tree(tree, make_tree("- Item one\n  - Item 1.1\n- Item 2"), [])
+
+    assert tree.children[0] is item_1
+    assert item_1.data.text == "Item one"
+    assert item_1.children[0].data.text == "Item 1.1"
+
+
+def test_sync_tree_inserted_subtree_levels():
+    tree = make_tree("- Item 1")
+
+    sync_tree(tree, make_tree("- Item 1\n  - Item 1.1\n    - Item 1.1.1"), [])
+
+    node = tree.children[0].children[0].children[0]
+    assert node.data.text == "Item 1.1.1"
+    assert node.level == 2
+
+
+
+def test_sync_tree_matches_items_by_id():
+    tree = make_tree("- Item 1 {#one}\n- Item 2 {#two}")
+    item_2 = tree.children[1]
+    listener = RecordingListener()
+
+    sync_tree(tree, make_tree("- Item two {#two}"), [listener])
+
+    assert tree.children == [item_2]
+    assert item_2.data.text == "Item two"
+    assert listener.events == [("removed", "Item 1", 0), ("changed", "Item two")]
+
+
+def test_sync_tree_takes_ids_from_the_new_tree():
+    tree = make_tree("- Item 1 {#one}\n- Item 2 {#two}")
+    item_2 = tree.children[1]
+    listener = RecordingListener()
+
+    sync_tree(tree, make_tree("- Item 1 {#one}\n- Item 2 {#new}"), [listener])
+
+    assert tree.children[1] is item_2
+    assert item_2.data.id == "new"
+    assert listener.events == [("changed", "Item 2")]
+
+
+def test_sync_tree_many_items_with_the_same_text():
+    num_items = 20000
+    tree = make_tree("\n".join(["- Item"] * num_items))
+    last_item = tree.children[-1]
+
+    start = time.perf_counter()
+    sync_tree(tree, make_tree("\n".join(["- First"] + ["- Item"] * num_items)), [])
+
+    assert time.perf_counter() - start < 5
+    assert [node.data.text for node in tree.children] == ["First"] + ["Item"] * num_items
+    assert tree.children[-1] is last_item
+
+def tree_str(tree):
+    return "\n".join(str(child) for child in tree.children)
+
+
+def test_merge_trees_changes_on_different_nodes():
+    base = "- Item 1\n  - Item 1.1\n- Item 2\n- Item 3"
+    ours = "- Item 1\n  - [COMPLETE] Item 1.1\n- Item 2\n- Item 3"
+    theirs = "- Item 1\n  - Item 1.1\n- Item 3\n  - Item 3.1"
+
+    merged = merge_trees(make_tree(base), make_tree(ours), make_tree(theirs))
+
+    assert tree_str(merged) == "- Item 1\n  - [COMPLETE] Item 1.1\n- Item 3\n  - Item 3.1"
+
+
+def test_merge_trees_insertions_on_both_sides():
+    base = "- Item 1"
+    ours = "- Item 1\n  - Ours"
+    theirs = "- Item 1\n  - Theirs"
+
+    merged = merge_trees(make_tree(base), make_tree(ours), make_tree(theirs))
+
+    assert tree_str(merged) == "- Item 1\n  - Ours\n  - Theirs"
+
+
+def test_merge_trees_conflicting_edits_keep_both():
+    base = "- Item 1\n- Item 2"
+    ours = "- Item 1\n- Our edit"
+    theirs = "- Item 1\n- Their edit"
+
+    merged = merge_trees(make_tree(base), make_tree(ours), make_tree(theirs))
+
+    assert tree_str(merged) == f"- Item 1\n- Our edit\n- {CONFLICT_TEXT} Their edit"
+
+
+def test_merge_trees_matches_items_by_id():
+    base = "- Item 1 {#one}\n- Item 2 {#two}"
+    ours = "- Item 0\n- Item 1 {#one}\n- Item 2 {#two}"
+    theirs = "- Item one {#one}\n- Item 2 {#two}"
+
+    merged = merge_trees(make_tree(base), make_tree(ours), make_tree(theirs))
+
+    assert tree_str(merged) == "- Item 0\n- Item one {#one}\n- Item 2 {#two}"
+
+
+def test_merge_trees_many_items_with_the_same_text():
+    num_items = 20000
+    base = "\n".join(["- Item"] * num_items)
+    ours = "\n".join(["- Item"] * num_items + ["- Ours"])
+    theirs = "\n".join(["- Theirs"] + ["- Item"] * num_items)
+
+    start = time.perf_counter()
+    merged = merge_trees(make_tree(base), make_tree(ours), make_tree(theirs))
+
+    assert time.perf_counter() - start < 5
+    texts = [node.data.text for node in merged.children]
+    assert texts == ["Theirs"] + ["Item"] * num_items + ["Ours"]
+
+
+def test_merge_trees_text_edit_and_children_edit():
+    base = "- A {#a1}\n  - B {#b1}"
+    ours = "- A {#a1}\n  - B {#b1}\n  - C"
+    theirs = "- A renamed {#a1}\n  - B {#b1}"
+
+    merged = merge_trees(make_tree(base), make_tree(ours), make_tree(theirs))
+
+    assert tree_str(merged) == "- A renamed {#a1}\n  - B {#b1}\n  - C"
+
+
+def test_merge_trees_text_edits_on_both_sides():
+    base = "- A {#a1}\n  - B {#b1}"
+    ours = "- Our A {#a1}\n  - B {#b1}\n  - C"
+    theirs = "- Their A {#a1}\n  - B {#b1}"
+
+    merged = merge_trees(make_tree(base), make_tree(ours), make_tree(theirs))
+
+    assert tree_str(merged) == (
+        f"- Our A {CONFLICT_TEXT} Their A {{#a1}}\n  - B {{#b1}}\n  - C"
+    )
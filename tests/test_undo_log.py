@@ -0,0 +1,115 @@
+from listigt.todo_list.change_listener import ChangeListener
+from listigt.todo_list.todo_list import TodoItem
+from listigt.todo_list.tree import TreeNode
+from listigt.utils.optional import Optional
+from listigt.view_model.undo_log import (
+    ChangeCommand,
+    InsertCommand,
+    MoveCommand,
+    RemoveCommand,
+    UndoEntry,
+    UndoLog,
+)
+
+
+class RecordingListener(ChangeListener):
+    def __init__(self):
+        self.changes = []
+
+    def node_inserted(self, node):
+        self.changes.append(("inserted", node.data.text))
+
+    def node_removed(self, node, old_parent, old_index):
+        self.changes.append(("removed", node.data.text, old_index))
+
+    def node_changed(self, node):
+        self.changes.append(("changed", node.data.text))
+
+
+def make_tree():
+    return TreeNode.from_string(
+        "- A\n  - A1\n  - A2\n- B", TodoItem.tree_node_from_str
+    )
+
+
+def texts(node):
+    return [child.data.text for child in node.children]
+
+
+def test_commands():
+    tree_root = make_tree()
+    a, b = tree_root.children
+    a2 = a.children[1]
+    listener = RecordingListener()
+
+    remove = RemoveCommand(a2, a, 1)
+    remove.redo([listener])
+    assert texts(a) == ["A1"]
+    remove.undo([listener])
+    assert texts(a) == ["A1", "A2"]
+    assert a2.level == 1
+
+    move = MoveCommand(a, tree_root, 0, b, 0)
+    move.redo([listener])
+    assert texts(tree_root) == ["B"]
+    assert texts(b) == ["A"]
+    assert a2.level == 2
+    move.undo([listener])
+    assert texts(tree_root) == ["A", "B"]
+    assert a2.level == 1
+
+    change = ChangeCommand(b, "text", "B", "C")
+    change.redo([listener])
+    assert b.data.text == "C"
+    change.undo([listener])
+    assert b.data.text == "B"
+
+    assert listener.changes == [
+        ("removed", "A2", 1),
+        ("inserted", "A2"),
+        ("removed", "A", 0),
+        ("inserted", "A"),
+        ("removed", "A", 0),
+        ("inserted", "A"),
+        ("changed", "C"),
+        ("changed", "B"),
+    ]
+
+
+def test_undo_and_redo():
+    undo_log = UndoLog()
+    tree_root = make_tree()
+    entry = UndoEntry([InsertCommand(tree_root.children[1], tree_root, 1)], Optional.none(), Optional.none())
+    undo_log.record(entry)
+
+    assert undo_log.redo().is_none()
+    assert undo_log.undo().value() is entry
+    assert undo_log.undo().is_none()
+    assert undo_log.redo().value() is entry
+
+    undo_log.undo()
+    undo_log.record(UndoEntry([ChangeCommand(tree_root, "text", "", "x")], Optional.none(), Optional.none()))
+    # Recording a new change drops what could be redone
+    assert undo_log.redo().is_none()
+    assert len(undo_log) == 1
+
+
+def test_undo_log_limits():
+    tree_root = make_tree()
+
+    def entry(command):
+        return UndoEntry([command], Optional.none(), Optional.none())
+
+    undo_log = UndoLog(max_entries=2)
+    for text in ["x", "y", "z"]:
+        undo_log.record(entry(ChangeCommand(tree_root, "text", "", text)))
+    assert len(undo_log) == 2
+    assert undo_log.undo().value().commands[0].new_value == "z"
+    assert undo_log.undo().value().commands[0].new_value == "y"
+    assert undo_log.undo().is_none()
+
+    # Removed subtrees count for each of their nodes
+    undo_log = UndoLog(max_nodes=3)
+    undo_log.record(entry(RemoveCommand(tree_root.children[0], tree_root, 0)))
+    undo_log.record(entry(RemoveCommand(tree_root.children[1], tree_root, 1)))
+    assert len(undo_log) == 1
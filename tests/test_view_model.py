@@ -1,12 +1,19 @@
+import threading
+import time
 from copy import deepcopy
 from pathlib import Path
 
 import pytest
 
 from listigt.config import config
+from listigt.storage.storage import TextFileStorage
 from listigt.todo_list import todo_list
 from listigt.todo_list.tree import TreeNode
-from listigt.view_model.view_model import ViewModel
+from listigt.view_model.view_model import (
+    SEARCH_LATENCY_TARGET_SECONDS,
+    ViewModel,
+    label_display_text,
+)
 from listigt.utils.optional import Optional
 
 
@@ -35,10 +42,21 @@ def save_file():
 
 
 @pytest.fixture
-def view_model(tree_root, save_file):
-    config_manager = config.ConfigManager()
+def config_manager(tmp_path):
+    # Doesn't read the real config file in the home directory
+    config_manager = config.ConfigManager(
+        save_file=Optional.some(tmp_path / "savefile"),
+        config_file=Optional.some(tmp_path / "config.toml"),
+    )
     config_manager.hide_complete_items = False
-    config_manager.root_node_index = Optional.none()
+    config_manager.search_mode = "exact"
+    config_manager.root_node_id = Optional.none()
+    config_manager.selected_node_id = Optional.none()
+    return config_manager
+
+
+@pytest.fixture
+def view_model(tree_root, save_file, config_manager):
 
     vm = ViewModel(tree_root, config_manager)
     vm.set_window_size(50, 10)
@@ -57,7 +75,7 @@ def test_init(view_model):
 
 def test_set_window_height(view_model):
     view_model.set_window_size(0, 3)
-    assert view_model._last_item_on_screen == 3
+    assert view_model.num_items_on_screen == 3
 
 
 def test_list_items(view_model):
@@ -90,6 +108,119 @@ def test_list_items_hide_complete(view_model):
     for result, expected in zip(list_items, expected_items):
         assert result.text == expected
 
+
+def test_list_items_only_makes_items_on_screen(config_manager):
+    tree_root = TreeNode.from_string(
+        "\n".join(f"- Item {i}" for i in range(1000)), todo_list.TodoItem.tree_node_from_str
+    )
+    vm = ViewModel(tree_root, config_manager)
+    vm.set_window_size(50, 5)
+
+    formatted_texts = []
+    label_display_text = vm._label_display_text
+
+    def counting_label_display_text(text, indent, is_selected, spans=()):
+        formatted_texts.append(text)
+        return label_display_text(text, indent, is_selected, spans)
+
+    vm._label_display_text = counting_label_display_text
+
+    list_items = vm.list_items()
+    assert [item.text for item in list_items] == [f"Item {i}" for i in range(5)]
+    assert len(formatted_texts) == 5
+
+    for _ in range(7):
+        vm.select_next()
+    scrolled_items = vm.list_items()
+    assert [item.text for item in scrolled_items] == [f"Item {i}" for i in range(3, 8)]
+    assert scrolled_items[-1].is_selected
+    assert len(formatted_texts) == 10
+    # The same items are filled in again
+    assert all(new is old for new, old in zip(scrolled_items, list_items))
+
+
+def test_scrolling_walks_from_the_first_item_on_screen(monkeypatch, config_manager):
+    tree_root = TreeNode(todo_list.TodoItem("root"), level=-1)
+    for i in range(200):
+        node = TreeNode(todo_list.TodoItem(f"Item {i}"))
+        tree_root.add_child(node)
+        for j in range(100):
+            node.add_child(TreeNode(todo_list.TodoItem(f"Item {i}.{j}")))
+    vm = ViewModel(tree_root, config_manager)
+    vm.set_window_size(50, 5)
+    vm.list_items()
+
+    # Far below the screen, shown at the top
+    vm.selected_node = Optional.some(tree_root.children[150].children[50])
+    assert [item.text for item in vm.list_items()] == [f"Item 150.{j}" for j in range(50, 55)]
+
+    num_walked = 0
+    gen_all_visible_nodes = TreeNode.gen_all_visible_nodes
+
+    def counting_gen_all_visible_nodes(node):
+        nonlocal num_walked
+        num_walked += 1
+        return gen_all_visible_nodes(node)
+
+    monkeypatch.setattr(TreeNode, "gen_all_visible_nodes", counting_gen_all_visible_nodes)
+    for _ in range(6):
+        vm.select_next()
+    assert [item.text for item in vm.list_items()] == [f"Item 150.{j}" for j in range(52, 57)]
+    assert vm.index_of_selected_node() == 4
+    for _ in range(5):
+        vm.select_previous()
+    assert [item.text for item in vm.list_items()] == [f"Item 150.{j}" for j in range(51, 56)]
+    assert vm.index_of_selected_node() == 0
+    assert num_walked < 100
+
+    vm.delete_item()
+    assert vm.list_items()[0].text == "Item 150.52"
+
+
+def test_progress(view_model):
+    assert view_model.root_progress() == "1/8"
+    list_items = view_model.list_items()
+    assert [item.progress for item in list_items[:3]] == ["1/6", "0/2", ""]
+
+    view_model.toggle_complete()
+    assert view_model.root_progress() == "7/8"
+    assert view_model.list_items()[0].progress == "6/6"
+    view_model.undo()
+    assert view_model.root_progress() == "1/8"
+
+    view_model.select_next()
+    view_model.delete_item()
+    assert view_model.root_progress() == "0/5"
+    view_model.set_as_root(view_model.tree_root.first_child())
+    assert view_model.root_progress() == "0/3"
+
+
+def test_navigation_skips_items_below_hidden_items(config_manager):
+    tree_root = TreeNode.from_string(
+        """
+- A
+  - [COMPLETE] B
+    - G
+    - [COMPLETE] H
+    - I
+- C
+- D""",
+        todo_list.TodoItem.tree_node_from_str,
+    )
+    vm = ViewModel(tree_root, config_manager)
+    vm.set_window_size(50, 10)
+    vm.selected_node = Optional.some(tree_root.children[0].children[0].children[0])
+    vm.toggle_hide_complete_items()
+
+    visited = []
+    for _ in range(5):
+        vm.select_next()
+        visited.append(vm.selected_node.value().data.text)
+    # Never H or I, which are below the hidden B
+    assert visited == ["C", "D", "A", "C", "D"]
+    assert not any(node.visible for node in tree_root.children[0].children[0].gen_all_nodes())
+
+
 def test_list_title(view_model):
     assert view_model.list_title() == ("Toppnivå", "")
     view_model.set_as_root(view_model.tree_root.first_child())
@@ -165,6 +296,34 @@ def test_toggle_collapse_node(view_model):
     assert not view_model.selected_node.value().data.collapsed
 
 
+
+def test_collapse_and_complete_update_visible_items(view_model):
+    def visible_texts():
+        return [item.text for item in view_model.list_items()]
+
+    view_model.set_window_size(50, 20)
+    view_model.toggle_collapse_node()
+    assert visible_texts() == ["Item 1", "Item 2"]
+
+    view_model.toggle_collapse_node()
+    assert visible_texts() == [
+        "Item 1", "Item 1.1", "Item 1.1.1", "Item 1.1.2", "Item 1.2", "Item 1.2.1", "Item 2"
+    ]
+
+    view_model.toggle_hide_complete_items()
+    assert visible_texts() == ["Item 1", "Item 1.2", "Item 1.2.1", "Item 2"]
+
+    view_model.select_next()
+    view_model.toggle_complete()
+    assert visible_texts() == ["Item 1", "Item 2"]
+
+    view_model.toggle_hide_complete_items()
+    view_model.select_next()
+    view_model.toggle_collapse_node()
+    assert view_model.selected_node.value().data.text == "Item 1.1"
+    assert visible_texts() == ["Item 1", "Item 1.1", "Item 1.2", "Item 1.2.1", "Item 2"]
+
+
 def test_insert_start_cancel(view_model):
     assert not view_model.is_inserting
 
@@ -220,12 +379,14 @@ def test_is_searching(view_model):
 
 def test_finish_search(view_model):
     view_model.update_search("Item 2")
+    view_model.wait_for_search()
     view_model.finish_search()
     assert not view_model.is_searching
     assert view_model.selected_node.value().data.text == "Item 2"
 
 def test_select_next_and_previous_search_result(view_model):
     view_model.update_search("Item 1.1")
+    view_model.wait_for_search()
     assert view_model.is_searching
     assert view_model.selected_node.value().data.text == "Item 1.1"
     view_model.select_next_search_result()
@@ -236,6 +397,147 @@ def test_select_next_and_previous_search_result(view_model):
     assert view_model.selected_node.value().data.text == "Item 1.1"
     assert not view_model.is_searching
 
+
+def test_search_narrows_down_previous_results(view_model):
+    def result_texts():
+        return [node.data.text for node in view_model._search_results]
+
+    view_model.update_search("item 1")
+    view_model.wait_for_search()
+    assert len(result_texts()) == 7
+
+    # Only the previous results are looked at when the query gets longer
+    renamed_node = view_model.tree_root.last_child().value()
+    renamed_node.data.text = "Item 1.1 renamed"
+    view_model._notify_node_changed(renamed_node)
+    view_model.update_search("item 1.1")
+    view_model.wait_for_search()
+    assert result_texts() == ["Item 1.1", "Item 1.1.1", "Item 1.1.2"]
+
+    view_model.update_search("item 1.")
+    view_model.wait_for_search()
+    assert result_texts() == [
+        "Item 1.1", "Item 1.1.1", "Item 1.1.2", "Item 1.2", "Item 1.2.1", "Item 1.2.1.1", "Item 1.1 renamed"
+    ]
+    view_model.select_previous_search_result()
+    assert view_model.selected_node.value().data.text == "Item 1.1 renamed"
+
+
+
+def test_fuzzy_search(view_model):
+    results_shown = threading.Event()
+    view_model.on_background_update = Optional.some(results_shown.set)
+    view_model.next_search_mode()
+    assert view_model.search_mode == "fuzzy"
+    view_model.update_search("")
+    view_model.update_search("1211")
+
+    assert results_shown.wait(timeout=5)
+    with view_model.lock:
+        assert view_model.selected_node.value().data.text == "Item 1.2.1.1"
+        # Partly matched in the text of its parent
+        assert [node.data.text for node in view_model._search_results] == [
+            "Item 1.2.1.1", "Item 1.2.1"
+        ]
+        # Its collapsed parent was opened to show it
+        assert len([item for item in view_model.list_items() if item.is_search_result]) == 2
+    view_model.finish_search()
+
+
+
+def test_regex_search(view_model):
+    view_model.next_search_mode()
+    view_model.next_search_mode()
+    assert view_model.search_mode == "regex"
+    view_model.update_search("")
+    view_model.update_search(r"ITEM 1\.2\.\d$")
+    assert view_model.wait_for_search(timeout=5)
+    with view_model.lock:
+        assert [node.data.text for node in view_model._search_results] == ["Item 1.2.1"]
+
+    # Half typed patterns find nothing
+    view_model.update_search("Item (1")
+    assert view_model.wait_for_search(timeout=5)
+    with view_model.lock:
+        assert view_model._search_results == []
+    view_model.finish_search()
+
+    view_model.next_search_mode()
+    assert view_model.search_mode == "exact"
+
+
+
+def test_fast_typing_searches_once(config_manager):
+    tree_root = TreeNode(todo_list.TodoItem("root"), level=-1)
+    for i in range(200):
+        node = TreeNode(todo_list.TodoItem(f"Item {i}"))
+        tree_root.add_child(node)
+        for j in range(100):
+            node.add_child(TreeNode(todo_list.TodoItem(f"Item {i}.{j}")))
+    vm = ViewModel(tree_root, config_manager)
+    vm.set_window_size(50, 10)
+
+    searched = []
+    search = vm._search_engine.search
+
+    def recording_search(tree_root, search_string):
+        searched.append(search_string)
+        return search(tree_root, search_string)
+
+    vm._search_engine.search = recording_search
+    shown_at = []
+    vm.on_background_update = Optional.some(lambda: shown_at.append(time.monotonic()))
+
+    vm.update_search("")
+    assert vm.wait_for_search(timeout=10)
+    typed = ""
+    for char in "item 42.7":
+        typed += char
+        with vm.lock:
+            vm.update_search(typed)
+        last_key_at = time.monotonic()
+        time.sleep(0.005)
+    assert vm.wait_for_search(timeout=10)
+
+    assert searched == ["item 42.7"]
+    assert shown_at[0] - last_key_at < SEARCH_LATENCY_TARGET_SECONDS
+    # A screenful first, then the rest
+    assert len(shown_at) == 2
+    assert len(vm._search_results) == 11
+    assert vm.selected_node.value().data.text == "Item 42.7"
+
+
+def test_stop_searches(view_model):
+    view_model.update_search("")
+    view_model.update_search("Item")
+    view_model.stop_searches()
+
+    assert not view_model._search_worker._thread.value().is_alive()
+
+
+def test_search_index_is_made_without_holding_the_lock(view_model):
+    lock_was_free = []
+    prepare = view_model._search_engine.prepare
+
+    def try_lock():
+        if view_model.lock.acquire(timeout=1):
+            view_model.lock.release()
+            lock_was_free.append(True)
+
+    def prepare_with_other_thread(texts, version, is_cancelled):
+        thread = threading.Thread(target=try_lock)
+        thread.start()
+        thread.join()
+        return prepare(texts, version, is_cancelled)
+
+    view_model._search_engine.prepare = prepare_with_other_thread
+    view_model.update_search("")
+    assert view_model.wait_for_search(timeout=10)
+
+    assert lock_was_free == [True]
+    assert view_model._search_engine.is_prepared()
+
+
 def test_toggle_complete(view_model):
     assert not view_model.selected_node.value().data.complete
 
@@ -308,3 +610,308 @@ def test_undo(view_model):
 
     view_model.undo()
     assert original_tree.is_equivalent_to(view_model.tree_root.root())
+
+
+def test_undo_and_redo_keep_the_same_nodes(view_model):
+    item_1 = view_model.tree_root.children[0]
+    item_1_2 = item_1.children[1]
+    view_model.selected_node = Optional.some(item_1_2)
+    view_model.start_edit()
+    view_model.finish_edit("Edited")
+    view_model.toggle_complete()
+    assert all(node.data.complete for node in [item_1_2, *item_1_2.gen_all_nodes()])
+
+    view_model.undo()
+    assert not any(node.data.complete for node in [item_1_2, *item_1_2.gen_all_nodes()])
+    view_model.undo()
+    assert item_1_2.data.text == "Item 1.2"
+    assert view_model.tree_root.children[0] is item_1
+    assert item_1.children[1] is item_1_2
+    assert view_model.selected_node.value() is item_1_2
+
+    view_model.redo()
+    assert item_1_2.data.text == "Edited"
+    view_model.redo()
+    assert all(node.data.complete for node in [item_1_2, *item_1_2.gen_all_nodes()])
+    view_model.redo()
+    assert item_1_2.data.text == "Edited"
+
+
+def test_undo_cut_then_paste(view_model):
+    view_model.select_next()
+    view_model.delete_item()
+    view_model.undo()
+    assert [node.data.text for node in view_model.tree_root.children[0].children] == [
+        "Item 1.1",
+        "Item 1.2",
+    ]
+    # The item is back in the tree, so there is nothing to paste
+    view_model.paste_item()
+    assert len(list(view_model.tree_root.gen_all_nodes())) == 8
+
+    view_model.redo()
+    view_model.select_top()
+    view_model.paste_item()
+    assert [node.data.text for node in view_model.tree_root.children] == [
+        "Item 1",
+        "Item 1.1",
+        "Item 2",
+    ]
+    view_model.undo()
+    view_model.undo()
+    assert [node.data.text for node in view_model.tree_root.children] == ["Item 1", "Item 2"]
+    assert len(list(view_model.tree_root.gen_all_nodes())) == 8
+
+
+def test_undo_insert_of_root(view_model):
+    view_model.insert_item("New")
+    new_node = view_model.selected_node.value()
+    view_model.set_as_root(Optional.some(new_node))
+    view_model.undo()
+
+    assert view_model.tree_root is view_model.tree_root.root()
+    assert view_model.selected_node.value().data.text == "Item 1"
+
+
+def test_multi_selection(view_model):
+    item_1, item_2 = view_model.tree_root.children
+    item_1_1, item_1_2 = item_1.children
+    view_model.select_next()
+    view_model.toggle_visual_mode()
+    view_model.select_next()
+    view_model.select_next()
+    view_model.select_next()
+    assert view_model.selected_node.value() is item_1_2
+    # The items below Item 1.1 go along with it
+    assert view_model.multi_selection() == [item_1_1, item_1_2]
+    assert [item.is_marked for item in view_model.list_items()] == [
+        False, True, True, True, True, False, False
+    ]
+
+    view_model.toggle_visual_mode()
+    view_model.toggle_mark()
+    view_model.selected_node = Optional.some(item_2)
+    view_model.toggle_mark()
+    assert view_model.multi_selection() == [item_1_2, item_2]
+
+
+def test_batched_complete_and_collapse(view_model):
+    item_1, item_2 = view_model.tree_root.children
+    view_model.toggle_mark()
+    view_model.selected_node = Optional.some(item_2)
+    view_model.toggle_mark()
+    visibility_updates = []
+    update_node_visibility = view_model._update_node_visibility
+
+    def counting_update_node_visibility(from_node=Optional.none()):
+        visibility_updates.append(from_node)
+        update_node_visibility(from_node)
+
+    view_model._update_node_visibility = counting_update_node_visibility
+    view_model.toggle_complete()
+
+    assert item_2.data.complete
+    assert all(node.data.complete for node in item_1.gen_all_nodes())
+    assert len(visibility_updates) == 2
+    assert not view_model.is_multi_selecting
+    # One undo for all of them
+    view_model.undo()
+    assert not item_1.data.complete
+    assert not item_2.data.complete
+    assert item_1.children[0].data.complete
+
+    view_model._update_node_visibility = update_node_visibility
+    view_model.select_first()
+    view_model.toggle_visual_mode()
+    view_model.selected_node = Optional.some(item_2)
+    view_model.toggle_collapse_node()
+    assert item_1.data.collapsed and item_2.data.collapsed
+    assert [item.text for item in view_model.list_items()] == ["Item 1", "Item 2"]
+
+
+def test_batched_cut_paste_and_move(view_model):
+    item_1, item_2 = view_model.tree_root.children
+    item_1_1, item_1_2 = item_1.children
+    view_model.selected_node = Optional.some(item_1_1)
+    view_model.toggle_mark()
+    view_model.selected_node = Optional.some(item_1_2)
+    view_model.toggle_mark()
+    view_model.delete_item()
+    assert item_1.children == []
+    assert view_model.selected_node.value() is item_2
+
+    view_model.selected_node = Optional.some(item_2)
+    view_model.paste_item()
+    assert view_model.tree_root.children == [item_1, item_2, item_1_1, item_1_2]
+    assert item_1_1.children[0].level == 1
+    view_model.undo()
+    view_model.undo()
+    assert item_1.children == [item_1_1, item_1_2]
+    assert view_model.tree_root.children == [item_1, item_2]
+
+    view_model.selected_node = Optional.some(item_2)
+    view_model.toggle_mark()
+    view_model.selected_node = Optional.some(item_1_1)
+    view_model.toggle_mark()
+    view_model.selected_node = Optional.some(item_1_2)
+    view_model.move_selection_here()
+    assert item_1.children == [item_1_2, item_1_1, item_2]
+    assert view_model.tree_root.children == [item_1]
+    assert item_2.level == 1
+    view_model.undo()
+    assert item_1.children == [item_1_1, item_1_2]
+    assert view_model.tree_root.children == [item_1, item_2]
+    assert item_2.level == 0
+
+
+def test_apply_external_changes(view_model, tree_str):
+    view_model.set_as_root(view_model.tree_root.first_child())
+    view_model.select_next()
+    selected_node = view_model.selected_node.value()
+    assert selected_node.data.text == "Item 1.1.1"
+
+    new_tree_str = tree_str.replace("- Item 1.1.2", "- Item 1.1.2 (edited elsewhere)")
+    view_model.apply_external_changes(
+        TreeNode.from_string(new_tree_str, todo_list.TodoItem.tree_node_from_str)
+    )
+
+    assert view_model.tree_root.data.text == "Item 1"
+    assert view_model.selected_node.value() is selected_node
+    assert view_model.list_items()[2].text == "Item 1.1.2 (edited elsewhere)"
+
+
+def test_apply_external_changes_with_new_ids(view_model, tree_str):
+    item_2 = view_model.tree_root.children[1]
+    old_id = item_2.data.id
+
+    view_model.apply_external_changes(
+        TreeNode.from_string(
+            tree_str.replace("- Item 2", "- Item 2 {#newid12}"),
+            todo_list.TodoItem.tree_node_from_str,
+        )
+    )
+
+    assert view_model.tree_root.children[1] is item_2
+    assert view_model.node_with_id("newid12").value() is item_2
+    assert view_model.node_with_id(old_id).is_none()
+
+
+def test_apply_external_changes_removing_selection(view_model):
+    view_model.select_next()
+    view_model.apply_external_changes(
+        TreeNode.from_string("- Item 1\n- Item 2", todo_list.TodoItem.tree_node_from_str)
+    )
+
+    assert view_model.selected_node.value().data.text == "Item 1"
+    assert [item.text for item in view_model.list_items()] == ["Item 1", "Item 2"]
+
+
+def test_import_items(view_model):
+    imported_root = TreeNode.from_string(
+        "- Imported 1\n  - Imported 1.1\n- Imported 2", todo_list.TodoItem.tree_node_from_str
+    )
+    view_model.import_items(imported_root)
+
+    assert [node.data.text for node in view_model.tree_root.children] == [
+        "Item 1",
+        "Imported 1",
+        "Imported 2",
+        "Item 2",
+    ]
+    assert view_model.selected_node.value().data.text == "Imported 1"
+    assert view_model.selected_node.value().children[0].level == 1
+
+    view_model.undo()
+    assert [node.data.text for node in view_model.tree_root.children] == ["Item 1", "Item 2"]
+
+
+def test_nodes_get_ids(view_model):
+    ids = [node.data.id for node in view_model.tree_root.gen_all_nodes()]
+    assert all(ids)
+    assert len(set(ids)) == len(ids)
+
+    view_model.insert_item("New")
+    new_node = view_model.selected_node.value()
+    assert new_node.data.id not in ids
+    assert view_model.node_with_id(new_node.data.id).value() is new_node
+
+
+def test_restore_root_and_selection_by_id(tree_root, config_manager):
+    item_1_2 = tree_root.children[0].children[1]
+    item_1_2.data.id = "root1234"
+    item_1_2.children[0].data.id = "sel12345"
+    config_manager.root_node_id = Optional.some("root1234")
+    config_manager.selected_node_id = Optional.some("sel12345")
+    # An item added above the root doesn't change which node it is
+    tree_root.prepend_child(TreeNode(todo_list.TodoItem("New first item")))
+
+    vm = ViewModel(tree_root, config_manager)
+
+    assert vm.tree_root is item_1_2
+    assert vm.selected_node.value() is item_1_2.children[0]
+
+
+def test_undo_keeps_root_by_id(view_model):
+    item_1_2 = view_model.tree_root.children[0].children[1]
+    view_model.set_as_root(Optional.some(item_1_2))
+    view_model.insert_item("New")
+
+    view_model.undo()
+
+    assert view_model.tree_root.data.id == item_1_2.data.id
+    assert view_model.tree_root.data.text == "Item 1.2"
+
+
+def test_label_display_text():
+    label_display_text.cache_clear()
+    text = "See https://example.com/page"
+    assert label_display_text(text, 80, 0, False) == (
+        "See [skyblue underline ~https://example.com/page]https://example.com/page[/]"
+    )
+    assert label_display_text(text, 80, 0, True) == text
+    assert label_display_text(text, 20, 0, False) == "See https://exa..."
+
+    label_display_text(text, 80, 0, False)
+    assert label_display_text.cache_info().hits == 1
+
+
+def test_search_matches_are_highlighted(view_model):
+    view_model.update_search("")
+    view_model.update_search("1.2")
+    assert view_model.wait_for_search(timeout=5)
+    with view_model.lock:
+        list_items = {item.text: item for item in view_model.list_items()}
+    item = list_items["Item [bold underline]1.2[/bold /underline]"]
+    assert item.match_spans == ((5, 8),)
+    assert list_items["Item [bold underline]1.2[/bold /underline].1"].is_search_result
+    assert not list_items["Item 1.1"].match_spans
+    view_model.finish_search()
+
+
+def test_new_ids_are_saved(tmp_path, config_manager):
+    save_file = tmp_path / "savefile"
+    save_file.write_text("- Item 1 {#one}\n- Item 2")
+    storage = TextFileStorage(save_file)
+    vm = ViewModel(storage.load(), config_manager, storage=Optional.some(storage))
+    assert vm.has_unsaved_ids
+
+    vm.save_to_file()
+
+    assert not vm.has_unsaved_ids
+    new_id = vm.tree_root.children[1].data.id
+    assert save_file.read_text() == f"- Item 1 {{#one}}\n- Item 2 {{#{new_id}}}"
+    storage = TextFileStorage(save_file)
+    assert not ViewModel(storage.load(), config_manager, storage=Optional.some(storage)).has_unsaved_ids
+
+
+def test_export_error_is_shown(tmp_path, tree_root):
+    (tmp_path / "not_a_directory").write_text("")
+    config_file = tmp_path / "config.toml"
+    config_file.write_text(f'[Export]\nfile = "{tmp_path / "not_a_directory" / "export.opml"}"\n')
+    config_manager = config.ConfigManager(
+        save_file=Optional.some(tmp_path / "savefile"), config_file=Optional.some(config_file)
+    )
+    vm = ViewModel(tree_root, config_manager)
+
+    assert vm.export_root().is_none()
+    assert "Could not export" in vm.message.value()